@@ -1,5 +1,3 @@
-from django.core.exceptions import ImproperlyConfigured
-import json
 import pymysql
 import os, random, string
 from unipath import Path
@@ -12,16 +10,8 @@ BASE_DIR = Path(__file__).ancestor(3)
 pymysql.install_as_MySQLdb()
 
 # SECURITY WARNING: keep the secret key used in production secret!
-with open("secret.json") as f:
-    secret = json.loads(f.read())
-
-
-def get_secret(secret_name, secrets=secret):
-    try:
-        return secrets[secret_name]
-    except:
-        msg = "la variable %s no existe" % secret_name
-        raise ImproperlyConfigured(msg)
+# get_secret lanza ImproperlyConfigured si la variable no existe
+from scripts.secretos import get_secret
 
 
 SECRET_KEY = get_secret("SECRET_KEY")
@@ -102,6 +92,17 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "adminbi.wsgi.application"
 
+# Descargas de archivos generados (apps.home.descargas). Detrás de nginx,
+# "x-accel" hace que nginx envíe el archivo y el worker quede libre; requiere una
+# location internal que publique MEDIA_ROOT en DESCARGAS_X_ACCEL_PREFIJO:
+#     location /media-protegido/ { internal; alias /code/media/; }
+# "x-sendfile" es el equivalente para Apache (mod_xsendfile) y lighttpd.
+# Vacío: Django envía el archivo (con soporte de rangos y ETag).
+DESCARGAS_OFFLOAD = os.environ.get("ADMINBI_DESCARGAS_OFFLOAD", "")
+DESCARGAS_X_ACCEL_PREFIJO = os.environ.get(
+    "ADMINBI_DESCARGAS_X_ACCEL_PREFIJO", "/media-protegido/"
+)
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
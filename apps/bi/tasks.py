@@ -1,5 +1,3 @@
-from scripts.extrae_bi.apipowerbi import Api_PowerBi
-from scripts.StaticPage import StaticPage
 import logging
 
 # from celery import shared_task
@@ -11,6 +9,9 @@ from django_rq import job
 @job("default", timeout=1800)
 def actualiza_bi_task(database_name, IdtReporteIni, IdtReporteFin):
     try:
+        # msal, requests y pandas solo se cargan en el worker que ejecuta la tarea
+        from scripts.extrae_bi.apipowerbi import Api_PowerBi
+
         logging.info("Iniciando proceso de extracción BI")
         ApiPBi = Api_PowerBi(database_name, IdtReporteIni, IdtReporteFin)
         resultado = ApiPBi.run_datasetrefresh()
@@ -5,7 +5,6 @@ from django.utils.decorators import method_decorator
 
 from apps.users.decorators import registrar_auditoria
 from django.urls import reverse_lazy, reverse
-import requests
 from django.http import HttpResponse, FileResponse, JsonResponse
 from django.template.response import TemplateResponse
 
@@ -14,28 +13,16 @@ from django.views.generic import TemplateView, View
 from apps.users.views import BaseView
 from scripts.embedded.powerbi import AadService, PbiEmbedService
 
-from scripts.conexion import Conexion
-from scripts.extrae_bi.extrae_bi_call import Extrae_Bi
-from scripts.extrae_bi.apipowerbi import Api_PowerBi
 from scripts.config import ConfigBasic
 from django.contrib.auth.decorators import login_required
 from apps.users.decorators import registrar_auditoria
 from scripts.embedded.powerbi import PbiEmbedService
-from django.core.exceptions import ImproperlyConfigured
 import json
 from .tasks import actualiza_bi_task
 from django.contrib import messages
 
 
-with open("secret.json") as f:
-    secret = json.loads(f.read())
-
-    def get_secret(secret_name, secrets=secret):
-        try:
-            return secrets[secret_name]
-        except:
-            msg = "la variable %s no existe" % secret_name
-            raise ImproperlyConfigured(msg)
+from scripts.secretos import get_secret
 
 
 class EliminarReporteFetched(View):
@@ -125,11 +112,14 @@ class ActualizacionBiPage(LoginRequiredMixin, BaseView):
 def reporte_embed(request):
     # Utiliza la función get_embed_token_report() del módulo powerbi.py para obtener la información necesaria
     # para incrustar el informe de Power BI
-    database_name = StaticPage.name
-    ConfigBasic(database_name)
+    database_name = request.session.get("database_name")
+    if not database_name:
+        return redirect("home_app:panel")
+    # La configuración sale de la caché de snapshots, no de consultas por cada carga
+    config = ConfigBasic(database_name).config
     clase = PbiEmbedService()
     embed_info_json = clase.get_embed_params_for_single_report(
-        workspace_id=get_secret("GROUP_ID"), report_id=f"{StaticPage.report_id_powerbi}"
+        workspace_id=get_secret("GROUP_ID"), report_id=f"{config.get('report_id_powerbi')}"
     )
     embed_info = json.loads(embed_info_json)
 
@@ -6,13 +6,10 @@ from django.urls import reverse_lazy
 import zipfile
 import os
 from django.contrib.auth.mixins import LoginRequiredMixin
-import sqlalchemy
 from apps.home.tasks import cargue_zip_task, cargue_plano_task
-from scripts.config import ConfigBasic
 from scripts.StaticPage import StaticPage, DinamicPage
 import re
 from django.conf import settings
-from sqlalchemy import create_engine, text
 from apps.users.views import BaseView
 from django.utils.decorators import method_decorator
 from apps.users.decorators import registrar_auditoria
@@ -21,7 +18,6 @@ from django.contrib.auth.decorators import user_passes_test
 from django.contrib.auth.decorators import login_required, permission_required
 from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
 from django.http import request
-from scripts.extrae_bi.cargue_zip import CargueZip
 
 
 class UploadZipView(LoginRequiredMixin, BaseView):
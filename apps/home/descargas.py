@@ -0,0 +1,176 @@
+import os
+import re
+import mimetypes
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import (
+    FileResponse,
+    HttpResponse,
+    HttpResponseNotModified,
+    StreamingHttpResponse,
+)
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+# Bloques en que se leen los rangos parciales.
+BLOQUE_DESCARGA = 256 * 1024
+# Tipos de los archivos comprimidos que se descargan tal cual (no como Content-Encoding).
+TIPOS_COMPRIMIDOS = {"gzip": "application/gzip", "zstd": "application/zstd"}
+
+_RANGO = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _tipo_contenido(file_name):
+    tipo, codificacion = mimetypes.guess_type(file_name)
+    if codificacion:
+        return TIPOS_COMPRIMIDOS.get(codificacion, "application/octet-stream")
+    return tipo or "application/octet-stream"
+
+
+def _etag(estado):
+    return f'"{estado.st_size:x}-{estado.st_mtime_ns:x}"'
+
+
+def _no_modificado(request, etag, modificado):
+    """
+    Evalúa If-None-Match / If-Modified-Since: True si el cliente ya tiene el archivo.
+    """
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+    if if_none_match:
+        etiquetas = [e.strip().removeprefix("W/") for e in if_none_match.split(",")]
+        return "*" in etiquetas or etag in etiquetas
+    desde = parse_http_date_safe(request.META.get("HTTP_IF_MODIFIED_SINCE", ""))
+    return desde is not None and int(modificado) <= desde
+
+
+def _rango(request, etag, modificado, tamano):
+    """
+    Retorna (inicio, fin) del rango pedido, None para el archivo completo o False si no se puede cumplir.
+
+    Solo se atiende un rango (los navegadores y gestores de descarga reanudan con
+    uno); con varios o con If-Range desactualizado se entrega el archivo completo.
+    """
+    encabezado = request.META.get("HTTP_RANGE")
+    if not encabezado or tamano == 0:
+        return None
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if if_range:
+        fecha = parse_http_date_safe(if_range)
+        if if_range.strip() != etag and (fecha is None or int(modificado) > fecha):
+            return None
+    coincidencia = _RANGO.match(encabezado.strip())
+    if not coincidencia:
+        return None
+    inicio, fin = coincidencia.groups()
+    if not inicio and not fin:
+        return None
+    if not inicio:
+        # bytes=-N: los últimos N bytes
+        inicio, fin = max(0, tamano - int(fin)), tamano - 1
+    else:
+        inicio = int(inicio)
+        fin = min(int(fin), tamano - 1) if fin else tamano - 1
+    if inicio >= tamano or inicio > fin:
+        return False
+    return inicio, fin
+
+
+def _leer_rango(ruta, inicio, fin):
+    with open(ruta, "rb") as archivo:
+        archivo.seek(inicio)
+        restante = fin - inicio + 1
+        while restante > 0:
+            bloque = archivo.read(min(BLOQUE_DESCARGA, restante))
+            if not bloque:
+                break
+            restante -= len(bloque)
+            yield bloque
+
+
+def _delegar(ruta, respuesta):
+    """
+    Delega la entrega al servidor web según settings.DESCARGAS_OFFLOAD.
+
+    Returns:
+        bool: True si se agregó el encabezado (la respuesta no lleva cuerpo).
+    """
+    modo = (getattr(settings, "DESCARGAS_OFFLOAD", "") or "").lower()
+    if modo == "x-accel":
+        relativa = os.path.relpath(os.path.abspath(ruta), os.path.abspath(settings.MEDIA_ROOT))
+        if relativa.startswith(".."):
+            return False
+        prefijo = settings.DESCARGAS_X_ACCEL_PREFIJO.rstrip("/")
+        respuesta["X-Accel-Redirect"] = quote(f"{prefijo}/{relativa.replace(os.sep, '/')}")
+        respuesta["X-Accel-Buffering"] = "no"
+        return True
+    if modo == "x-sendfile":
+        respuesta["X-Sendfile"] = os.path.abspath(ruta)
+        return True
+    return False
+
+
+def servir_archivo(request, ruta, file_name):
+    """
+    Responde la descarga de un archivo generado.
+
+    - Con DESCARGAS_OFFLOAD = "x-accel" (nginx) o "x-sendfile" (Apache, lighttpd)
+      la respuesta solo lleva encabezados y el servidor web envía el archivo; el
+      worker de Django queda libre de inmediato. nginx atiende por sí mismo los
+      rangos y las validaciones condicionales (location internal sobre MEDIA_ROOT
+      publicada en DESCARGAS_X_ACCEL_PREFIJO).
+    - Sin servidor web delante, se responde 304 si el cliente ya tiene el archivo
+      (ETag / Last-Modified), 206 con el rango pedido para reanudar descargas y
+      el archivo completo con FileResponse en otro caso.
+
+    Args:
+        request (HttpRequest): Solicitud de descarga.
+        ruta (str): Ruta del archivo en disco.
+        file_name (str): Nombre con el que se descarga.
+
+    Returns:
+        HttpResponse: Respuesta de la descarga.
+
+    Raises:
+        FileNotFoundError: Si el archivo no existe.
+    """
+    estado = os.stat(ruta)
+    etag = _etag(estado)
+    modificado = estado.st_mtime
+
+    encabezados = {
+        "Content-Type": _tipo_contenido(file_name),
+        "Content-Disposition": content_disposition_header(True, file_name),
+        "ETag": etag,
+        "Last-Modified": http_date(modificado),
+        "Accept-Ranges": "bytes",
+    }
+
+    if _no_modificado(request, etag, modificado):
+        respuesta = HttpResponseNotModified()
+        for clave in ("ETag", "Last-Modified"):
+            respuesta[clave] = encabezados[clave]
+        return respuesta
+
+    respuesta = HttpResponse()
+    if _delegar(ruta, respuesta):
+        for clave, valor in encabezados.items():
+            if clave != "Accept-Ranges":
+                respuesta[clave] = valor
+        return respuesta
+
+    rango = _rango(request, etag, modificado, estado.st_size)
+    if rango is False:
+        respuesta = HttpResponse(status=416)
+        respuesta["Content-Range"] = f"bytes */{estado.st_size}"
+        return respuesta
+    if rango is None:
+        respuesta = FileResponse(open(ruta, "rb"))
+        respuesta["Content-Length"] = str(estado.st_size)
+    else:
+        inicio, fin = rango
+        respuesta = StreamingHttpResponse(_leer_rango(ruta, inicio, fin), status=206)
+        respuesta["Content-Range"] = f"bytes {inicio}-{fin}/{estado.st_size}"
+        respuesta["Content-Length"] = str(fin - inicio + 1)
+    for clave, valor in encabezados.items():
+        respuesta[clave] = valor
+    return respuesta
@@ -1,28 +1,56 @@
 import os
-from scripts.extrae_bi.cubo import CuboVentas
-from scripts.config import ConfigBasic
-from scripts.extrae_bi.cargue_zip import CargueZip
-from scripts.extrae_bi.interface import InterfaceContable
-from scripts.extrae_bi.plano import InterfacePlano
-from scripts.extrae_bi.extrae_bi_call import Extrae_Bi
-from scripts.StaticPage import StaticPage
 import logging
 
 # from celery import shared_task
 # @shared_task
 
+# Las clases de scripts (pandas, sqlalchemy, openpyxl, xlsxwriter...) se importan
+# dentro de cada tarea: las vistas importan este módulo solo para encolar con .delay()
 from django_rq import job
-from scripts.extrae_bi.cargue_plano_tsol import (
-    CarguePlano,
-)  # Asegúrate de importar tu clase CarguePlano
+
+
+def exportar_con_cache(exportador, tipo, procesar):
+    """
+    Retorna el archivo de la caché de artefactos si existe; si no, lo genera y lo guarda.
+
+    Args:
+        exportador: CuboVentas, InterfaceContable o InterfacePlano ya configurado.
+        tipo (str): Tipo de exportación, parte de la clave de caché.
+        procesar (callable): Método del exportador que genera el archivo.
+
+    Returns:
+        dict: Resultado del exportador (file_path apunta a la caché si se guardó).
+    """
+    from scripts.cache_artefactos import cache_artefactos
+
+    database_name = exportador.database_name
+    clave = cache_artefactos.clave(
+        database_name,
+        tipo,
+        exportador.IdtReporteIni,
+        exportador.IdtReporteFin,
+        exportador.procedimientos_cache(),
+    )
+    if clave is None:
+        return procesar()
+    resultado = cache_artefactos.buscar(database_name, clave)
+    if resultado is not None:
+        return resultado
+
+    resultado = procesar()
+    if isinstance(resultado, dict) and resultado.get("success") and resultado.get("file_path"):
+        resultado = cache_artefactos.guardar(database_name, clave, resultado)
+    return resultado
 
 
 @job("default", timeout=3600)
-def cubo_ventas_task(database_name, IdtReporteIni, IdtReporteFin):
+def cubo_ventas_task(database_name, IdtReporteIni, IdtReporteFin, formato=None):
     try:
+        from scripts.extrae_bi.cubo import CuboVentas
+
         logging.info("Iniciando proceso de CuboVentas")
-        cubo_ventas = CuboVentas(database_name, IdtReporteIni, IdtReporteFin)
-        resultado = cubo_ventas.procesar_datos()
+        cubo_ventas = CuboVentas(database_name, IdtReporteIni, IdtReporteFin, formato)
+        resultado = exportar_con_cache(cubo_ventas, "cubo", cubo_ventas.procesar_datos)
         logging.info(f"Proceso de CuboVentas finalizado: {resultado}")
 
         # Asegúrate de que el resultado es un diccionario y contiene las claves esperadas
@@ -52,11 +80,13 @@ def cubo_ventas_task(database_name, IdtReporteIni, IdtReporteFin):
 
 
 @job("default", timeout=3600)
-def interface_task(database_name, IdtReporteIni, IdtReporteFin):
+def interface_task(database_name, IdtReporteIni, IdtReporteFin, formato=None):
     try:
+        from scripts.extrae_bi.interface import InterfaceContable
+
         logging.info("Iniciando proceso de Interface")
-        interface = InterfaceContable(database_name, IdtReporteIni, IdtReporteFin)
-        resultado = interface.procesar_datos()
+        interface = InterfaceContable(database_name, IdtReporteIni, IdtReporteFin, formato)
+        resultado = exportar_con_cache(interface, "interface", interface.procesar_datos)
         logging.info(f"Proceso de Interface Contable finalizado: {resultado}")
 
         # Asegúrate de que el resultado es un diccionario y contiene las claves esperadas
@@ -90,6 +120,8 @@ def interface_task(database_name, IdtReporteIni, IdtReporteFin):
 @job("default", timeout=3600)
 def cargue_zip_task(database_name, zip_file_path):
     try:
+        from scripts.extrae_bi.cargue_zip import CargueZip
+
         print("aqui estoy en cargue_zip_task")
         logging.info("Iniciando proceso de Procesar ZIP")
         cargue_zip = CargueZip(database_name, zip_file_path)
@@ -121,6 +153,8 @@ def cargue_zip_task(database_name, zip_file_path):
 @job("default", timeout=3600)
 def cargue_plano_task(database_name):
     try:
+        from scripts.extrae_bi.cargue_plano_tsol import CarguePlano
+
         logging.info("Iniciando proceso de Cargue de Archivos Planos")
         cargue_plano = CarguePlano(database_name)
         logging.info("Procesando archivo plano")
@@ -203,11 +237,15 @@ def plano_task(database_name, IdtReporteIni, IdtReporteFin):
 
 
 @job("default", timeout=3600)
-def plano_task(database_name, IdtReporteIni, IdtReporteFin):
+def plano_task(database_name, IdtReporteIni, IdtReporteFin, formato=None):
     try:
+        from scripts.extrae_bi.plano import InterfacePlano
+
         logging.info("Iniciando proceso de Procesar Plano")
-        interface = InterfacePlano(database_name, IdtReporteIni, IdtReporteFin)
-        resultado = interface.evaluar_y_procesar_datos()
+        interface = InterfacePlano(database_name, IdtReporteIni, IdtReporteFin, formato)
+        resultado = exportar_con_cache(
+            interface, "plano", interface.evaluar_y_procesar_datos
+        )
         logging.info(f"Proceso de Interface Contable finalizado: {resultado}")
 
         # Asegúrate de que el resultado es un diccionario y contiene las claves esperadas
@@ -239,6 +277,8 @@ def plano_task(database_name, IdtReporteIni, IdtReporteFin):
 @job("default", timeout=3600)
 def extrae_bi_task(database_name, IdtReporteIni, IdtReporteFin):
     try:
+        from scripts.extrae_bi.extrae_bi_call import Extrae_Bi
+
         logging.info("Iniciando proceso de extracción BI")
         extrae_bi = Extrae_Bi(database_name, IdtReporteIni, IdtReporteFin)
         print("listo para procesar")
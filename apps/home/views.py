@@ -13,12 +13,11 @@ from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from django.contrib.auth.decorators import user_passes_test
 from django.contrib.auth.decorators import login_required, permission_required
 from django.http import HttpResponseRedirect
-from scripts.conexion import Conexion
-from scripts.config import ConfigBasic
 from scripts.StaticPage import StaticPage, DinamicPage
-from scripts.extrae_bi.extrae_bi_call import Extrae_Bi
-from scripts.extrae_bi.interface import InterfaceContable
+from scripts.cache_artefactos import cache_artefactos
+from scripts import formatos_salida
 from django.contrib.auth.mixins import UserPassesTestMixin
+from .descargas import servir_archivo
 from .tasks import cubo_ventas_task, interface_task, plano_task, extrae_bi_task
 from django.http import JsonResponse
 from django.views import View
@@ -69,18 +68,11 @@ class DownloadFileView(BaseView):
         file_path = request.session.get("file_path")
         file_name = request.session.get("file_name")
 
-        f = None  # Define f fuera del bloque try para que esté disponible en el bloque except
-
         if file_path and file_name:
             try:
-                f = open(file_path, "rb")
-                response = FileResponse(f)
-                response["Content-Disposition"] = f'attachment; filename="{file_name}"'
-                return response
+                # Rangos, respuestas condicionales y entrega por nginx: ver apps.home.descargas
+                return servir_archivo(request, file_path, file_name)
             except IOError:
-                # Si f ha sido asignado y está abierto, ciérralo.
-                if f:
-                    f.close()
                 messages.error(request, "Error al abrir el archivo")
         else:
             messages.error(request, "Archivo no encontrado")
@@ -100,7 +92,10 @@ class DeleteFileView(BaseView):
             )
 
         try:
-            os.remove(file_path)
+            # Los archivos de la caché de artefactos los comparten otras solicitudes;
+            # su vida la controla scripts.cache_artefactos (TTL y cuota por tenant)
+            if not cache_artefactos.es_artefacto(file_path):
+                os.remove(file_path)
             # Borra la ruta del archivo y el nombre del archivo de la sesión.
             del request.session["file_path"]
             del request.session["file_name"]
@@ -229,7 +224,9 @@ class CuboPage(LoginRequiredMixin, BaseView):
             )
 
         try:
-            task = cubo_ventas_task.delay(database_name, IdtReporteIni, IdtReporteFin)
+            task = cubo_ventas_task.delay(
+                database_name, IdtReporteIni, IdtReporteFin, request.POST.get("formato")
+            )
             request.session["task_id"] = task.id
             return JsonResponse({"success": True, "task_id": task.id})
         except Exception as e:
@@ -257,6 +254,7 @@ class CuboPage(LoginRequiredMixin, BaseView):
         """
         context = super().get_context_data(**kwargs)
         context["form_url"] = "home_app:cubo"
+        context["formatos"] = formatos_salida.opciones("cubo")
         return context
 
 
@@ -309,7 +307,9 @@ class InterfacePage(LoginRequiredMixin, BaseView):
             print(
                 "aqui estoy en interfacepage en el try antes de task = interface_task.delay"
             )
-            task = interface_task.delay(database_name, IdtReporteIni, IdtReporteFin)
+            task = interface_task.delay(
+                database_name, IdtReporteIni, IdtReporteFin, request.POST.get("formato")
+            )
             print(
                 "aqui estoy en interfacepage en el try despues de task = interface_task.delay"
             )
@@ -340,6 +340,7 @@ class InterfacePage(LoginRequiredMixin, BaseView):
         """
         context = super().get_context_data(**kwargs)
         context["form_url"] = "home_app:interface"
+        context["formatos"] = formatos_salida.opciones("interface")
         return context
 
 
@@ -443,7 +444,9 @@ class PlanoPage(LoginRequiredMixin, BaseView):
             )
 
         try:
-            task = plano_task.delay(database_name, IdtReporteIni, IdtReporteFin)
+            task = plano_task.delay(
+                database_name, IdtReporteIni, IdtReporteFin, request.POST.get("formato")
+            )
             request.session["task_id"] = task.id
             return JsonResponse({"success": True, "task_id": task.id})
         except Exception as e:
@@ -471,6 +474,7 @@ class PlanoPage(LoginRequiredMixin, BaseView):
         """
         context = super().get_context_data(**kwargs)
         context["form_url"] = "home_app:plano"
+        context["formatos"] = formatos_salida.opciones("plano")
         return context
 
 
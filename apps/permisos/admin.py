@@ -1,7 +1,7 @@
 from django.contrib import admin
 
 # Register your models here.
-from .models import ConfDt, ConfEmpresas, ConfServer, ConfSql, ConfTipo
+from .models import ConfCambioDatos, ConfDt, ConfEmpresas, ConfMarcaAgua, ConfServer, ConfSql, ConfTipo
 
 class ConfDtAdmin(admin.ModelAdmin):
 
@@ -28,6 +28,14 @@ class ConfSqlAdmin(admin.ModelAdmin):
 
     list_display = ('txDescripcion',)
     
+class ConfMarcaAguaAdmin(admin.ModelAdmin):
+
+    list_display = ('name','txTabla','txMarca','dtReconciliacion','dtActualizacion')
+    
+class ConfCambioDatosAdmin(admin.ModelAdmin):
+
+    list_display = ('id','name','IdtReporteIni','IdtReporteFin','dtRegistro')
+    
 class ConfTipoAdmin(admin.ModelAdmin):
 
     list_display = ('nbTipo',)
@@ -37,4 +45,6 @@ admin.site.register(ConfDt,ConfDtAdmin)
 admin.site.register(ConfEmpresas,ConfEmpresasAdmin)
 admin.site.register(ConfServer,ConfServerAdmin)
 admin.site.register(ConfSql,ConfSqlAdmin)
+admin.site.register(ConfMarcaAgua,ConfMarcaAguaAdmin)
+admin.site.register(ConfCambioDatos,ConfCambioDatosAdmin)
 admin.site.register(ConfTipo)
\ No newline at end of file
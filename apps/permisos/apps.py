@@ -4,4 +4,8 @@ from django.apps import AppConfig
 class PermisosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.permisos'
-    verbose_name='Configuración de Permisos'
\ No newline at end of file
+    verbose_name='Configuración de Permisos'
+
+    def ready(self):
+        # Conecta las señales que invalidan la caché de configuración
+        from . import signals  # noqa: F401
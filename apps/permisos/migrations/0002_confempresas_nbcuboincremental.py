@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('permisos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='confempresas',
+            name='nbCuboIncremental',
+            field=models.IntegerField(blank=True, null=True, verbose_name='Cubo incremental por día'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('permisos', '0002_confempresas_nbcuboincremental'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='confempresas',
+            name='txFormatoSalida',
+            field=models.CharField(blank=True, max_length=10, null=True, verbose_name='Formato de salida (xlsx, parquet, csv.gz, csv.zst)'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('permisos', '0003_confempresas_txformatosalida'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='confsql',
+            name='txModoCarga',
+            field=models.CharField(blank=True, max_length=10, null=True, verbose_name='Modo de carga (directo, staging, reemplazo)'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('permisos', '0004_confsql_txmodocarga'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='confsql',
+            name='txSqlIncremental',
+            field=models.TextField(blank=True, null=True, verbose_name='Sql Incremental (:marca, :IdtReporteIni, :IdtReporteFin, :nmReporte)'),
+        ),
+        migrations.AddField(
+            model_name='confsql',
+            name='txColumnaMarca',
+            field=models.CharField(blank=True, max_length=100, null=True, verbose_name='Columna de Marca de Agua'),
+        ),
+        migrations.AddField(
+            model_name='confsql',
+            name='nbDiasReconciliacion',
+            field=models.IntegerField(blank=True, null=True, verbose_name='Días entre Recargas Completas'),
+        ),
+        migrations.CreateModel(
+            name='ConfMarcaAgua',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Base de Datos')),
+                ('txTabla', models.CharField(max_length=100, verbose_name='Tabla')),
+                ('txMarca', models.CharField(blank=True, max_length=100, null=True, verbose_name='Marca de Agua')),
+                ('dtReconciliacion', models.DateTimeField(blank=True, null=True, verbose_name='Última Recarga Completa')),
+                ('dtActualizacion', models.DateTimeField(blank=True, null=True, verbose_name='Última Actualización')),
+            ],
+            options={
+                'verbose_name': 'Marca de Agua de Extracción',
+                'verbose_name_plural': 'Marcas de Agua de Extracción',
+                'db_table': 'conf_marca_agua',
+                'unique_together': {('name', 'txTabla')},
+            },
+        ),
+    ]
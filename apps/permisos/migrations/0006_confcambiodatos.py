@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('permisos', '0005_confsql_incremental_confmarcaagua'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConfCambioDatos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Base de Datos')),
+                ('IdtReporteIni', models.DateField(blank=True, null=True, verbose_name='Fecha Inicial')),
+                ('IdtReporteFin', models.DateField(blank=True, null=True, verbose_name='Fecha Final')),
+                ('dtRegistro', models.DateTimeField(verbose_name='Fecha de Registro')),
+            ],
+            options={
+                'verbose_name': 'Cambio de Datos',
+                'verbose_name_plural': 'Cambios de Datos',
+                'db_table': 'conf_cambio_datos',
+                'indexes': [models.Index(fields=['name', 'dtRegistro'], name='conf_cambio_name_dt_idx')],
+            },
+        ),
+    ]
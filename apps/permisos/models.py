@@ -53,6 +53,8 @@ class ConfEmpresas(models.Model):
     dataset_id_powerbi = models.CharField(max_length=255, null=True, blank=True,verbose_name='Dataset PowerBi')
     url_powerbi = models.TextField(null=True, blank=True,verbose_name='Url Pública PowerBi')
     estado = models.IntegerField(null=True, blank=True,verbose_name='Activo')
+    nbCuboIncremental = models.IntegerField(null=True, blank=True,verbose_name='Cubo incremental por día')
+    txFormatoSalida = models.CharField(max_length=10, null=True, blank=True,verbose_name='Formato de salida (xlsx, parquet, csv.gz, csv.zst)')
 
     def __str__(self):
         return f'{self.id}-{self.nmEmpresa}'
@@ -90,6 +92,10 @@ class ConfSql(models.Model):
     txDescripcion = models.CharField(max_length=255, null=True, blank=True,verbose_name='Descripción del Proceso')
     nmProcedure_out = models.CharField(max_length=100, null=True, blank=True,verbose_name='Nombre del Procedimiento Extractor')
     nmProcedure_in = models.CharField(max_length=100, null=True, blank=True)
+    txModoCarga = models.CharField(max_length=10, null=True, blank=True,verbose_name='Modo de carga (directo, staging, reemplazo)')
+    txSqlIncremental = models.TextField(null=True, blank=True,verbose_name='Sql Incremental (:marca, :IdtReporteIni, :IdtReporteFin, :nmReporte)')
+    txColumnaMarca = models.CharField(max_length=100, null=True, blank=True,verbose_name='Columna de Marca de Agua')
+    nbDiasReconciliacion = models.IntegerField(null=True, blank=True,verbose_name='Días entre Recargas Completas')
     
     def __str__(self):
         return f'{self.nbSql}-{self.txDescripcion}-{self.nmReporte}'
@@ -100,6 +106,37 @@ class ConfSql(models.Model):
         verbose_name = 'Configuración Proceso Sql'
         verbose_name_plural = 'Configuración Procesos Sql'
 
+class ConfMarcaAgua(models.Model):
+    name = models.CharField(max_length=100, verbose_name='Base de Datos')
+    txTabla = models.CharField(max_length=100, verbose_name='Tabla')
+    txMarca = models.CharField(max_length=100, null=True, blank=True,verbose_name='Marca de Agua')
+    dtReconciliacion = models.DateTimeField(null=True, blank=True,verbose_name='Última Recarga Completa')
+    dtActualizacion = models.DateTimeField(null=True, blank=True,verbose_name='Última Actualización')
+
+    def __str__(self):
+        return f'{self.name}-{self.txTabla}'
+
+    class Meta:
+        db_table = 'conf_marca_agua'
+        unique_together = ('name', 'txTabla')
+        verbose_name = 'Marca de Agua de Extracción'
+        verbose_name_plural = 'Marcas de Agua de Extracción'
+
+class ConfCambioDatos(models.Model):
+    name = models.CharField(max_length=100, verbose_name='Base de Datos')
+    IdtReporteIni = models.DateField(null=True, blank=True,verbose_name='Fecha Inicial')
+    IdtReporteFin = models.DateField(null=True, blank=True,verbose_name='Fecha Final')
+    dtRegistro = models.DateTimeField(verbose_name='Fecha de Registro')
+
+    def __str__(self):
+        return f'{self.name}-{self.id}'
+
+    class Meta:
+        db_table = 'conf_cambio_datos'
+        indexes = [models.Index(fields=['name', 'dtRegistro'], name='conf_cambio_name_dt_idx')]
+        verbose_name = 'Cambio de Datos'
+        verbose_name_plural = 'Cambios de Datos'
+
 class ConfTipo(models.Model):
     nbTipo = models.BigIntegerField(primary_key=True,verbose_name='Id')
     nmUsr = models.CharField(max_length=50, null=True, blank=True,verbose_name='usuario')
@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ConfDt, ConfEmpresas, ConfServer, ConfTipo
+
+
+@receiver(post_save, sender=ConfEmpresas)
+@receiver(post_delete, sender=ConfEmpresas)
+@receiver(post_save, sender=ConfServer)
+@receiver(post_delete, sender=ConfServer)
+@receiver(post_save, sender=ConfTipo)
+@receiver(post_delete, sender=ConfTipo)
+@receiver(post_save, sender=ConfDt)
+@receiver(post_delete, sender=ConfDt)
+def invalidar_cache_config(sender, **kwargs):
+    """
+    Invalida los snapshots de configuración de ConfigBasic cuando cambia una
+    empresa, un servidor, un tipo de servidor o un rango de fechas.
+    """
+    from scripts.cache_config import cache_config
+
+    cache_config.invalidar()
@@ -1,85 +1,24 @@
 import os, sys
-
-import pandas
-import sqlalchemy
-import mariadb
-import pymysql
-from charset_normalizer import md__mypyc
-from scripts.conexion import Conexion as con
-import json
-import pandas as pd
-
-from scripts.extrae_bi.extrae_bi import Extrae_Bi
-from scripts.extrae_bi.apipowerbi import Api_PowerBi
-from scripts.extrae_bi.uau import CompiUpdate
-
-from unipath import Path
 import time
 import smtplib
+import logging
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.utils import COMMASPACE
 from email.mime.base import MIMEBase
 from email import encoders
-from sqlalchemy import create_engine, text
-from scripts.config import ConfigBasic
-from scripts.conexion import Conexion as con
-import win32com.client
-import logging
 
+from unipath import Path
+from sqlalchemy import text
+from scripts.conexion import DataBaseConnection
+from scripts.config import ConfigBasic
+from scripts.rango_fechas import resolvedor_fechas
+from scripts.extrae_bi.extrae_bi import ExtraeBI as Extrae_Bi
 
-def get_secret(secret_name, secrets_file="secret.json"):
-    try:
-        with open(secrets_file) as f:
-            secrets = json.loads(f.read())
-        return secrets[secret_name]
-    except KeyError:
-        raise ValueError(f"La variable {secret_name} no existe.")
-    except FileNotFoundError:
-        raise ValueError(f"No se encontró el archivo de configuración {secrets_file}.")
-
-class DataBaseConnection:
-    def __init__(self, config, mysql_engine=None, sqlite_engine=None):
-        self.config = config
-        # Asegurarse de que los engines son instancias de conexión válidas y no cadenas
-        self.engine_mysql_bi = (
-            mysql_engine if mysql_engine else self.create_engine_mysql_bi()
-        )
-        self.engine_mysql_out = (
-            mysql_engine if mysql_engine else self.create_engine_mysql_out()
-        )
-        self.engine_sqlite = (
-            sqlite_engine if sqlite_engine else create_engine("sqlite:///mydata.db")
-        )
-        # print(self.engine_sqlite)
+# Api_PowerBi (msal, requests), CompiUpdate (win32com) solo se usan en actualiza_bi
+# y refresh_excel; se importan ahí para que el ejecutable arranque sin cargarlos.
 
-    def create_engine_mysql_bi(self):
-        # Simplificación en la obtención de los parámetros de configuración
-        user, password, host, port, database = (
-            self.config.get("nmUsrIn"),
-            self.config.get("txPassIn"),
-            self.config.get("hostServerIn"),
-            self.config.get("portServerIn"),
-            self.config.get("dbBi"),
-        )
-        return con.ConexionMariadb3(
-            str(user), str(password), str(host), int(port), str(database)
-        )
 
-    def create_engine_mysql_out(self):
-        # Simplificación en la obtención de los parámetros de configuración
-        user, password, host, port, database = (
-            self.config.get("nmUsrOut"),
-            self.config.get("txPassOut"),
-            self.config.get("hostServerOut"),
-            self.config.get("portServerOut"),
-            self.config.get("dbSidis"),
-        )
-        return con.ConexionMariadb3(
-            str(user), str(password), str(host), int(port), str(database)
-        )
-        
-        
 class Inicio:
     def __init__(self):
         if getattr(sys, "frozen", False):
@@ -106,7 +45,6 @@ class Inicio:
             # config_basic.print_configuration()
             # print(self.config.get("txProcedureExtrae", []))
             self.db_connection = DataBaseConnection(config=self.config)
-            self.engine_sqlite = self.db_connection.engine_sqlite
             self.engine_mysql_bi = self.db_connection.engine_mysql_bi
             self.engine_mysql_out = self.db_connection.engine_mysql_out
             self.correo_config()
@@ -142,18 +80,17 @@ class Inicio:
         # print(sql)
         df = self.config_basic.execute_sql_query(sql)
         if not df.empty:
-            # Obtener los valores de IdtReporteIni y IdtReporteFin en una sola consulta
-            txDtIni = df["txDtIni"].iloc[0]
-            txDtFin = df["txDtFin"].iloc[0]
-
-            # La consulta SQL para obtener IdtReporteIni y IdtReporteFin
-            sql_report_date_ini = text(txDtIni)
-            sql_report_date_fin = text(txDtFin)
-            report_date_df_ini = self.config_basic.execute_sql_query(sql_report_date_ini)
-            report_date_df_fin = self.config_basic.execute_sql_query(sql_report_date_fin)
-            if not report_date_df_ini.empty and not report_date_df_fin.empty:
-                self.IdtReporteIni = report_date_df_ini["IdtReporteIni"].iloc[0]
-                self.IdtReporteFin = report_date_df_fin["IdtReporteFin"].iloc[0]
+            # IdtReporteIni y IdtReporteFin se calculan una vez por día para cada nmDt
+            rango = resolvedor_fechas.resolver(
+                nmDt,
+                df["txDtIni"].iloc[0],
+                df["txDtFin"].iloc[0],
+                self.config_basic.engine_conf(),
+            )
+            if rango:
+                self.IdtReporteIni = rango["IdtReporteIni"]
+                self.IdtReporteFin = rango["IdtReporteFin"]
+                return rango
 
     def send_email_notification(self, error_message):
         logging.info("Inicia envío de correos")
@@ -239,6 +176,8 @@ class Inicio:
 
     def actualiza_bi(self):
         try:
+            from scripts.extrae_bi.apipowerbi import Api_PowerBi
+
             actualizabi = Api_PowerBi(
                 database_name=self.name,
                 IdtReporteIni=self.IdtReporteIni,
@@ -257,6 +196,8 @@ class Inicio:
 
     def refresh_excel(self):
         try:
+            from scripts.extrae_bi.uau import CompiUpdate
+
             compi = CompiUpdate(database_name=self.name)
             compi.refresh_excel()
             logging.info("Proceso de actualización de Excel completado")
@@ -0,0 +1,111 @@
+"""
+Compara los métodos de escritura masiva de scripts.bulk_writer sobre tablas reales de BI.
+
+Por cada tabla se toma una muestra de sus filas, se crea una copia vacía
+(<tabla>__bench, CREATE TABLE ... LIKE) y se inserta la muestra con cada método
+en su propia transacción, vaciando la copia entre uno y otro. Se reportan filas
+por segundo y el método más rápido queda en el registro que consulta
+bulk_writer.backend_para (ADMINBI_BULK_REGISTRO, por defecto
+media/cache/bulk_writer.json). La copia se elimina al terminar.
+
+Uso (desde la raíz del proyecto):
+
+    python -m scripts.benchmarks.bulk_writer --database <tenant> --tabla tmp_infoventas
+    python -m scripts.benchmarks.bulk_writer --database <tenant> --tabla t1 --tabla t2 --filas 500000
+    python -m scripts.benchmarks.bulk_writer --database <tenant> --tabla t1 --metodo load_data --no-registrar
+"""
+
+import time
+import argparse
+
+from sqlalchemy import text
+
+SUFIJO = "__bench"
+
+
+def muestra(db_connection, tabla, filas):
+    import pandas as pd
+
+    quote = db_connection.engine_mysql_bi.dialect.identifier_preparer.quote
+    fragmentos = list(db_connection.stream_query(f"SELECT * FROM {quote(tabla)} LIMIT {int(filas)}"))
+    return pd.concat(fragmentos, ignore_index=True) if fragmentos else pd.DataFrame()
+
+
+def medir_tabla(engine, tabla, df, metodos):
+    """
+    Inserta la muestra con cada método en una copia de la tabla.
+
+    Returns:
+        dict: Método -> filas por segundo, o el texto del error. Si un método
+            cayó a otro (LOAD DATA deshabilitado), se informa como error.
+    """
+    from scripts.bulk_writer import escribir_masivo
+
+    quote = engine.dialect.identifier_preparer.quote
+    nombre_copia = tabla[: 64 - len(SUFIJO)] + SUFIJO
+    copia = quote(nombre_copia)
+    resultados = {}
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS {copia}"))
+        connection.execute(text(f"CREATE TABLE {copia} LIKE {quote(tabla)}"))
+    try:
+        for metodo in metodos:
+            with engine.begin() as connection:
+                connection.execute(text(f"TRUNCATE TABLE {copia}"))
+            try:
+                inicio = time.perf_counter()
+                with engine.begin() as connection:
+                    usado = escribir_masivo(connection, df, nombre_copia, metodo)
+                segundos = time.perf_counter() - inicio
+            except Exception as e:
+                resultados[metodo] = f"ERROR: {e}"
+                continue
+            if usado != metodo:
+                resultados[metodo] = f"no disponible (se usó {usado})"
+                continue
+            resultados[metodo] = len(df) / segundos if segundos else None
+    finally:
+        with engine.begin() as connection:
+            connection.execute(text(f"DROP TABLE IF EXISTS {copia}"))
+    return resultados
+
+
+def main():
+    from scripts.bulk_writer import BACKENDS, guardar_registro
+    from scripts.config import ConfigBasic
+    from scripts.conexion import DataBaseConnection
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database", required=True, help="Base de datos del tenant (conf_empresas.name)")
+    parser.add_argument("--tabla", action="append", required=True)
+    parser.add_argument("--filas", type=int, default=200000)
+    parser.add_argument("--metodo", choices=BACKENDS, action="append")
+    parser.add_argument("--no-registrar", action="store_true", help="No guardar el método más rápido")
+    args = parser.parse_args()
+
+    config = ConfigBasic(args.database).config
+    db_connection = DataBaseConnection(config=config)
+    engine = db_connection.engine_mysql_bi
+    metodos = args.metodo or list(BACKENDS)
+
+    for tabla in args.tabla:
+        df = muestra(db_connection, tabla, args.filas)
+        if df.empty:
+            print(f"{tabla}: sin filas para la muestra")
+            continue
+        print(f"{tabla}: {len(df):,} filas, {len(df.columns)} columnas")
+        resultados = medir_tabla(engine, tabla, df, metodos)
+        for metodo, valor in resultados.items():
+            if isinstance(valor, (int, float)):
+                print(f"  {metodo:<14} {valor:>12,.0f} filas/s")
+            else:
+                print(f"  {metodo:<14} {valor}")
+        medidos = {m: v for m, v in resultados.items() if isinstance(v, (int, float))}
+        if medidos and not args.no_registrar:
+            mejor = max(medidos, key=medidos.get)
+            guardar_registro(tabla, mejor, medidos[mejor])
+            print(f"  -> {mejor} registrado para {tabla}")
+
+
+if __name__ == "__main__":
+    main()
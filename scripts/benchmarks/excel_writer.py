@@ -0,0 +1,179 @@
+"""
+Compara la escritura de Excel de scripts.excel_writer con los métodos anteriores.
+
+Cada método se ejecuta en un proceso nuevo sobre los mismos datos sintéticos
+(enteros, decimales, textos, fechas y fechas con hora, con nulos), generados por
+fragmentos de 50.000 filas como los entrega DataBaseConnection.stream_query. Se
+reporta filas por segundo y el pico de memoria residente del proceso.
+
+Métodos:
+    openpyxl_celdas   CuboVentas anterior: iterrows + WriteOnlyCell por valor.
+    pandas_to_excel   InterfaceContable anterior: to_excel(startrow=...) sobre pd.ExcelWriter.
+    libro_excel       LibroExcel (xlsxwriter constant_memory, escritores por columna).
+
+Uso (desde la raíz del proyecto):
+
+    python -m scripts.benchmarks.excel_writer
+    python -m scripts.benchmarks.excel_writer --filas 500000 --metodo libro_excel
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+CHUNKSIZE = 50000
+
+
+def fragmentos(filas, chunksize=CHUNKSIZE):
+    """
+    Genera los datos de prueba por fragmentos, siempre los mismos para una cantidad de filas.
+    """
+    import datetime
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    productos = np.array([f"PRODUCTO {i:05d} - PRESENTACION X 12" for i in range(2000)], dtype=object)
+    inicio = datetime.date(2024, 1, 1)
+    fechas = np.array([inicio + datetime.timedelta(days=i) for i in range(366)], dtype=object)
+    generadas = 0
+    while generadas < filas:
+        n = min(chunksize, filas - generadas)
+        valor = rng.normal(100000, 25000, n).round(2)
+        valor[rng.random(n) < 0.05] = np.nan
+        yield pd.DataFrame(
+            {
+                "idProducto": rng.integers(1, 99999, n),
+                "nmProducto": productos[rng.integers(0, len(productos), n)],
+                "dtContabilizacion": fechas[rng.integers(0, len(fechas), n)],
+                "dtCreacion": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 31536000, n), unit="s"),
+                "vlVenta": valor,
+                "nbCantidad": rng.integers(-5, 500, n),
+            }
+        )
+        generadas += n
+
+
+def openpyxl_celdas(ruta, filas):
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title="Hoja")
+    encabezado = False
+    for chunk in fragmentos(filas):
+        if not encabezado:
+            ws.append(chunk.columns.tolist())
+            encabezado = True
+        for index, row in chunk.iterrows():
+            ws.append([WriteOnlyCell(ws, value=value) for value in row])
+    wb.save(ruta)
+
+
+def pandas_to_excel(ruta, filas):
+    import pandas as pd
+
+    with pd.ExcelWriter(ruta, engine="xlsxwriter") as writer:
+        startrow = 0
+        for chunk in fragmentos(filas):
+            chunk.to_excel(
+                writer, sheet_name="Hoja", startrow=startrow, index=False, header=not bool(startrow)
+            )
+            startrow += len(chunk)
+
+
+def libro_excel(ruta, filas):
+    from scripts.excel_writer import LibroExcel
+
+    with LibroExcel(ruta) as libro:
+        libro.escribir_tabla("Hoja", fragmentos(filas))
+
+
+METODOS = {
+    "openpyxl_celdas": openpyxl_celdas,
+    "pandas_to_excel": pandas_to_excel,
+    "libro_excel": libro_excel,
+}
+
+
+def pico_memoria_mb():
+    """
+    Pico de memoria residente del proceso en MB, o None si no se puede medir.
+    """
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+def ejecutar_interno(metodo, filas):
+    """
+    Ejecuta un método en este proceso e imprime el resultado en JSON.
+    """
+    import pandas  # noqa: F401  (se carga antes de medir la memoria base)
+    import xlsxwriter  # noqa: F401
+    import openpyxl  # noqa: F401
+
+    base = pico_memoria_mb()
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "salida.xlsx")
+        inicio = time.perf_counter()
+        METODOS[metodo](ruta, filas)
+        segundos = time.perf_counter() - inicio
+        tamano = os.path.getsize(ruta)
+    pico = pico_memoria_mb()
+    print(
+        json.dumps(
+            {
+                "segundos": segundos,
+                "filas_por_segundo": filas / segundos if segundos else None,
+                "pico_mb": pico,
+                "incremento_mb": pico - base if pico is not None else None,
+                "tamano_mb": tamano / (1024 * 1024),
+            }
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--filas", type=int, default=200000)
+    parser.add_argument("--metodo", choices=sorted(METODOS), action="append")
+    parser.add_argument("--interno", choices=sorted(METODOS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno:
+        ejecutar_interno(args.interno, args.filas)
+        return
+
+    for metodo in args.metodo or METODOS:
+        proceso = subprocess.run(
+            [sys.executable, "-m", "scripts.benchmarks.excel_writer", "--interno", metodo, "--filas", str(args.filas)],
+            capture_output=True,
+            text=True,
+        )
+        if proceso.returncode != 0:
+            error = proceso.stderr.strip().splitlines()
+            print(f"{metodo:<16} ERROR: {error[-1] if error else proceso.returncode}")
+            continue
+        r = json.loads(proceso.stdout.strip().splitlines()[-1])
+        memoria = (
+            f"pico {r['pico_mb']:.0f} MB (+{r['incremento_mb']:.0f} MB)"
+            if r["pico_mb"] is not None
+            else "memoria no disponible"
+        )
+        print(
+            f"{metodo:<16} {r['filas_por_segundo']:>10,.0f} filas/s  {r['segundos']:7.1f} s  "
+            f"{memoria}  archivo {r['tamano_mb']:.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Mide el tiempo de arranque (importación) de los puntos de entrada del proyecto.
+
+Cada objetivo se ejecuta en un intérprete nuevo con `python -X importtime`, se toma
+el tiempo total de pared y se listan los módulos que más tardan en importarse.
+
+Uso (desde la raíz del proyecto):
+
+    python -m scripts.benchmarks.tiempo_arranque
+    python -m scripts.benchmarks.tiempo_arranque --repeticiones 5 --json arranque.json
+    python -m scripts.benchmarks.tiempo_arranque --objetivo main
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import datetime
+import statistics
+import subprocess
+
+SETTINGS = "adminbi.settings.prod"
+
+OBJETIVOS = {
+    # Proceso web de gunicorn
+    "wsgi": "import adminbi.wsgi",
+    # Arranque de `manage.py rqworker`: Django más los módulos de tareas que
+    # importan las vistas para encolar
+    "rqworker": (
+        "import django; django.setup(); "
+        "import django_rq, rq.worker, apps.home.tasks, apps.bi.tasks"
+    ),
+    # Lo que carga un work horse de RQ para su primer job de cubo
+    "tarea_cubo": "import django; django.setup(); import scripts.extrae_bi.cubo",
+    # Extractor empaquetado con PyInstaller (sin ejecutar Inicio().run())
+    "main": "import main",
+}
+
+
+def medir(codigo, repeticiones):
+    """
+    Ejecuta el código en intérpretes nuevos y mide el tiempo de arranque.
+
+    Args:
+        codigo (str): Código a ejecutar con `python -c`.
+        repeticiones (int): Número de ejecuciones.
+
+    Returns:
+        dict: Tiempos de pared (s), error si falló, y los módulos más lentos
+              (microsegundos acumulados) de la última ejecución.
+    """
+    entorno = dict(os.environ)
+    entorno.setdefault("DJANGO_SETTINGS_MODULE", SETTINGS)
+    tiempos = []
+    salida = ""
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        proceso = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", codigo],
+            capture_output=True,
+            text=True,
+            env=entorno,
+        )
+        tiempos.append(time.perf_counter() - inicio)
+        salida = proceso.stderr
+        if proceso.returncode != 0:
+            error = [l for l in salida.splitlines() if not l.startswith("import time:")]
+            return {"error": "\n".join(error[-3:]), "tiempos": tiempos, "modulos": []}
+    return {"error": None, "tiempos": tiempos, "modulos": modulos_lentos(salida)}
+
+
+def modulos_lentos(salida, limite=10):
+    """
+    Extrae de la salida de -X importtime los paquetes de primer nivel más lentos.
+    """
+    modulos = []
+    for linea in salida.splitlines():
+        if not linea.startswith("import time:") or "cumulative" in linea:
+            continue
+        _, acumulado, nombre = linea[len("import time:"):].split("|")
+        # Solo los módulos importados directamente (sin sangría) para no contar dos veces
+        if not nombre.startswith("  "):
+            modulos.append((int(acumulado), nombre.strip()))
+    modulos.sort(reverse=True)
+    return modulos[:limite]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--objetivo", choices=sorted(OBJETIVOS), action="append")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--json", help="Archivo donde se agregan los resultados")
+    args = parser.parse_args()
+
+    resultados = {}
+    for nombre in args.objetivo or OBJETIVOS:
+        resultado = medir(OBJETIVOS[nombre], args.repeticiones)
+        resultados[nombre] = resultado
+        if resultado["error"]:
+            print(f"{nombre:<12} ERROR: {resultado['error']}")
+            continue
+        mediana = statistics.median(resultado["tiempos"])
+        print(f"{nombre:<12} mediana {mediana:.3f}s  mínimo {min(resultado['tiempos']):.3f}s")
+        for acumulado, modulo in resultado["modulos"]:
+            print(f"    {acumulado / 1000:9.1f} ms  {modulo}")
+
+    if args.json:
+        historial = []
+        if os.path.exists(args.json):
+            with open(args.json) as f:
+                historial = json.load(f)
+        historial.append(
+            {
+                "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+                "python": sys.version.split()[0],
+                "resultados": resultados,
+            }
+        )
+        with open(args.json, "w") as f:
+            json.dump(historial, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
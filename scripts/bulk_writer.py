@@ -0,0 +1,293 @@
+import os
+import json
+import time
+import logging
+import tempfile
+import threading
+import weakref
+
+from scripts.staging import directorio_base
+
+# Métodos de escritura masiva en MySQL, del más rápido al más compatible:
+#   load_data     LOAD DATA LOCAL INFILE desde un TSV temporal.
+#   insert_multi  INSERT con muchas filas por sentencia, hasta max_allowed_packet.
+#   to_sql        DataFrame.to_sql de pandas.
+LOAD_DATA = "load_data"
+INSERT_MULTI = "insert_multi"
+TO_SQL = "to_sql"
+BACKENDS = (LOAD_DATA, INSERT_MULTI, TO_SQL)
+
+# Variable de entorno con el método por defecto (si no, el del registro del
+# benchmark para la tabla y si no load_data).
+ENV_BACKEND = "ADMINBI_BULK_BACKEND"
+# Variable de entorno con el archivo donde scripts.benchmarks.bulk_writer
+# registra el método más rápido por tabla.
+ENV_REGISTRO = "ADMINBI_BULK_REGISTRO"
+REGISTRO = os.path.join("media", "cache", "bulk_writer.json")
+
+# Errores de MySQL/PyMySQL que indican que LOAD DATA LOCAL no está habilitado
+# en el servidor o en el cliente; con ellos se pasa al siguiente método.
+ERRORES_LOCAL_INFILE = {1148, 1227, 2068, 3948}
+# Bytes que se dejan libres en cada sentencia INSERT por debajo de max_allowed_packet.
+MARGEN_PAQUETE = 64 * 1024
+NULO = "\\N"
+# Avisos de LOAD DATA que se muestran en el error cuando la carga los produce.
+MAX_AVISOS = 5
+_ESCAPES = {"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r", "\0": "\\0"}
+
+
+
+class ErrorCargaMasiva(Exception):
+    """
+    LOAD DATA LOCAL terminó con avisos: MySQL lo ejecuta como si tuviera IGNORE,
+    así que las llaves duplicadas y los valores que no se pueden convertir
+    (truncados, '' en una columna numérica) se omiten o se ajustan con un aviso
+    en vez de fallar.
+
+    Attributes:
+        avisos (list): (nivel, código, mensaje) de los primeros avisos.
+        total (int): Número total de avisos.
+    """
+
+    def __init__(self, tabla, avisos, total):
+        self.avisos = avisos
+        self.total = total
+        detalle = "; ".join(f"{codigo} {mensaje}" for _nivel, codigo, mensaje in avisos)
+        super().__init__(f"LOAD DATA en {tabla} produjo {total} avisos: {detalle}")
+
+
+_lock = threading.Lock()
+# Métodos que fallaron por configuración en un engine: engine -> set. Se
+# recuerda por engine y no por servidor porque local_infile es una opción del
+# cliente: en el mismo servidor el engine de BI lo tiene y los demás no.
+_deshabilitados = weakref.WeakKeyDictionary()
+_registro = None
+
+
+def ruta_registro():
+    return os.environ.get(ENV_REGISTRO) or REGISTRO
+
+
+def leer_registro():
+    """
+    Retorna el registro del benchmark: tabla -> {"backend", "filas_por_segundo", "fecha"}.
+    """
+    global _registro
+    if _registro is None:
+        try:
+            with open(ruta_registro(), encoding="utf-8") as archivo:
+                _registro = json.load(archivo)
+        except (OSError, ValueError):
+            _registro = {}
+    return _registro
+
+
+def guardar_registro(tabla, backend, filas_por_segundo):
+    """
+    Registra el método más rápido medido para una tabla.
+    """
+    global _registro
+    with _lock:
+        _registro = None
+        registro = dict(leer_registro())
+        registro[tabla] = {
+            "backend": backend,
+            "filas_por_segundo": filas_por_segundo,
+            "fecha": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        ruta = ruta_registro()
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump(registro, archivo, indent=2)
+        os.replace(temporal, ruta)
+        _registro = registro
+
+
+def backend_para(tabla, backend=None):
+    """
+    Elige el método: el solicitado, si no ADMINBI_BULK_BACKEND, si no el
+    registrado por el benchmark para la tabla y si no load_data.
+    """
+    for candidato in (
+        backend,
+        os.environ.get(ENV_BACKEND),
+        leer_registro().get(tabla, {}).get("backend"),
+    ):
+        if candidato in BACKENDS:
+            return candidato
+        if candidato:
+            logging.warning(f"Método de escritura {candidato} no reconocido")
+    return LOAD_DATA
+
+
+def _local_infile(connection):
+    """
+    Indica si la conexión se abrió con local_infile (ver scripts.conexion).
+
+    Con drivers distintos de PyMySQL se asume que sí y decide el servidor.
+    """
+    try:
+        from pymysql.constants import CLIENT
+    except ImportError:
+        return True
+    flags = getattr(connection.connection.dbapi_connection, "client_flag", None)
+    return flags is None or bool(flags & CLIENT.LOCAL_FILES)
+
+
+def _codigo_error(e):
+    original = getattr(e, "orig", e)
+    argumentos = getattr(original, "args", ())
+    return argumentos[0] if argumentos and isinstance(argumentos[0], int) else None
+
+
+def _texto(valor):
+    if isinstance(valor, bytes):
+        return valor.decode("utf-8", "replace")
+    if isinstance(valor, bool):
+        return str(int(valor))
+    return str(valor)
+
+
+def _columna_tsv(serie):
+    """
+    Convierte una columna al texto de LOAD DATA (\\N para nulos, escapes de MySQL).
+    """
+    import pandas as pd
+
+    nulos = serie.isna()
+    if pd.api.types.is_bool_dtype(serie):
+        texto = serie.astype("int64").astype(str)
+    elif pd.api.types.is_datetime64_any_dtype(serie):
+        texto = serie.dt.strftime("%Y-%m-%d %H:%M:%S.%f")
+    elif pd.api.types.is_numeric_dtype(serie):
+        texto = serie.astype(str)
+    else:
+        texto = serie.map(_texto)
+        texto = texto.str.translate(str.maketrans(_ESCAPES))
+    return texto.where(~nulos, NULO)
+
+
+def escribir_tsv(archivo, df):
+    """
+    Escribe el DataFrame en el formato por defecto de LOAD DATA: columnas
+    separadas por tabulador, filas por salto de línea, escapes con \\.
+    """
+    columnas = [_columna_tsv(df[c]) for c in df.columns]
+    lineas = columnas[0].str.cat(columnas[1:], sep="\t") if len(columnas) > 1 else columnas[0]
+    archivo.write("\n".join(lineas.tolist()).encode("utf-8"))
+    archivo.write(b"\n")
+
+
+def _load_data(connection, df, tabla):
+    quote = connection.dialect.identifier_preparer.quote
+    descriptor, ruta = tempfile.mkstemp(prefix="bulk_", suffix=".tsv", dir=directorio_base())
+    try:
+        with os.fdopen(descriptor, "wb") as archivo:
+            escribir_tsv(archivo, df)
+        cursor = connection.connection.dbapi_connection.cursor()
+        try:
+            cursor.execute(
+                f"LOAD DATA LOCAL INFILE %s INTO TABLE {quote(tabla)} "
+                "CHARACTER SET utf8mb4 "
+                "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' "
+                f"({', '.join(quote(c) for c in df.columns)})",
+                (ruta,),
+            )
+            _verificar_avisos(cursor, tabla)
+        finally:
+            cursor.close()
+    finally:
+        os.remove(ruta)
+
+
+def _verificar_avisos(cursor, tabla):
+    # Las filas omitidas o ajustadas por LOAD DATA solo quedan como avisos; se
+    # convierten en error para que la transacción se revierta como con INSERT
+    cursor.execute("SELECT @@warning_count")
+    total = int(cursor.fetchone()[0])
+    if not total:
+        return
+    cursor.execute(f"SHOW WARNINGS LIMIT {MAX_AVISOS}")
+    avisos = [tuple(fila) for fila in cursor.fetchall()]
+    if all(nivel == "Note" for nivel, _codigo, _mensaje in avisos) and total <= len(avisos):
+        return
+    raise ErrorCargaMasiva(tabla, avisos, total)
+
+
+def _insert_multi(connection, df, tabla):
+    import pandas as pd
+
+    quote = connection.dialect.identifier_preparer.quote
+    dbapi = connection.connection.dbapi_connection
+    cursor = dbapi.cursor()
+    try:
+        cursor.execute("SELECT @@max_allowed_packet")
+        paquete = int(cursor.fetchone()[0])
+        # PyMySQL agrupa executemany de un INSERT ... VALUES en sentencias de
+        # hasta max_stmt_length bytes
+        cursor.max_stmt_length = max(1024 * 1024, paquete - MARGEN_PAQUETE)
+        filas = df.astype(object).where(pd.notna(df), None).itertuples(index=False, name=None)
+        cursor.executemany(
+            f"INSERT INTO {quote(tabla)} ({', '.join(quote(c) for c in df.columns)}) "
+            f"VALUES ({', '.join(['%s'] * len(df.columns))})",
+            list(filas),
+        )
+    finally:
+        cursor.close()
+
+
+def _to_sql(connection, df, tabla):
+    df.to_sql(name=tabla, con=connection, if_exists="append", index=False)
+
+
+_METODOS = {LOAD_DATA: _load_data, INSERT_MULTI: _insert_multi, TO_SQL: _to_sql}
+
+
+def escribir_masivo(connection, df, tabla, backend=None):
+    """
+    Inserta un DataFrame en una tabla existente de MySQL con el método más rápido disponible.
+
+    Si el engine se creó sin local_infile se usa insert_multi directamente; si
+    el servidor lo rechaza, se usa insert_multi y se recuerda para ese engine
+    durante la vida del proceso.
+    Los demás errores (datos inválidos, llaves duplicadas) se propagan; con
+    load_data, que los deja como avisos, se propaga ErrorCargaMasiva.
+
+    Args:
+        connection (sqlalchemy.engine.Connection): Conexión; la escritura queda
+            en su transacción.
+        df (DataFrame): Filas a insertar; sus columnas deben existir en la tabla.
+        tabla (str): Tabla destino.
+        backend (str, opcional): Uno de BACKENDS; ver backend_para().
+
+    Returns:
+        str: Método con que se escribió.
+
+    Raises:
+        ErrorCargaMasiva: Si LOAD DATA omitió o ajustó filas.
+    """
+    if df.empty:
+        return None
+    backend = backend_para(tabla, backend)
+    engine = connection.engine
+    url = engine.url
+    for metodo in BACKENDS[BACKENDS.index(backend):]:
+        if metodo in _deshabilitados.get(engine, ()):
+            continue
+        if metodo == LOAD_DATA and not _local_infile(connection):
+            continue
+        try:
+            _METODOS[metodo](connection, df, tabla)
+            return metodo
+        except Exception as e:
+            if metodo == LOAD_DATA and _codigo_error(e) in ERRORES_LOCAL_INFILE:
+                logging.warning(
+                    f"LOAD DATA LOCAL no disponible en {url.host}/{url.database}: {e}; "
+                    f"se usa {INSERT_MULTI}"
+                )
+                with _lock:
+                    _deshabilitados.setdefault(engine, set()).add(metodo)
+                continue
+            raise
+    return None
@@ -0,0 +1,380 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import datetime
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: el bloqueo entre procesos queda desactivado
+    fcntl = None
+
+# Variable de entorno con el directorio de la caché; por defecto media/cache, que
+# comparten el servidor web y los workers de RQ.
+ENV_DIRECTORIO = "ADMINBI_CACHE_DIR"
+DIRECTORIO_CACHE = os.path.join("media", "cache")
+# Variable de entorno con los segundos que un archivo sirve desde su creación.
+ENV_TTL = "ADMINBI_CACHE_TTL"
+TTL_ARTEFACTOS = 24 * 3600
+# Variable de entorno con el espacio máximo por tenant, en MB. Al superarlo se
+# eliminan los archivos usados hace más tiempo.
+ENV_CUOTA = "ADMINBI_CACHE_CUOTA_MB"
+CUOTA_MB = 2048
+
+# Días que se conservan los registros de powerbi_adm.conf_cambio_datos.
+RETENCION_CAMBIOS = 60
+
+MANIFIESTO = "manifiesto.json"
+# Subcarpeta del tenant con las particiones diarias de scripts.particiones.
+PARTICIONES = "particiones"
+BLOQUEO = ".lock"
+
+
+def _entero_entorno(variable, defecto):
+    try:
+        return max(0, int(os.environ.get(variable, defecto)))
+    except ValueError:
+        return defecto
+
+
+class CacheArtefactos:
+    """
+    Caché en disco de los archivos generados por CuboVentas, InterfaceContable e InterfacePlano.
+
+    Cada archivo se identifica con el sha256 de tenant, tipo de exportación, rango
+    de fechas, procedimientos configurados y la marca de agua de los datos del
+    tenant. Mientras esa marca no cambie, la misma solicitud retorna el archivo ya
+    generado sin ejecutar los procedimientos.
+
+    La marca de agua es el id del último registro del tenant en
+    powerbi_adm.conf_cambio_datos, que cada extracción o cargue agrega al terminar
+    (registrar_cambio_datos). Vive en la base de configuración y no en disco
+    porque la extracción nocturna de main.py corre en otro equipo: el servidor
+    web y los workers ven el cambio en la siguiente solicitud y eliminan ahí los
+    archivos de marcas anteriores.
+
+    Cada tenant tiene su carpeta con un manifiesto:
+
+        media/cache/<tenant>/manifiesto.json   clave -> archivo, tamaño, marca, fechas y resultado
+        media/cache/<tenant>/<clave>.<ext>     archivos generados
+
+    Los archivos vencen TTL segundos después de creados y, si la carpeta del tenant
+    supera su cuota, se eliminan los de acceso más antiguo (LRU). El manifiesto se
+    modifica bajo un bloqueo de archivo, porque lo comparten varios workers.
+
+    Attributes:
+        directorio (str): Directorio raíz de la caché.
+        ttl (int): Segundos de vigencia de un archivo.
+        cuota (int): Bytes máximos por tenant.
+    """
+
+    def __init__(self, directorio=None, ttl=None, cuota_mb=None):
+        self.directorio = directorio or os.environ.get(ENV_DIRECTORIO) or DIRECTORIO_CACHE
+        self.ttl = _entero_entorno(ENV_TTL, TTL_ARTEFACTOS) if ttl is None else ttl
+        cuota_mb = _entero_entorno(ENV_CUOTA, CUOTA_MB) if cuota_mb is None else cuota_mb
+        self.cuota = cuota_mb * 1024 * 1024
+        self._lock = threading.Lock()
+
+    def _carpeta(self, tenant):
+        # El tenant es un nombre de base de datos; se descartan separadores de ruta
+        return os.path.join(self.directorio, os.path.basename(str(tenant)))
+
+    @contextmanager
+    def _bloqueo(self, tenant):
+        carpeta = self._carpeta(tenant)
+        os.makedirs(carpeta, exist_ok=True)
+        with self._lock, open(os.path.join(carpeta, BLOQUEO), "a") as archivo:
+            if fcntl is not None:
+                fcntl.flock(archivo, fcntl.LOCK_EX)
+            try:
+                yield carpeta
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(archivo, fcntl.LOCK_UN)
+
+    def _leer_manifiesto(self, carpeta):
+        try:
+            with open(os.path.join(carpeta, MANIFIESTO), encoding="utf-8") as archivo:
+                return json.load(archivo)
+        except (OSError, ValueError):
+            return {}
+
+    def _escribir_manifiesto(self, carpeta, manifiesto):
+        ruta = os.path.join(carpeta, MANIFIESTO)
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump(manifiesto, archivo, default=str)
+        os.replace(temporal, ruta)
+
+    def _engine_conf(self):
+        # Se importa al usarse: las vistas importan este módulo solo para es_artefacto
+        from scripts.conexion import Conexion
+        from scripts.secretos import get_secret
+
+        return Conexion.ConexionMariadb3(
+            str(get_secret("DB_USERNAME")),
+            str(get_secret("DB_PASS")),
+            str(get_secret("DB_HOST")),
+            int(get_secret("DB_PORT")),
+            str(get_secret("DB_NAME")),
+        )
+
+    def marca_agua(self, tenant):
+        """
+        Retorna la marca de agua de los datos del tenant.
+
+        Returns:
+            str: Id del último cambio registrado ("" si nunca se registró), o None
+                si no se pudo consultar; en ese caso no se usa la caché.
+        """
+        from sqlalchemy import text
+
+        try:
+            with self._engine_conf().connect() as connection:
+                marca = connection.execute(
+                    text("SELECT MAX(id) FROM powerbi_adm.conf_cambio_datos WHERE name = :name"),
+                    {"name": str(tenant)},
+                ).scalar()
+        except Exception as e:
+            logging.warning(f"No se pudo consultar la marca de agua de {tenant}: {e}")
+            return None
+        return "" if marca is None else str(marca)
+
+    def cambios(self, tenant):
+        """
+        Retorna los cambios de datos registrados del tenant.
+
+        Returns:
+            list: (id, IdtReporteIni, IdtReporteFin) en orden de id; las fechas son
+                None cuando el cambio no tiene rango.
+        """
+        from sqlalchemy import text
+
+        with self._engine_conf().connect() as connection:
+            filas = connection.execute(
+                text(
+                    "SELECT id, IdtReporteIni, IdtReporteFin FROM powerbi_adm.conf_cambio_datos "
+                    "WHERE name = :name ORDER BY id"
+                ),
+                {"name": str(tenant)},
+            ).all()
+        return [tuple(fila) for fila in filas]
+
+    def actualizar_marca_agua(self, tenant, IdtReporteIni=None, IdtReporteFin=None):
+        """
+        Registra que los datos del tenant cambiaron (nueva fila en conf_cambio_datos).
+
+        Los archivos en caché no se eliminan aquí: quien registra puede estar en otro
+        equipo (main.py). Los descarta buscar() o guardar() en el servidor que los
+        tiene, al ver una marca distinta. También se eliminan los registros de más
+        de RETENCION_CAMBIOS días, salvo el que se acaba de agregar.
+
+        Args:
+            tenant (str): Nombre de la base de datos del tenant.
+            IdtReporteIni (str, opcional): Primer día con datos actualizados.
+            IdtReporteFin (str, opcional): Último día con datos actualizados. Sin
+                rango el cambio afecta todos los días.
+        """
+        from sqlalchemy import text
+
+        ahora = datetime.datetime.now()
+        rango = bool(IdtReporteIni and IdtReporteFin)
+        with self._engine_conf().begin() as connection:
+            marca = connection.execute(
+                text(
+                    "INSERT INTO powerbi_adm.conf_cambio_datos "
+                    "(name, IdtReporteIni, IdtReporteFin, dtRegistro) "
+                    "VALUES (:name, :IdtReporteIni, :IdtReporteFin, :ahora)"
+                ),
+                {
+                    "name": str(tenant),
+                    "IdtReporteIni": str(IdtReporteIni)[:10] if rango else None,
+                    "IdtReporteFin": str(IdtReporteFin)[:10] if rango else None,
+                    "ahora": ahora,
+                },
+            ).lastrowid
+            connection.execute(
+                text(
+                    "DELETE FROM powerbi_adm.conf_cambio_datos "
+                    "WHERE name = :name AND dtRegistro < :limite AND id < :marca"
+                ),
+                {
+                    "name": str(tenant),
+                    "limite": ahora - datetime.timedelta(days=RETENCION_CAMBIOS),
+                    "marca": marca,
+                },
+            )
+        logging.info(f"Marca de agua de {tenant} actualizada a {marca}")
+
+    def clave(self, tenant, tipo, IdtReporteIni, IdtReporteFin, procedimientos):
+        """
+        Calcula la clave de un archivo.
+
+        Args:
+            tenant (str): Nombre de la base de datos del tenant.
+            tipo (str): Tipo de exportación ("cubo", "interface", "plano").
+            IdtReporteIni (str): Fecha inicial del reporte.
+            IdtReporteFin (str): Fecha final del reporte.
+            procedimientos (list): Procedimientos y hojas que determinan el contenido.
+
+        Returns:
+            str: sha256 en hexadecimal, o None si no se pudo consultar la marca de
+                agua (la solicitud se genera sin caché).
+        """
+        marca = self.marca_agua(tenant)
+        if marca is None:
+            return None
+        contenido = json.dumps(
+            [str(tenant), tipo, str(IdtReporteIni), str(IdtReporteFin), procedimientos, marca],
+            default=str,
+        )
+        return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+    def buscar(self, tenant, clave):
+        """
+        Retorna el resultado guardado para la clave, o None si no está o venció.
+
+        También elimina los archivos generados con una marca de agua anterior.
+
+        Returns:
+            dict: Resultado original del exportador, con file_path apuntando a la caché
+                y "cache": True.
+        """
+        marca = self.marca_agua(tenant)
+        with self._bloqueo(tenant) as carpeta:
+            manifiesto = self._leer_manifiesto(carpeta)
+            if self._descartar_marcas(carpeta, manifiesto, marca):
+                self._escribir_manifiesto(carpeta, manifiesto)
+            entrada = manifiesto.get(clave)
+            if entrada is None:
+                return None
+            ruta = os.path.join(carpeta, entrada["archivo"])
+            if time.time() - entrada["creado"] > self.ttl or not os.path.exists(ruta):
+                self._eliminar_archivo(carpeta, entrada)
+                del manifiesto[clave]
+                self._escribir_manifiesto(carpeta, manifiesto)
+                return None
+            entrada["ultimo_acceso"] = time.time()
+            self._escribir_manifiesto(carpeta, manifiesto)
+        logging.info(f"Archivo {entrada['resultado'].get('file_name')} servido desde la caché")
+        return dict(entrada["resultado"], file_path=ruta, cache=True)
+
+    def guardar(self, tenant, clave, resultado):
+        """
+        Mueve a la caché el archivo de un resultado exitoso.
+
+        Args:
+            tenant (str): Nombre de la base de datos del tenant.
+            clave (str): Clave calculada con clave().
+            resultado (dict): Resultado del exportador con file_path y file_name.
+
+        Returns:
+            dict: El resultado con file_path apuntando a la caché. Si no se pudo
+                guardar, el resultado sin cambios.
+        """
+        origen = resultado["file_path"]
+        archivo = clave + os.path.splitext(origen)[1]
+        marca = self.marca_agua(tenant)
+        try:
+            with self._bloqueo(tenant) as carpeta:
+                ruta = os.path.join(carpeta, archivo)
+                shutil.move(origen, ruta)
+                ahora = time.time()
+                manifiesto = self._leer_manifiesto(carpeta)
+                self._descartar_marcas(carpeta, manifiesto, marca)
+                manifiesto[clave] = {
+                    "archivo": archivo,
+                    "tamano": os.path.getsize(ruta),
+                    "marca": marca,
+                    "creado": ahora,
+                    "ultimo_acceso": ahora,
+                    "resultado": dict(resultado, file_path=ruta),
+                }
+                self._desalojar(carpeta, manifiesto, conservar=clave)
+                self._escribir_manifiesto(carpeta, manifiesto)
+        except Exception as e:
+            logging.warning(f"No se pudo guardar {origen} en la caché: {e}")
+            return resultado
+        return dict(resultado, file_path=ruta)
+
+    def _eliminar_archivo(self, carpeta, entrada):
+        try:
+            os.remove(os.path.join(carpeta, entrada["archivo"]))
+        except OSError:
+            pass
+
+    def _descartar_marcas(self, carpeta, manifiesto, marca):
+        """
+        Elimina las entradas generadas con una marca de agua distinta de `marca`.
+
+        Returns:
+            bool: True si se eliminó alguna entrada.
+        """
+        if marca is None:
+            return False
+        vencidas = [c for c, e in manifiesto.items() if e.get("marca") != marca]
+        for clave in vencidas:
+            self._eliminar_archivo(carpeta, manifiesto.pop(clave))
+        if vencidas:
+            logging.info(f"{len(vencidas)} archivos de una marca de agua anterior descartados")
+        return bool(vencidas)
+
+    def _desalojar(self, carpeta, manifiesto, conservar=None):
+        """
+        Elimina las entradas vencidas y, mientras se supere la cuota, las de acceso más antiguo.
+        """
+        limite = time.time() - self.ttl
+        for clave in [c for c, e in manifiesto.items() if e["creado"] < limite]:
+            self._eliminar_archivo(carpeta, manifiesto.pop(clave))
+
+        total = sum(e["tamano"] for e in manifiesto.values())
+        for clave, entrada in sorted(manifiesto.items(), key=lambda item: item[1]["ultimo_acceso"]):
+            if total <= self.cuota:
+                break
+            if clave == conservar:
+                continue
+            self._eliminar_archivo(carpeta, manifiesto.pop(clave))
+            total -= entrada["tamano"]
+            logging.info(f"Archivo {entrada['archivo']} desalojado de la caché")
+
+    def desalojar(self, tenant):
+        """
+        Aplica el TTL y la cuota a la caché del tenant.
+        """
+        with self._bloqueo(tenant) as carpeta:
+            manifiesto = self._leer_manifiesto(carpeta)
+            self._desalojar(carpeta, manifiesto)
+            self._escribir_manifiesto(carpeta, manifiesto)
+
+    def es_artefacto(self, ruta):
+        """
+        Indica si la ruta está dentro de la caché (no debe eliminarse desde las vistas).
+        """
+        raiz = os.path.abspath(self.directorio)
+        try:
+            return os.path.commonpath([raiz, os.path.abspath(ruta)]) == raiz
+        except ValueError:  # rutas en unidades distintas (Windows)
+            return False
+
+
+cache_artefactos = CacheArtefactos()
+
+
+def registrar_cambio_datos(tenant, IdtReporteIni=None, IdtReporteFin=None):
+    """
+    Actualiza la marca de agua del tenant después de escribir en sus tablas de BI.
+
+    La llaman los procesos que cargan datos (extracción nocturna de main.py,
+    extracción desde la web, cargues de zip, planos e infoventas), no las tareas
+    de RQ, para que los archivos en caché no sobrevivan a ninguna carga. Un error
+    se registra y no se propaga: los datos ya quedaron cargados. Las particiones
+    diarias (scripts.particiones) comparan su marca con estos registros.
+    """
+    try:
+        cache_artefactos.actualizar_marca_agua(tenant, IdtReporteIni, IdtReporteFin)
+    except Exception as e:
+        logging.warning(f"No se pudo actualizar la marca de agua de {tenant}: {e}")
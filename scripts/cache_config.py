@@ -0,0 +1,158 @@
+import json
+import time
+import threading
+import logging
+
+# Segundos que una configuración vive en la memoria del proceso. Es corto porque
+# la invalidación desde el admin solo limpia de inmediato el proceso que guardó;
+# los demás procesos (gunicorn, workers de RQ) la ven expirada como máximo en este tiempo.
+TTL_LOCAL = 60
+# Segundos que una configuración vive en Redis.
+TTL_REDIS = 900
+# Prefijo de las claves en Redis.
+PREFIJO_REDIS = "adminbi:conf"
+
+
+class CacheConfig:
+    """
+    Caché de las configuraciones de tenant (snapshots de powerbi_adm.conf_*).
+
+    Guarda cada snapshot en la memoria del proceso y en Redis (cuando Django y
+    django_rq están disponibles). Los campos privados (credenciales) no se
+    escriben en Redis: solo viven en la memoria del proceso y, cuando el snapshot
+    viene de Redis, se consultan aparte. La invalidación incrementa un número de
+    generación en Redis, de modo que todas las claves anteriores dejan de usarse
+    sin tener que buscarlas ni borrarlas una por una.
+
+    Attributes:
+        locales (dict): Snapshots en memoria, clave -> (expira, valor).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.locales = {}
+        self._conexion_redis = None
+        self._generacion_local = 0
+
+    def _redis(self):
+        """
+        Retorna la conexión a Redis de django_rq, o None si no está disponible.
+
+        Los scripts también se ejecutan fuera de Django (main.py, pruebas manuales),
+        en cuyo caso la caché funciona solo en memoria.
+        """
+        if self._conexion_redis is None:
+            try:
+                from django.conf import settings
+
+                if not settings.configured or not getattr(settings, "RQ_QUEUES", None):
+                    raise RuntimeError("RQ_QUEUES no está configurado")
+                import django_rq
+
+                self._conexion_redis = django_rq.get_connection("default")
+            except Exception as e:
+                logging.info(f"Caché de configuración solo en memoria: {e}")
+                self._conexion_redis = False
+        return self._conexion_redis or None
+
+    def conexion_redis(self):
+        """
+        Retorna la conexión a Redis que usa la caché, o None si no está disponible.
+
+        La usan otros módulos que necesitan estado compartido entre workers
+        (scripts.ejecucion_hojas).
+        """
+        return self._redis()
+
+    def _generacion(self):
+        redis = self._redis()
+        if redis is None:
+            return self._generacion_local
+        try:
+            return int(redis.get(f"{PREFIJO_REDIS}:generacion") or 0)
+        except Exception as e:
+            logging.warning(f"No se pudo leer la generación de configuración en Redis: {e}")
+            return self._generacion_local
+
+    def obtener(self, clave, cargador, privados=(), cargador_privados=None):
+        """
+        Retorna el snapshot para la clave, cargándolo con `cargador` si no está en caché.
+
+        Args:
+            clave (str): Identificador del snapshot (tenant, rango de fechas, día).
+            cargador (callable): Función sin argumentos que consulta la base de datos
+                y retorna un diccionario, o None si no hay datos.
+            privados (iterable): Campos que no se guardan en Redis.
+            cargador_privados (callable, opcional): Función sin argumentos que retorna
+                solo los campos privados (o None si falla); se usa cuando el snapshot
+                viene de Redis.
+
+        Returns:
+            dict: Copia del snapshot (los llamadores pueden modificarla libremente), o None.
+        """
+        ahora = time.monotonic()
+        entrada = self.locales.get(clave)
+        if entrada is not None and entrada[0] > ahora:
+            return dict(entrada[1])
+
+        generacion = self._generacion()
+        clave_redis = f"{PREFIJO_REDIS}:{generacion}:{clave}"
+        valor = self._leer_redis(clave_redis)
+
+        if valor is None:
+            valor = cargador()
+            if valor is None:
+                return None
+            self._escribir_redis(
+                clave_redis, {campo: v for campo, v in valor.items() if campo not in privados}
+            )
+        elif privados:
+            secretos = cargador_privados() if cargador_privados else cargador()
+            if secretos is None:
+                return None
+            valor.update({campo: v for campo, v in secretos.items() if campo in privados})
+
+        with self._lock:
+            self.locales[clave] = (ahora + TTL_LOCAL, valor)
+        return dict(valor)
+
+    def _leer_redis(self, clave_redis):
+        redis = self._redis()
+        if redis is None:
+            return None
+        try:
+            contenido = redis.get(clave_redis)
+            return json.loads(contenido) if contenido else None
+        except Exception as e:
+            logging.warning(f"No se pudo leer la configuración en Redis: {e}")
+            return None
+
+    def _escribir_redis(self, clave_redis, valor):
+        redis = self._redis()
+        if redis is None:
+            return
+        try:
+            redis.set(clave_redis, json.dumps(valor, default=str), ex=TTL_REDIS)
+        except Exception as e:
+            logging.warning(f"No se pudo guardar la configuración en Redis: {e}")
+
+    def invalidar(self):
+        """
+        Descarta todos los snapshots, en este proceso y en Redis.
+
+        Se llama desde las señales de apps.permisos cuando se guarda o elimina una
+        fila de conf_empresas, conf_server, conf_tipo o conf_dt.
+        """
+        with self._lock:
+            self.locales.clear()
+            self._generacion_local += 1
+        redis = self._redis()
+        if redis is not None:
+            try:
+                redis.incr(f"{PREFIJO_REDIS}:generacion")
+            except Exception as e:
+                logging.warning(f"No se pudo invalidar la configuración en Redis: {e}")
+        logging.info("Caché de configuración invalidada")
+
+
+cache_config = CacheConfig()
@@ -1,20 +1,136 @@
+import os
 import sys
+import threading
+import logging
+from functools import cached_property
 import sqlalchemy
 import pymysql
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+from scripts.secretos import get_secret
 
-class Conexion:
+# Conexiones permanentes que conserva cada engine (por base de datos).
+POOL_SIZE = 5
+# Conexiones adicionales que un engine puede abrir de forma temporal.
+MAX_OVERFLOW = 5
+# Máximo de conexiones en uso simultáneo contra un mismo host dentro de un proceso
+# (todas las bases de datos y tenants del proceso que viven en el mismo servidor de
+# conf_server comparten este cupo). Cada work-horse de RQ tiene el suyo; el límite
+# entre jobs lo ponen los cupos de scripts.ejecucion_hojas.
+MAX_CONEXIONES_HOST = 20
+# Segundos que se espera por una conexión libre antes de fallar.
+POOL_TIMEOUT = 300
+# Segundos que puede vivir una conexión antes de ser reciclada. Debe ser menor
+# que el wait_timeout del servidor para no recibir conexiones cerradas.
+POOL_RECYCLE = 3600
+# Variable de entorno para desactivar LOAD DATA LOCAL INFILE en el cliente
+# (scripts.bulk_writer); "0" lo desactiva. El servidor también debe permitirlo.
+# Solo se habilita en el engine de la base BI, el único donde escribe
+# bulk_writer: un cliente con local_infile envía cualquier archivo local que el
+# servidor le pida, así que Sidis y la base de configuración no lo tienen.
+ENV_LOCAL_INFILE = "ADMINBI_LOCAL_INFILE"
+
+
+class PoolPorHost(QueuePool):
+    """
+    QueuePool que además respeta un cupo de conexiones en uso por host.
+
+    Cada engine conserva su propio pool (uno por base de datos), pero todos los
+    engines del proceso que apuntan al mismo host comparten el semáforo
+    `limite_host`, de modo que los tenants alojados en el mismo servidor no pueden
+    superar juntos MAX_CONEXIONES_HOST conexiones simultáneas por proceso.
+    """
+
+    limite_host = None
 
-    def ConexionMariadb3(user,password,host,port,database):
-        # Conectar con la Plataforma Mariadb
+    def _do_get(self):
+        if self.limite_host is not None and not self.limite_host.acquire(
+            timeout=self._timeout
+        ):
+            raise exc.TimeoutError(
+                f"Se alcanzó el límite de {MAX_CONEXIONES_HOST} conexiones "
+                f"simultáneas para el host, tiempo de espera {self._timeout}s"
+            )
+        try:
+            return super()._do_get()
+        except BaseException:
+            if self.limite_host is not None:
+                self.limite_host.release()
+            raise
+
+    def _do_return_conn(self, record):
         try:
-            connect_args = {}
-            pool = sqlalchemy.create_engine(
-            # Equivalent URL:
-            # mariadb+mariadbconnector://<db_user>:<db_pass>@<db_host>:<db_port>/<db_name>
-            # drivername="postgresql+pg8000", # en caso de requerir para postgresql
+            super()._do_return_conn(record)
+        finally:
+            if self.limite_host is not None:
+                self.limite_host.release()
+
+    def recreate(self):
+        # engine.dispose() recrea el pool; el nuevo debe seguir compartiendo el cupo del host
+        pool = super().recreate()
+        pool.limite_host = self.limite_host
+        return pool
+
+
+class RegistroEngines:
+    """
+    Registro de engines SQLAlchemy compartidos por todo el proceso.
+
+    Los engines se crean una sola vez por combinación de servidor, credenciales y
+    base de datos, y se reutilizan en cada llamada posterior. Así los jobs de RQ y
+    las vistas reutilizan conexiones ya autenticadas en lugar de abrir un engine
+    (y un pool) nuevo por cada DataBaseConnection o consulta de configuración.
+
+    Attributes:
+        engines (dict): Engines registrados, indexados por
+            (host, port, user, password, database, local_infile).
+        limites_host (dict): Semáforos de conexiones en uso, indexados por (host, port).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.engines = {}
+        self.limites_host = {}
+
+    def obtener_engine(self, user, password, host, port, database, local_infile=False):
+        """
+        Retorna el engine registrado para los parámetros dados, creándolo si no existe.
+
+        Args:
+            user (str): Usuario de la base de datos.
+            password (str): Contraseña del usuario.
+            host (str): Host del servidor.
+            port (int): Puerto del servidor.
+            database (str): Nombre de la base de datos.
+            local_infile (bool): Si el cliente permite LOAD DATA LOCAL INFILE.
+
+        Returns:
+            sqlalchemy.engine.base.Engine: Engine compartido para esa combinación.
+        """
+        clave = (str(host), int(port), str(user), str(password), str(database), bool(local_infile))
+        engine = self.engines.get(clave)
+        if engine is not None:
+            return engine
+
+        with self._lock:
+            engine = self.engines.get(clave)
+            if engine is None:
+                engine = self._crear_engine(*clave)
+                self.engines[clave] = engine
+                logging.info(
+                    f"Engine registrado para {user}@{host}:{port}/{database} "
+                    f"({len(self.engines)} engines activos)"
+                )
+        return engine
+
+    def _crear_engine(self, host, port, user, password, database, local_infile):
+        limite = self.limites_host.get((host, port))
+        if limite is None:
+            limite = threading.BoundedSemaphore(MAX_CONEXIONES_HOST)
+            self.limites_host[(host, port)] = limite
+
+        engine = sqlalchemy.create_engine(
             sqlalchemy.engine.url.URL.create(
-                #drivername="mariadb+mariadbconnector",
-                # drivername="mariadb+pymysql",
                 drivername="mysql+pymysql",
                 username=user,
                 password=password,
@@ -22,26 +138,298 @@ class Conexion:
                 port=port,
                 database=database,
             ),
-            connect_args=connect_args,
-            # Pool size is the maximum number of permanent connections to keep.
-            #pool_size=5,
-            # Temporarily exceeds the set pool_size if no connections are available.
-            #max_overflow=2,
-            # The total number of concurrent connections for your application will be
-            # a total of pool_size and max_overflow.
-            # SQLAlchemy automatically uses delays between failed connection attempts,
-            # but provides no arguments for configuration.
-            # 'pool_timeout' is the maximum number of seconds to wait when retrieving a
-            # new connection from the pool. After the specified amount of time, an
-            # exception will be thrown.
-            pool_timeout=28800,  # 900 seconds (15 minutos)
-            # 'pool_recycle' is the maximum number of seconds a connection can persist.
-            # Connections that live longer than the specified amount of time will be
-            # re-established
-            pool_recycle=28800,  # 1 hora
+            connect_args={"local_infile": local_infile},
+            poolclass=PoolPorHost,
+            pool_size=POOL_SIZE,
+            max_overflow=MAX_OVERFLOW,
+            pool_timeout=POOL_TIMEOUT,
+            pool_recycle=POOL_RECYCLE,
+            # Descarta conexiones cerradas por el servidor antes de entregarlas
+            pool_pre_ping=True,
+        )
+        engine.pool.limite_host = limite
+        return engine
+
+    def disponer(self, host=None, database=None):
+        """
+        Cierra y elimina del registro los engines que coinciden con el filtro.
+
+        Sin argumentos dispone todos los engines del proceso.
+
+        Args:
+            host (str, opcional): Solo los engines de este host.
+            database (str, opcional): Solo los engines de esta base de datos.
+
+        Returns:
+            int: Número de engines dispuestos.
+        """
+        with self._lock:
+            claves = [
+                clave
+                for clave in self.engines
+                if (host is None or clave[0] == str(host))
+                and (database is None or clave[4] == str(database))
+            ]
+            engines = [self.engines.pop(clave) for clave in claves]
+
+        for engine in engines:
+            engine.dispose()
+        return len(engines)
+
+    def estadisticas(self):
+        """
+        Retorna el estado de los pools registrados, sin incluir credenciales.
+
+        Returns:
+            list: Un diccionario por engine con host, base de datos y uso del pool.
+        """
+        with self._lock:
+            items = list(self.engines.items())
+
+        resultado = []
+        for (host, port, user, _password, database, _local_infile), engine in items:
+            pool = engine.pool
+            resultado.append(
+                {
+                    "host": host,
+                    "port": port,
+                    "user": user,
+                    "database": database,
+                    "size": pool.size(),
+                    "checked_in": pool.checkedin(),
+                    "checked_out": pool.checkedout(),
+                    "overflow": pool.overflow(),
+                    "status": pool.status(),
+                }
+            )
+        return resultado
+
+    def reiniciar_tras_fork(self):
+        """
+        Descarta en el proceso hijo las conexiones heredadas del padre.
+
+        Los workers de RQ hacen fork por cada job; los sockets heredados no se
+        pueden compartir entre procesos, así que el hijo abandona los pools sin
+        cerrarlos (el padre los sigue usando) y reinicia los cupos por host.
+        """
+        self._lock = threading.Lock()
+        for limite_clave in list(self.limites_host):
+            self.limites_host[limite_clave] = threading.BoundedSemaphore(
+                MAX_CONEXIONES_HOST
+            )
+        for (host, port, *_), engine in self.engines.items():
+            engine.dispose(close=False)
+            engine.pool.limite_host = self.limites_host[(host, port)]
+
+
+registro_engines = RegistroEngines()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=registro_engines.reiniciar_tras_fork)
+
+
+class Conexion:
+
+    def ConexionMariadb3(user,password,host,port,database,local_infile=False):
+        # Conectar con la Plataforma Mariadb usando el engine compartido del proceso
+        try:
+            pool = registro_engines.obtener_engine(
+                user, password, host, port, database, local_infile
             )
-            
         except Exception as e:
             print(f"Error al conectar con la Plataforma Mariadb: {e}")
             sys.exit(1)
-        return pool
\ No newline at end of file
+        return pool
+
+    def disponer_engines(host=None, database=None):
+        # Cierra los engines compartidos (todos, o los del host/base indicados)
+        return registro_engines.disponer(host=host, database=database)
+
+    def estadisticas_pools():
+        # Estado de los pools compartidos, útil para diagnosticar fugas de conexiones
+        return registro_engines.estadisticas()
+
+
+class DataBaseConnection:
+    """
+    Clase para manejar las conexiones a bases de datos MySQL.
+
+    Reúne los engines que usan los procesos de extracción y cargue: la base BI del
+    tenant (In), la base Sidis (Out) y la base de configuración powerbi_adm. Cada
+    engine se crea solo la primera vez que se usa y sale del registro compartido,
+    así que instanciar la clase no abre conexiones. Los resultados intermedios de
+    los jobs se guardan en scripts.staging.StagingJob.
+
+    Las consultas grandes se leen con cursores del lado del servidor (SSCursor), de
+    modo que en memoria solo existe el fragmento que se está procesando.
+
+    Attributes:
+        config (dict): Configuración utilizada para las conexiones a las bases de datos.
+        engine_mysql_bi (sqlalchemy.engine.base.Engine): Motor para la base de datos BI.
+        engine_mysql (sqlalchemy.engine.base.Engine): Alias de engine_mysql_bi.
+        engine_mysql_out (sqlalchemy.engine.base.Engine): Motor para la base de datos Sidis.
+        engine_mysql_conf (sqlalchemy.engine.base.Engine): Motor para la base de configuración.
+    """
+
+    def __init__(self, config, mysql_engine=None):
+        """
+        Inicializa la instancia de DataBaseConnection con la configuración proporcionada.
+
+        Args:
+            config (dict): Configuración para las conexiones a las bases de datos.
+            mysql_engine (sqlalchemy.engine.base.Engine, opcional): Motor que reemplaza
+                a los de BI y Sidis.
+        """
+        self.config = config
+        self.mysql_engine = mysql_engine
+
+    @cached_property
+    def engine_mysql_bi(self):
+        return self.mysql_engine or self.create_engine_mysql_bi()
+
+    @property
+    def engine_mysql(self):
+        return self.engine_mysql_bi
+
+    @cached_property
+    def engine_mysql_out(self):
+        return self.mysql_engine or self.create_engine_mysql_out()
+
+    @cached_property
+    def engine_mysql_conf(self):
+        return self.create_engine_mysql_conf()
+
+    def create_engine_mysql_bi(self):
+        """
+        Crea (o reutiliza) el motor de la base de datos BI del tenant.
+
+        Returns:
+            sqlalchemy.engine.base.Engine: Motor SQLAlchemy para la base de datos BI.
+        """
+        return self._engine_servidor("In", self.config.get("dbBi"))
+
+    def create_engine_mysql_out(self):
+        """
+        Crea (o reutiliza) el motor de la base de datos Sidis del tenant.
+
+        Returns:
+            sqlalchemy.engine.base.Engine: Motor SQLAlchemy para la base de datos Sidis.
+        """
+        return self._engine_servidor("Out", self.config.get("dbSidis"))
+
+    def create_engine_mysql_conf(self):
+        """
+        Crea (o reutiliza) el motor de la base de configuración definida en secret.json.
+
+        Returns:
+            sqlalchemy.engine.base.Engine: Motor SQLAlchemy para la base de configuración.
+        """
+        return Conexion.ConexionMariadb3(
+            str(get_secret("DB_USERNAME")),
+            str(get_secret("DB_PASS")),
+            str(get_secret("DB_HOST")),
+            int(get_secret("DB_PORT")),
+            str(get_secret("DB_NAME")),
+        )
+
+    def _engine_servidor(self, suffix, database):
+        user, password, host, port = (
+            self.config.get(f"nmUsr{suffix}"),
+            self.config.get(f"txPass{suffix}"),
+            self.config.get(f"hostServer{suffix}"),
+            self.config.get(f"portServer{suffix}"),
+        )
+        # LOAD DATA LOCAL solo hacia la base BI (ver ENV_LOCAL_INFILE)
+        local_infile = suffix == "In" and os.environ.get(ENV_LOCAL_INFILE, "1") != "0"
+        return Conexion.ConexionMariadb3(
+            str(user), str(password), str(host), int(port), str(database), local_infile
+        )
+
+    def stream_query(self, query, params=None, chunksize=50000, engine=None, dtype=None):
+        """
+        Ejecuta una consulta con un cursor del lado del servidor y entrega el
+        resultado por fragmentos.
+
+        A diferencia de pd.read_sql_query(chunksize=...) sobre el cursor por defecto
+        de PyMySQL, que descarga todo el resultado antes del primer fragmento, aquí
+        las filas se leen del socket a medida que se consumen.
+
+        Args:
+            query (str | sqlalchemy.sql.elements.TextClause): Consulta a ejecutar.
+            params (dict, opcional): Parámetros de la consulta.
+            chunksize (int, opcional): Número de filas por fragmento.
+            engine (sqlalchemy.engine.base.Engine, opcional): Motor a usar; por defecto el de BI.
+            dtype (dict, opcional): Tipos de columna a aplicar a cada fragmento.
+
+        Yields:
+            DataFrame: Fragmentos de hasta `chunksize` filas.
+        """
+        import pandas as pd
+
+        engine = engine if engine is not None else self.engine_mysql_bi
+        with engine.connect() as connection:
+            connection = connection.execution_options(
+                isolation_level="READ COMMITTED",
+                stream_results=True,
+                max_row_buffer=chunksize,
+            )
+            if isinstance(query, str):
+                result = connection.exec_driver_sql(query, params or ())
+            else:
+                result = connection.execute(query, params or {})
+            if not result.returns_rows:
+                return
+            columnas = list(result.keys())
+            while True:
+                filas = result.fetchmany(chunksize)
+                if not filas:
+                    break
+                chunk = pd.DataFrame.from_records(filas, columns=columnas, coerce_float=True)
+                if dtype:
+                    chunk = chunk.astype(dtype)
+                yield chunk
+
+    def execute_query_mysql(self, query, chunksize=None):
+        """
+        Ejecuta una consulta SQL en la base de datos BI.
+
+        Args:
+            query (str): La consulta SQL a ejecutar.
+            chunksize (int, opcional): Si se indica, retorna un iterador de fragmentos
+                leídos con cursor del lado del servidor.
+
+        Returns:
+            DataFrame | iterator: Resultado completo o iterador de fragmentos.
+        """
+        import pandas as pd
+
+        if chunksize:
+            return self.stream_query(query, chunksize=chunksize)
+        with self.engine_mysql_bi.connect() as connection:
+            cursor = connection.execution_options(isolation_level="READ COMMITTED")
+            return pd.read_sql_query(query, cursor)
+
+    def execute_query_mysql_chunked(self, query, table_name, staging, chunksize=50000, engine=None):
+        """
+        Ejecuta una consulta SQL en MySQL y guarda el resultado en el staging del job,
+        procesando la consulta en fragmentos (chunks).
+
+        Args:
+            query (str): La consulta SQL a ejecutar en MySQL.
+            table_name (str): Nombre de la tabla en el staging donde se guardarán los resultados.
+            staging (scripts.staging.StagingJob): Área de trabajo del job.
+            chunksize (int, opcional): El tamaño del fragmento para la ejecución de la consulta.
+            engine (sqlalchemy.engine.base.Engine, opcional): Motor a usar; por defecto el de BI.
+
+        Returns:
+            int: El número total de registros guardados.
+        """
+        try:
+            return staging.cargar(
+                table_name, self.stream_query(query, chunksize=chunksize, engine=engine)
+            )
+        except Exception as e:
+            # Registrar y propagar cualquier excepción que ocurra
+            logging.error(f"Error al ejecutar el query: {e}")
+            print(f"Error al ejecutar el query: {e}")
+            raise
@@ -1,34 +1,114 @@
 import os, sys
 from scripts.conexion import Conexion as con
+from scripts.secretos import get_secret
+from scripts.cache_config import cache_config
+from scripts.rango_fechas import resolvedor_fechas
 import json
-import pandas as pd
+import datetime
 import ast
 from sqlalchemy.sql import text
 import logging
+from scripts.logs import configurar_logging
 
 
-logging.basicConfig(
-    filename="log.txt",
-    level=logging.DEBUG,
-    format="%(asctime)s %(message)s",
-    filemode="w",
+# Campos de powerbi_adm.conf_empresas que se copian a la configuración
+CAMPOS_EMPRESA = [
+    "id",
+    "nmEmpresa",
+    "name",
+    "nbServerSidis",
+    "dbSidis",
+    "nbServerBi",
+    "dbBi",
+    "txProcedureExtrae",
+    "txProcedureCargue",
+    "nmProcedureExcel",
+    "txProcedureExcel",
+    "nmProcedureInterface",
+    "txProcedureInterface",
+    "nmProcedureExcel2",
+    "txProcedureExcel2",
+    "nmProcedureCsv",
+    "txProcedureCsv",
+    "nmProcedureCsv2",
+    "txProcedureCsv2",
+    "nmProcedureSql",
+    "txProcedureSql",
+    "report_id_powerbi",
+    "dataset_id_powerbi",
+    "url_powerbi",
+    "id_tsol",
+    "nbCuboIncremental",
+    "txFormatoSalida",
+]
+
+# Toda la configuración de un tenant en un solo viaje a la base de datos:
+# empresa, servidor y credenciales de Sidis (Out) y de BI (In), credenciales
+# de Power BI (conf_tipo 3) y las consultas del rango de fechas.
+SQL_SNAPSHOT = """
+    SELECT e.*,
+        so.hostServer AS hostServerOut, so.portServer AS portServerOut,
+        tout.nmUsr AS nmUsrOut, tout.txPass AS txPassOut,
+        si.hostServer AS hostServerIn, si.portServer AS portServerIn,
+        tin.nmUsr AS nmUsrIn, tin.txPass AS txPassIn,
+        tp.nmUsr AS nmUsrPowerbi, tp.txPass AS txPassPowerbi,
+        dt.txDtIni, dt.txDtFin
+    FROM powerbi_adm.conf_empresas e
+    LEFT JOIN powerbi_adm.conf_server so ON so.nbServer = e.nbServerSidis
+    LEFT JOIN powerbi_adm.conf_tipo tout ON tout.nbTipo = so.nbTipo
+    LEFT JOIN powerbi_adm.conf_server si ON si.nbServer = e.nbServerBi
+    LEFT JOIN powerbi_adm.conf_tipo tin ON tin.nbTipo = si.nbTipo
+    LEFT JOIN powerbi_adm.conf_tipo tp ON tp.nbTipo = 3
+    LEFT JOIN powerbi_adm.conf_dt dt ON dt.nmDt = :nmDt
+    WHERE e.name = :name
+    LIMIT 1
+"""
+
+
+# Campos con credenciales: no se guardan en Redis (ver CacheConfig.obtener).
+CAMPOS_CREDENCIALES = (
+    "nmUsrOut",
+    "txPassOut",
+    "nmUsrIn",
+    "txPassIn",
+    "nmUsrPowerbi",
+    "txPassPowerbi",
 )
-logging.info("Iniciando Proceso")
 
+# Solo las credenciales del tenant, para completar un snapshot leído de Redis.
+SQL_CREDENCIALES = """
+    SELECT so.hostServer AS hostServerOut,
+        tout.nmUsr AS nmUsrOut, tout.txPass AS txPassOut,
+        si.hostServer AS hostServerIn,
+        tin.nmUsr AS nmUsrIn, tin.txPass AS txPassIn,
+        tp.nmUsr AS nmUsrPowerbi, tp.txPass AS txPassPowerbi
+    FROM powerbi_adm.conf_empresas e
+    LEFT JOIN powerbi_adm.conf_server so ON so.nbServer = e.nbServerSidis
+    LEFT JOIN powerbi_adm.conf_tipo tout ON tout.nbTipo = so.nbTipo
+    LEFT JOIN powerbi_adm.conf_server si ON si.nbServer = e.nbServerBi
+    LEFT JOIN powerbi_adm.conf_tipo tin ON tin.nbTipo = si.nbTipo
+    LEFT JOIN powerbi_adm.conf_tipo tp ON tp.nbTipo = 3
+    WHERE e.name = :name
+    LIMIT 1
+"""
 
-def get_secret(secret_name, secrets_file="secret.json"):
-    try:
-        with open(secrets_file) as f:
-            secrets = json.loads(f.read())
-        return secrets[secret_name]
-    except KeyError:
-        raise ValueError(f"La variable {secret_name} no existe.")
-    except FileNotFoundError:
-        raise ValueError(f"No se encontró el archivo de configuración {secrets_file}.")
+
+def _credenciales(fila):
+    credenciales = {}
+    for suffix in ("Out", "In"):
+        if fila[f"hostServer{suffix}"] is not None:
+            credenciales[f"nmUsr{suffix}"] = fila[f"nmUsr{suffix}"]
+            credenciales[f"txPass{suffix}"] = fila[f"txPass{suffix}"]
+    if fila["nmUsrPowerbi"] is not None:
+        credenciales["nmUsrPowerbi"] = str(fila["nmUsrPowerbi"])
+        credenciales["txPassPowerbi"] = str(fila["txPassPowerbi"])
+    return credenciales
 
 
 class ConfigBasic:
     def __init__(self, database_name):
+        configurar_logging("log.txt")
+        logging.info("Iniciando Proceso")
         print("aqui estoy en la clase de config")
         self.config = {}  # Diccionario para almacenar la configuración
         try:
@@ -39,8 +119,6 @@ class ConfigBasic:
             logging.error(f"Clave no encontrada en el archivo de configuración: {e}")
         except FileNotFoundError as e:
             logging.error(f"Archivo no encontrado: {e}")
-        except pd.errors.EmptyDataError as e:
-            logging.error(f"No se encontraron datos en la consulta SQL: {e}")
         except IndexError as e:
             logging.error(f"Índice fuera de rango en el DataFrame: {e}")
         except Exception as e:
@@ -52,21 +130,105 @@ class ConfigBasic:
         self.config["nmDt"] = self.config["dir_actual"]
         logging.info(f"Configurando para la base de datos: {self.config['name']}")
 
+        # Las fechas del rango dependen del día, por eso el día hace parte de la clave
+        clave = f"{self.config['name']}:{self.config['nmDt']}:{datetime.date.today()}"
+        snapshot = cache_config.obtener(
+            clave,
+            self.fetch_snapshot,
+            privados=CAMPOS_CREDENCIALES,
+            cargador_privados=self.fetch_credenciales,
+        )
+        if snapshot:
+            self.config.update(snapshot)
+            if "IdtReporteIni" not in snapshot:
+                self.setup_date_config()
+            print("terminamos de configurar")
+            return
+
+        # Sin snapshot se resuelve con las consultas individuales
         self.fetch_database_config()
         self.setup_date_config()
         self.setup_server_config()
         self.powerbi_config()
         print("terminamos de configurar")
 
+    def engine_conf(self):
+        return con.ConexionMariadb3(
+            get_secret("DB_USERNAME"),
+            get_secret("DB_PASS"),
+            get_secret("DB_HOST"),
+            int(get_secret("DB_PORT")),
+            get_secret("DB_NAME"),
+        )
+
+    def fetch_snapshot(self):
+        """
+        Consulta en un solo viaje toda la configuración del tenant.
+
+        Returns:
+            dict: Configuración con los mismos campos que producen fetch_database_config,
+                  setup_date_config, setup_server_config y powerbi_config, o None si
+                  la empresa no existe o la consulta falla.
+        """
+        try:
+            with self.engine_conf().connect() as connection:
+                fila = (
+                    connection.execute(
+                        text(SQL_SNAPSHOT),
+                        {"name": self.config["name"], "nmDt": self.config["nmDt"]},
+                    )
+                    .mappings()
+                    .first()
+                )
+                if fila is None:
+                    logging.warning(
+                        f"No se encontró la empresa {self.config['name']} en conf_empresas"
+                    )
+                    return None
+
+                snapshot = {field: fila[field] for field in CAMPOS_EMPRESA if field in fila}
+                for suffix in ("Out", "In"):
+                    if fila[f"hostServer{suffix}"] is not None:
+                        for field in ("hostServer", "portServer"):
+                            snapshot[f"{field}{suffix}"] = fila[f"{field}{suffix}"]
+                snapshot.update(_credenciales(fila))
+
+            if fila["txDtIni"] and fila["txDtFin"]:
+                snapshot.update(
+                    resolvedor_fechas.resolver(
+                        self.config["nmDt"], fila["txDtIni"], fila["txDtFin"], self.engine_conf()
+                    )
+                )
+            return snapshot
+        except Exception as e:
+            logging.error(f"Error al consultar la configuración de {self.config['name']}: {e}")
+            return None
+
+    def fetch_credenciales(self):
+        """
+        Consulta solo las credenciales del tenant (CAMPOS_CREDENCIALES).
+
+        Returns:
+            dict: Credenciales, o None si la empresa no existe o la consulta falla.
+        """
+        try:
+            with self.engine_conf().connect() as connection:
+                fila = (
+                    connection.execute(text(SQL_CREDENCIALES), {"name": self.config["name"]})
+                    .mappings()
+                    .first()
+                )
+            return None if fila is None else _credenciales(fila)
+        except Exception as e:
+            logging.error(f"Error al consultar las credenciales de {self.config['name']}: {e}")
+            return None
+
     def execute_sql_query(self, sql_query):
+        # pandas solo se carga cuando se necesita la ruta sin snapshot
+        import pandas as pd
+
         try:
-            conectando = con.ConexionMariadb3(
-                get_secret("DB_USERNAME"),
-                get_secret("DB_PASS"),
-                get_secret("DB_HOST"),
-                int(get_secret("DB_PORT")),
-                get_secret("DB_NAME"),
-            )
+            conectando = self.engine_conf()
             with conectando.connect() as connection:
                 cursor = connection.execution_options(isolation_level="READ COMMITTED")
                 result = pd.read_sql_query(sql=sql_query, con=cursor)
@@ -87,33 +249,7 @@ class ConfigBasic:
             self.assign_static_page_attributes(df)
 
     def assign_static_page_attributes(self, df):
-        for field in [
-            "id",
-            "nmEmpresa",
-            "name",
-            "nbServerSidis",
-            "dbSidis",
-            "nbServerBi",
-            "dbBi",
-            "txProcedureExtrae",
-            "txProcedureCargue",
-            "nmProcedureExcel",
-            "txProcedureExcel",
-            "nmProcedureInterface",
-            "txProcedureInterface",
-            "nmProcedureExcel2",
-            "txProcedureExcel2",
-            "nmProcedureCsv",
-            "txProcedureCsv",
-            "nmProcedureCsv2",
-            "txProcedureCsv2",
-            "nmProcedureSql",
-            "txProcedureSql",
-            "report_id_powerbi",
-            "dataset_id_powerbi",
-            "url_powerbi",
-            "id_tsol",
-        ]:  # Lista de campos a configurar
+        for field in CAMPOS_EMPRESA:  # Lista de campos a configurar
             if field in df:
                 value = df[field].values[0] if not df[field].empty else None
                 self.config[field] = value  # Asignar al diccionario
@@ -164,22 +300,15 @@ class ConfigBasic:
         # print(sql)
         df = self.execute_sql_query(sql)
         if not df.empty:
-            # Obtener los valores de IdtReporteIni y IdtReporteFin en una sola consulta
-            txDtIni = str(df["txDtIni"].values[0])
-            txDtFin = str(df["txDtFin"].values[0])
-
-            # La consulta SQL para obtener IdtReporteIni y IdtReporteFin
-            # sql_report_date_ini = f"'{txDtIni}';"
-            # sql_report_date_fin = f"'{txDtFin}';"
-            report_date_df_ini = self.execute_sql_query(txDtIni)
-            report_date_df_fin = self.execute_sql_query(txDtFin)
-            # print(report_date_df_ini)
-            # print(report_date_df_fin)
-            if not report_date_df_ini.empty and not report_date_df_fin.empty:
-                return {
-                    "IdtReporteIni": str(report_date_df_ini["IdtReporteIni"].values[0]),
-                    "IdtReporteFin": str(report_date_df_fin["IdtReporteFin"].values[0]),
-                }
+            # IdtReporteIni y IdtReporteFin se calculan una vez por día para cada nmDt
+            rango = resolvedor_fechas.resolver(
+                nmDt,
+                str(df["txDtIni"].values[0]),
+                str(df["txDtFin"].values[0]),
+                self.engine_conf(),
+            )
+            if rango:
+                return rango
         return None
 
     def setup_server_config(self):
@@ -0,0 +1,281 @@
+import os
+import time
+import zlib
+import struct
+import shutil
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# Variable de entorno con el nivel de compresión DEFLATE de los zip (0 a 9; 0 los
+# guarda sin comprimir como el ZIP_STORED anterior).
+ENV_NIVEL = "ADMINBI_NIVEL_ZIP"
+NIVEL_ZIP = 6
+# Variable de entorno con el número de entradas que se generan en paralelo.
+ENV_HILOS = "ADMINBI_HILOS_ZIP"
+HILOS_ZIP = 4
+# Tamaño de los bloques que se copian del archivo temporal al zip.
+BLOQUE_COPIA = 1024 * 1024
+
+_MAX_32 = 0xFFFFFFFF
+_MAX_16 = 0xFFFF
+# Tamaños, offsets y número de entradas desde los que se usa ZIP64. Son los
+# máximos del formato; las pruebas los bajan para ejercitar ZIP64 sin generar 4 GB.
+_LIMITE_32 = _MAX_32
+_LIMITE_16 = _MAX_16
+_STORED = 0
+_DEFLATED = 8
+# Bit 11: los nombres de las entradas están en UTF-8
+_FLAG_UTF8 = 0x0800
+
+
+def _entero_entorno(variable, defecto, minimo, maximo):
+    try:
+        return min(maximo, max(minimo, int(os.environ.get(variable, defecto))))
+    except ValueError:
+        return defecto
+
+
+def nivel_zip():
+    return _entero_entorno(ENV_NIVEL, NIVEL_ZIP, 0, 9)
+
+
+def hilos_zip():
+    return _entero_entorno(ENV_HILOS, HILOS_ZIP, 1, 32)
+
+
+def _fecha_dos(instante):
+    t = time.localtime(instante)
+    fecha = ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    hora = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    return hora, fecha
+
+
+class EntradaComprimida:
+    """
+    Entrada del zip ya comprimida en un archivo temporal (deflate crudo, sin encabezado zlib).
+
+    Attributes:
+        nombre (str): Nombre de la entrada dentro del zip.
+        ruta (str): Archivo temporal con los datos comprimidos.
+        metodo (int): 8 (DEFLATE) o 0 (sin compresión).
+        crc (int): CRC-32 de los datos sin comprimir.
+        tamano (int): Bytes sin comprimir.
+        comprimido (int): Bytes comprimidos.
+    """
+
+    def __init__(self, nombre, ruta, nivel):
+        self.nombre = nombre
+        self.ruta = ruta
+        self.metodo = _DEFLATED if nivel > 0 else _STORED
+        self.crc = 0
+        self.tamano = 0
+        self.comprimido = 0
+        self.instante = time.time()
+        self._archivo = open(ruta, "wb")
+        self._compresor = (
+            zlib.compressobj(nivel, zlib.DEFLATED, -15) if self.metodo == _DEFLATED else None
+        )
+
+    def escribir(self, datos):
+        if not datos:
+            return
+        self.crc = zlib.crc32(datos, self.crc)
+        self.tamano += len(datos)
+        if self._compresor is not None:
+            datos = self._compresor.compress(datos)
+        self._archivo.write(datos)
+        self.comprimido += len(datos)
+
+    def cerrar(self):
+        if self._compresor is not None:
+            datos = self._compresor.flush()
+            self._archivo.write(datos)
+            self.comprimido += len(datos)
+        self._archivo.close()
+
+
+class ConstructorZip:
+    """
+    Genera un archivo zip cuyas entradas se comprimen en paralelo.
+
+    Cada entrada se produce en un hilo del pool: su función recibe una
+    EntradaComprimida y le escribe bytes (por ejemplo el CSV de un fragmento a la
+    vez, leído del cursor del servidor). Los datos se comprimen con zlib a medida
+    que llegan en un archivo temporal; zlib libera el GIL al comprimir, así que
+    las entradas avanzan realmente en paralelo. Luego el hilo que llama a
+    construir() copia cada entrada, en el orden en que se agregó, al zip final
+    con sus encabezados (con ZIP64 cuando se superan 4 GB o 65.535 entradas).
+
+    zipfile no permite agregar datos ya comprimidos, por eso el contenedor se
+    escribe aquí directamente.
+
+    Uso:
+        constructor = ConstructorZip(file_path, directorio_temporal)
+        constructor.agregar("Ventas.txt", lambda entrada: entrada.escribir(b"..."))
+        constructor.construir()
+
+    Attributes:
+        ruta (str): Ruta del zip a generar.
+        nivel (int): Nivel de compresión DEFLATE (0 sin compresión).
+        hilos (int): Entradas que se producen al mismo tiempo.
+    """
+
+    def __init__(self, ruta, directorio_temporal=None, nivel=None, hilos=None):
+        self.ruta = ruta
+        self.directorio_temporal = directorio_temporal
+        self.nivel = nivel_zip() if nivel is None else nivel
+        self.hilos = hilos or hilos_zip()
+        self.entradas = []
+
+    def agregar(self, nombre, productor):
+        """
+        Registra una entrada del zip.
+
+        Args:
+            nombre (str): Nombre de la entrada dentro del zip.
+            productor (callable): Función que recibe una EntradaComprimida y le escribe bytes.
+        """
+        self.entradas.append((nombre, productor))
+
+    def _producir(self, directorio, posicion, nombre, productor):
+        entrada = EntradaComprimida(nombre, os.path.join(directorio, f"{posicion:05d}.bin"), self.nivel)
+        try:
+            productor(entrada)
+        finally:
+            entrada.cerrar()
+        logging.info(
+            f"Entrada {nombre}: {entrada.tamano} bytes, {entrada.comprimido} comprimidos"
+        )
+        return entrada
+
+    def construir(self):
+        """
+        Produce todas las entradas y escribe el zip.
+
+        Returns:
+            list: Las EntradaComprimida escritas, en orden.
+
+        Raises:
+            Exception: La primera excepción (en orden) de un productor; en ese caso
+                no se deja el zip incompleto en disco.
+        """
+        directorio = tempfile.mkdtemp(prefix="zip_", dir=self.directorio_temporal)
+        escritas = []
+        try:
+            with ThreadPoolExecutor(max_workers=self.hilos) as pool:
+                futuros = [
+                    pool.submit(self._producir, directorio, posicion, nombre, productor)
+                    for posicion, (nombre, productor) in enumerate(self.entradas)
+                ]
+                try:
+                    with open(self.ruta, "wb") as destino:
+                        centrales = []
+                        for futuro in futuros:
+                            entrada = futuro.result()
+                            centrales.append(self._escribir_entrada(destino, entrada))
+                            escritas.append(entrada)
+                            os.remove(entrada.ruta)
+                        self._escribir_directorio(destino, centrales)
+                except BaseException:
+                    for futuro in futuros:
+                        futuro.cancel()
+                    if os.path.exists(self.ruta):
+                        os.remove(self.ruta)
+                    raise
+        finally:
+            shutil.rmtree(directorio, ignore_errors=True)
+        return escritas
+
+    def _escribir_entrada(self, destino, entrada):
+        """
+        Copia una entrada al zip con su encabezado local y retorna su registro del directorio central.
+        """
+        offset = destino.tell()
+        nombre = entrada.nombre.encode("utf-8")
+        hora, fecha = _fecha_dos(entrada.instante)
+        zip64 = entrada.tamano >= _LIMITE_32 or entrada.comprimido >= _LIMITE_32
+        version = 45 if zip64 else 20
+        extra = struct.pack("<HHQQ", 0x0001, 16, entrada.tamano, entrada.comprimido) if zip64 else b""
+        destino.write(
+            struct.pack(
+                "<IHHHHHIIIHH",
+                0x04034B50,
+                version,
+                _FLAG_UTF8,
+                entrada.metodo,
+                hora,
+                fecha,
+                entrada.crc,
+                _MAX_32 if zip64 else entrada.comprimido,
+                _MAX_32 if zip64 else entrada.tamano,
+                len(nombre),
+                len(extra),
+            )
+        )
+        destino.write(nombre)
+        destino.write(extra)
+        with open(entrada.ruta, "rb") as origen:
+            shutil.copyfileobj(origen, destino, BLOQUE_COPIA)
+        return entrada, offset
+
+    def _escribir_directorio(self, destino, centrales):
+        inicio = destino.tell()
+        for entrada, offset in centrales:
+            nombre = entrada.nombre.encode("utf-8")
+            hora, fecha = _fecha_dos(entrada.instante)
+            valores64 = [
+                v for v in (entrada.tamano, entrada.comprimido, offset) if v >= _LIMITE_32
+            ]
+            extra = (
+                struct.pack(f"<HH{len(valores64)}Q", 0x0001, 8 * len(valores64), *valores64)
+                if valores64
+                else b""
+            )
+            version = 45 if valores64 else 20
+            destino.write(
+                struct.pack(
+                    "<IHHHHHHIIIHHHHHII",
+                    0x02014B50,
+                    (3 << 8) | version,  # creado en Unix
+                    version,
+                    _FLAG_UTF8,
+                    entrada.metodo,
+                    hora,
+                    fecha,
+                    entrada.crc,
+                    _MAX_32 if entrada.comprimido >= _LIMITE_32 else entrada.comprimido,
+                    _MAX_32 if entrada.tamano >= _LIMITE_32 else entrada.tamano,
+                    len(nombre),
+                    len(extra),
+                    0,
+                    0,
+                    0,
+                    0o100644 << 16,  # archivo regular rw-r--r--
+                    _MAX_32 if offset >= _LIMITE_32 else offset,
+                )
+            )
+            destino.write(nombre)
+            destino.write(extra)
+        fin = destino.tell()
+        total, tamano = len(centrales), fin - inicio
+
+        zip64 = total >= _LIMITE_16 or tamano >= _LIMITE_32 or inicio >= _LIMITE_32
+        if zip64:
+            destino.write(
+                struct.pack("<IQHHIIQQQQ", 0x06064B50, 44, 45, 45, 0, 0, total, total, tamano, inicio)
+            )
+            destino.write(struct.pack("<IIQI", 0x07064B50, 0, fin, 1))
+        destino.write(
+            struct.pack(
+                "<IHHHHIIH",
+                0x06054B50,
+                0,
+                0,
+                _MAX_16 if zip64 else total,
+                _MAX_16 if zip64 else total,
+                _MAX_32 if zip64 else tamano,
+                _MAX_32 if zip64 else inicio,
+                0,
+            )
+        )
@@ -5,181 +5,23 @@ import os
 import numpy as np
 import pandas as pd
 import logging
+from scripts.logs import configurar_logging
 
-# from scripts.conexion import Conexion as con
-from scripts.conexion import Conexion as con
+# from scripts.conexion import DataBaseConnection
 from scripts.config import ConfigBasic
-from sqlalchemy import create_engine, text, inspect
+from sqlalchemy import text, inspect
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError, OperationalError
 from django.contrib import sessions
 import re
 import ast
-from django.core.exceptions import ImproperlyConfigured
 import json
 import unicodedata
 
-import sqlite3
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import Column, DateTime, String, Float, Date
 
-logging.basicConfig(
-    filename="logcostos.txt",
-    level=logging.DEBUG,
-    format="%(asctime)s %(message)s",
-    filemode="w",
-)
-logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
-logging.info("Iniciando Proceso CargueZip")
-
-
-def get_secret(secret_name, secrets_file="secret.json"):
-    try:
-        with open(secrets_file) as f:
-            secrets = json.loads(f.read())
-        return secrets[secret_name]
-    except KeyError:
-        raise ImproperlyConfigured(f"La variable {secret_name} no existe")
-    except FileNotFoundError:
-        raise ImproperlyConfigured(
-            f"No se encontró el archivo de configuración {secrets_file}"
-        )
-
-
-class DataBaseConnection:
-    """
-    Clase para manejar las conexiones a bases de datos MySQL y SQLite.
-
-    Esta clase facilita la conexión a las bases de datos y la ejecución de consultas SQL,
-    incluyendo la ejecución de consultas grandes en fragmentos (chunks).
-
-    Attributes:
-        config (dict): Configuración utilizada para las conexiones a las bases de datos.
-        engine_mysql (sqlalchemy.engine.base.Engine): Motor SQLAlchemy para la base de datos MySQL.
-        engine_sqlite (sqlalchemy.engine.base.Engine): Motor SQLAlchemy para la base de datos SQLite.
-    """
-
-    def __init__(self, config):
-        """
-        Inicializa la instancia de DataBaseConnection con la configuración proporcionada.
-
-        Args:
-            config (dict): Configuración para las conexiones a las bases de datos.
-            mysql_engine (sqlalchemy.engine.base.Engine, opcional): Motor SQLAlchemy para la base de datos MySQL.
-            sqlite_engine (sqlalchemy.engine.base.Engine, opcional): Motor SQLAlchemy para la base de datos SQLite.
-        """
-        self.config = config
-        # Establecer o crear el motor para MySQL
-        self.engine_mysql_bi = self.create_engine_mysql_bi()
-        self.engine_mysql_conf = self.create_engine_mysql_conf()
-        print(self.engine_mysql_bi)
-        print(self.engine_mysql_conf)
-        # Establecer o crear el motor para SQLite
-        self.engine_sqlite = create_engine("sqlite:///mydata.db")
-        print(self.engine_sqlite)
-
-    def create_engine_mysql_bi(self):
-        """
-        Crea un motor SQLAlchemy para la conexión a la base de datos MySQL.
-
-        Utiliza la configuración proporcionada para establecer la conexión.
-
-        Returns:
-            sqlalchemy.engine.base.Engine: Motor SQLAlchemy para la base de datos MySQL.
-        """
-        # Extraer los parámetros de configuración para la conexión MySQL
-        user, password, host, port, database = (
-            self.config.get("nmUsrIn"),
-            self.config.get("txPassIn"),
-            self.config.get("hostServerIn"),
-            self.config.get("portServerIn"),
-            self.config.get("dbBi"),
-        )
-        # Crear y retornar el motor de conexión
-        return con.ConexionMariadb3(
-            str(user), str(password), str(host), int(port), str(database)
-        )
-
-    def create_engine_mysql_conf(self):
-        """
-        Crea un motor SQLAlchemy para la conexión a la base de datos MySQL.
-
-        Utiliza la configuración proporcionada para establecer la conexión.
-
-        Returns:
-            sqlalchemy.engine.base.Engine: Motor SQLAlchemy para la base de datos MySQL.
-        """
-        # Extraer los parámetros de configuración para la conexión MySQL
-        user, password, host, port, database = (
-            get_secret("DB_USERNAME"),
-            get_secret("DB_PASS"),
-            get_secret("DB_HOST"),
-            int(get_secret("DB_PORT")),
-            get_secret("DB_NAME"),
-        )
-        # Crear y retornar el motor de conexión
-        return con.ConexionMariadb3(
-            str(user), str(password), str(host), int(port), str(database)
-        )
-
-    def execute_query_mysql(self, query, chunksize=None):
-        """
-        Ejecuta una consulta SQL en la base de datos MySQL.
-
-        Args:
-            query (str): La consulta SQL a ejecutar.
-            chunksize (int, opcional): El tamaño del fragmento para la ejecución de la consulta.
-
-        Returns:
-            DataFrame: Un DataFrame de pandas con los resultados de la consulta.
-        """
-        # Conectar a la base de datos y ejecutar la consulta
-        with self.create_engine_mysql_bi.connect() as connection:
-            cursor = connection.execution_options(isolation_level="READ COMMITTED")
-            return pd.read_sql_query(query, cursor, chunksize=chunksize)
-
-    def execute_query_mysql_chunked(self, query, table_name, chunksize=50000):
-        """
-        Ejecuta una consulta SQL en la base de datos MySQL y almacena los resultados en SQLite,
-        procesando la consulta en fragmentos (chunks).
-
-        Args:
-            query (str): La consulta SQL a ejecutar en MySQL.
-            table_name (str): El nombre de la tabla en SQLite donde se almacenarán los resultados.
-            chunksize (int, opcional): El tamaño del fragmento para la ejecución de la consulta.
-
-        Returns:
-            int: El número total de registros almacenados en la tabla SQLite.
-        """
-        try:
-            # Eliminar la tabla en SQLite si ya existe
-            self.eliminar_tabla_sqlite(table_name)
-            # Conectar a MySQL y ejecutar la consulta en fragmentos
-            with self.engine_mysql_bi.connect() as connection:
-                cursor = connection.execution_options(isolation_level="READ COMMITTED")
-                for chunk in pd.read_sql_query(query, con=cursor, chunksize=chunksize):
-                    # Almacenar cada fragmento en la tabla SQLite
-                    chunk.to_sql(
-                        name=table_name,
-                        con=self.engine_sqlite,
-                        if_exists="append",
-                        index=False,
-                    )
-
-            # Contar y retornar el total de registros en la tabla SQLite
-            with self.engine_sqlite.connect() as connection:
-                total_records = connection.execute(
-                    text(f"SELECT COUNT(*) FROM {table_name}")
-                ).fetchone()[0]
-            return total_records
-
-        except Exception as e:
-            # Registrar y propagar cualquier excepción que ocurra
-            logging.error(f"Error al ejecutar el query: {e}")
-            print(f"Error al ejecutar el query: {e}")
-            raise
-
 
 Base = declarative_base()
 
@@ -223,6 +65,8 @@ class CargueHistoricoCostos:
         Raises:
             ValueError: Si el nombre de la base de datos es vacío o nulo.
         """
+        configurar_logging("logcostos.txt", logging.INFO)
+        logging.info("Iniciando Proceso CargueZip")
 
         if not database_name:
             raise ValueError("El nombre de la base de datos no puede ser vacío o nulo.")
@@ -234,7 +78,7 @@ class CargueHistoricoCostos:
         """
         Configura la conexión a las bases de datos y establece las variables de entorno necesarias.
 
-        Esta función crea una configuración básica y establece las conexiones a las bases de datos MySQL y SQLite
+        Esta función crea una configuración básica y establece las conexiones a las bases de datos MySQL
         utilizando los parámetros de configuración.
 
         Raises:
@@ -247,7 +91,6 @@ class CargueHistoricoCostos:
             self.config = config_basic.config
             # Establecer conexiones a las bases de datos
             self.db_connection = DataBaseConnection(config=self.config)
-            self.engine_sqlite = self.db_connection.engine_sqlite
             self.engine_mysql_bi = self.db_connection.engine_mysql_bi
             self.engine_mysql_conf = self.db_connection.engine_mysql_conf
         except Exception as e:
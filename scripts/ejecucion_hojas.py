@@ -0,0 +1,367 @@
+import os
+import time
+import uuid
+import socket
+import threading
+import logging
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+from scripts.cache_config import cache_config
+
+# Variable de entorno con el número de procedimientos de hoja que un job ejecuta
+# en paralelo. Con 1 las hojas se ejecutan una después de la otra.
+ENV_HOJAS_CONCURRENTES = "ADMINBI_HOJAS_CONCURRENTES"
+MAX_HOJAS_CONCURRENTES = 4
+# Máximo de procedimientos de hoja ejecutándose a la vez contra un mismo servidor,
+# sumando todos los jobs de todos los workers de RQ (el cupo vive en Redis). Los
+# CALL de cubo e interface son pesados y el tiempo lo pone el servidor, así que más
+# paralelismo solo los hace competir entre sí.
+MAX_PROCEDIMIENTOS_SERVIDOR = 4
+# Segundos que un cupo tomado en Redis sigue vigente sin renovarse. Mientras el
+# proceso que lo tiene está vivo, un hilo lo renueva cada RENOVACION_CUPO
+# segundos; si el work-horse muere sin liberarlo, vence en este tiempo.
+DURACION_CUPO = 120
+RENOVACION_CUPO = 30
+# Segundos entre intentos mientras el servidor no tiene cupos libres.
+ESPERA_CUPO = 1.0
+# Variable de entorno con los segundos máximos de espera por un cupo; al
+# superarlos se lanza ErrorCupoServidor.
+ENV_ESPERA_MAXIMA_CUPO = "ADMINBI_ESPERA_MAXIMA_CUPO"
+ESPERA_MAXIMA_CUPO = 1800
+# Segundos entre los avisos en el log mientras se espera un cupo.
+AVISO_ESPERA_CUPO = 60
+# Prefijo de las claves de cupos en Redis.
+PREFIJO_REDIS = "adminbi:cupos"
+
+# Toma un cupo si hay menos de ARGV[2] vigentes; los vencidos se descartan antes.
+_TOMAR_CUPO = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[2]) then
+    redis.call('ZADD', KEYS[1], ARGV[3], ARGV[4])
+    redis.call('EXPIRE', KEYS[1], ARGV[5])
+    return 1
+end
+return 0
+"""
+
+_lock = threading.Lock()
+_limites_servidor = {}
+# Cupos de Redis tomados por el proceso (token -> clave) y el hilo que los renueva.
+_cupos_redis = {}
+_renovador = None
+
+
+class ErrorCupoServidor(TimeoutError):
+    """
+    No se obtuvo un cupo del servidor en ESPERA_MAXIMA_CUPO segundos.
+
+    Attributes:
+        clave (str): Clave del servidor en Redis.
+        segundos (float): Segundos esperados.
+    """
+
+    def __init__(self, clave, segundos):
+        super().__init__(f"Sin cupo en {clave} después de {segundos:.0f} s")
+        self.clave = clave
+        self.segundos = segundos
+
+
+def espera_maxima_cupo():
+    try:
+        return max(1, int(os.environ.get(ENV_ESPERA_MAXIMA_CUPO, ESPERA_MAXIMA_CUPO)))
+    except ValueError:
+        return ESPERA_MAXIMA_CUPO
+
+
+def _renovar_cupos():
+    while True:
+        time.sleep(RENOVACION_CUPO)
+        with _lock:
+            cupos = list(_cupos_redis.items())
+        if not cupos:
+            continue
+        redis = cache_config.conexion_redis()
+        if redis is None:
+            continue
+        vence = time.time() + DURACION_CUPO
+        for token, clave in cupos:
+            try:
+                # xx: un cupo que ya venció no se vuelve a crear
+                redis.zadd(clave, {token: vence}, xx=True)
+                redis.expire(clave, DURACION_CUPO)
+            except Exception as e:
+                logging.warning(f"No se pudo renovar el cupo de {clave}: {e}")
+
+
+def _registrar_cupo(token, clave):
+    global _renovador
+    with _lock:
+        _cupos_redis[token] = clave
+        if _renovador is None:
+            _renovador = threading.Thread(target=_renovar_cupos, name="renovador-cupos", daemon=True)
+            _renovador.start()
+
+
+class SemaforoServidor:
+    """
+    Semáforo de procedimientos de un servidor compartido entre procesos.
+
+    Cada worker de RQ ejecuta los jobs en un work-horse nuevo (fork), así que un
+    semáforo de threading solo limitaría los hilos de un job. Este guarda los
+    cupos tomados en un sorted set de Redis (token -> vencimiento) y los toma con
+    un script atómico. Los cupos vencen a los DURACION_CUPO segundos y un hilo
+    del proceso los renueva mientras están tomados, así que el de un work-horse
+    que muere se libera solo en poco tiempo. La espera por un cupo se registra en
+    el log y termina con ErrorCupoServidor a los ESPERA_MAXIMA_CUPO segundos.
+    Cuando Redis no está disponible (scripts fuera de Django) usa un semáforo
+    local del proceso.
+
+    Attributes:
+        clave (str): Clave del sorted set en Redis.
+        maximo (int): Cupos simultáneos del servidor.
+    """
+
+    def __init__(self, host, puerto, maximo=MAX_PROCEDIMIENTOS_SERVIDOR):
+        self.servidor = (host, puerto)
+        self.clave = f"{PREFIJO_REDIS}:{host}:{puerto}"
+        self.maximo = maximo
+        self._local = threading.BoundedSemaphore(maximo)
+        # Tokens tomados por cada hilo; None indica que se usó el semáforo local
+        self._tokens = threading.local()
+
+    def _pila(self):
+        if not hasattr(self._tokens, "pila"):
+            self._tokens.pila = []
+        return self._tokens.pila
+
+    def _tomar_redis(self, redis, token):
+        inicio = time.monotonic()
+        limite = inicio + espera_maxima_cupo()
+        aviso = inicio + AVISO_ESPERA_CUPO
+        while True:
+            ahora = time.time()
+            tomado = redis.eval(
+                _TOMAR_CUPO,
+                1,
+                self.clave,
+                ahora,
+                self.maximo,
+                ahora + DURACION_CUPO,
+                token,
+                DURACION_CUPO,
+            )
+            if int(tomado):
+                return
+            espera = time.monotonic()
+            if espera >= limite:
+                logging.error(f"Sin cupo en {self.clave} después de {espera - inicio:.0f} s")
+                raise ErrorCupoServidor(self.clave, espera - inicio)
+            if espera >= aviso:
+                logging.info(f"Esperando cupo en {self.clave} hace {espera - inicio:.0f} s")
+                aviso = espera + AVISO_ESPERA_CUPO
+            time.sleep(ESPERA_CUPO)
+
+    def acquire(self):
+        """
+        Toma un cupo del servidor.
+
+        Raises:
+            ErrorCupoServidor: Si no hay cupo en ESPERA_MAXIMA_CUPO segundos.
+        """
+        redis = cache_config.conexion_redis()
+        if redis is not None:
+            token = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+            try:
+                self._tomar_redis(redis, token)
+                _registrar_cupo(token, self.clave)
+                self._pila().append(token)
+                return True
+            except ErrorCupoServidor:
+                raise
+            except Exception as e:
+                logging.warning(f"Cupo de {self.clave} sin Redis, se limita solo el proceso: {e}")
+        self._local.acquire()
+        self._pila().append(None)
+        return True
+
+    def release(self):
+        token = self._pila().pop()
+        if token is None:
+            self._local.release()
+            return
+        with _lock:
+            _cupos_redis.pop(token, None)
+        try:
+            cache_config.conexion_redis().zrem(self.clave, token)
+        except Exception as e:
+            logging.warning(f"No se pudo liberar el cupo de {self.clave}, vence en {DURACION_CUPO} s: {e}")
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+
+def limite_servidor(config, sufijo="In"):
+    """
+    Retorna el semáforo de procedimientos de un servidor del tenant.
+
+    Args:
+        config (dict): Configuración del tenant.
+        sufijo (str): "In" para el servidor BI, "Out" para el de Sidis.
+
+    Returns:
+        SemaforoServidor: El mismo objeto para todas las llamadas del proceso con
+            el mismo host y puerto.
+    """
+    clave = (str(config.get(f"hostServer{sufijo}")), str(config.get(f"portServer{sufijo}")))
+    with _lock:
+        limite = _limites_servidor.get(clave)
+        if limite is None:
+            limite = SemaforoServidor(*clave)
+            _limites_servidor[clave] = limite
+    return limite
+
+
+@contextlib.contextmanager
+def cupos_servidores(config, *sufijos):
+    """
+    Toma el cupo de varios servidores del tenant, siempre en el mismo orden.
+
+    Quien necesita más de un cupo a la vez (Sidis y BI en transferir_sql) debe
+    tomarlos con esta función: se ordenan por host y puerto, no por el papel del
+    servidor, así dos jobs de tenants cuyos servidores se cruzan (el Sidis de uno
+    es el BI del otro) no se bloquean esperando cada uno el cupo del otro. Un
+    servidor repetido se toma una sola vez.
+
+    Args:
+        config (dict): Configuración del tenant.
+        sufijos (str): "In" y/o "Out".
+    """
+    limites = {}
+    for sufijo in sufijos:
+        limite = limite_servidor(config, sufijo)
+        limites[limite.servidor] = limite
+    with contextlib.ExitStack() as pila:
+        for servidor in sorted(limites):
+            pila.enter_context(limites[servidor])
+        yield
+
+
+def _reiniciar_tras_fork():
+    # Un semáforo local tomado por un hilo del padre quedaría tomado para siempre
+    # en el hijo; los cupos de Redis del padre siguen siendo del padre y el hilo
+    # que los renueva no existe en el hijo
+    global _lock, _renovador
+    _lock = threading.Lock()
+    _limites_servidor.clear()
+    _cupos_redis.clear()
+    _renovador = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reiniciar_tras_fork)
+
+
+def hojas_concurrentes():
+    try:
+        return max(1, int(os.environ.get(ENV_HOJAS_CONCURRENTES, MAX_HOJAS_CONCURRENTES)))
+    except ValueError:
+        return MAX_HOJAS_CONCURRENTES
+
+
+class ErrorHoja(Exception):
+    """
+    Error al ejecutar o escribir una hoja.
+
+    Attributes:
+        hoja (str): Hoja que falló.
+        error (Exception): Excepción original.
+    """
+
+    def __init__(self, hoja, error):
+        super().__init__(f"Error al procesar la hoja {hoja}: {error}")
+        self.hoja = hoja
+        self.error = error
+
+
+class EjecutorHojas:
+    """
+    Ejecuta los procedimientos de las hojas de un job en paralelo y las escribe en orden.
+
+    La primera hoja se lee en el hilo principal directo del cursor del servidor
+    hacia el archivo de salida. Las demás se ejecutan al mismo tiempo en un pool de
+    hilos y se guardan en el staging del job; el hilo principal las escribe en el
+    orden configurado a medida que termina con la anterior. Así el tiempo total se
+    acerca al del procedimiento más lento y no a la suma de todos.
+
+    Attributes:
+        db_connection (DataBaseConnection): Conexiones del tenant.
+        staging (StagingJob): Área de trabajo del job.
+        max_hilos (int): Procedimientos del job que se ejecutan a la vez.
+    """
+
+    def __init__(self, db_connection, staging, max_hilos=None):
+        self.db_connection = db_connection
+        self.staging = staging
+        self.max_hilos = max_hilos or hojas_concurrentes()
+        self.limite = limite_servidor(db_connection.config)
+
+    def _extraer(self, hoja, sql):
+        # Se ejecuta en los hilos del pool: guarda el resultado en el staging
+        with self.limite:
+            logging.info(f"Ejecutando el procedimiento de la hoja {hoja}")
+            return self.db_connection.execute_query_mysql_chunked(
+                query=sql, table_name=hoja, staging=self.staging
+            )
+
+    def ejecutar(self, hojas, generar_sql, escribir):
+        """
+        Ejecuta y escribe todas las hojas.
+
+        Args:
+            hojas (list): Hojas en el orden en que deben quedar en el archivo.
+            generar_sql (callable): hoja -> consulta a ejecutar.
+            escribir (callable): (hoja, fragmentos) -> filas escritas. Siempre se
+                llama desde el hilo que invoca este método y en el orden de `hojas`.
+
+        Returns:
+            dict: Hoja -> filas escritas.
+
+        Raises:
+            ErrorHoja: Con la primera hoja (en orden) que falló.
+        """
+        conteos = {}
+        if not hojas:
+            return conteos
+
+        hilos = min(self.max_hilos, len(hojas)) - 1
+        pool = ThreadPoolExecutor(max_workers=hilos) if hilos > 0 else None
+        try:
+            futuros = {}
+            if pool is not None:
+                for hoja in hojas[1:]:
+                    futuros[hoja] = pool.submit(self._extraer, hoja, generar_sql(hoja))
+
+            for posicion, hoja in enumerate(hojas):
+                try:
+                    if posicion == 0 or pool is None:
+                        # Lectura directa del servidor, sin pasar por el staging
+                        with self.limite:
+                            fragmentos = self.db_connection.stream_query(generar_sql(hoja))
+                            conteos[hoja] = escribir(hoja, fragmentos)
+                    else:
+                        futuros[hoja].result()
+                        conteos[hoja] = escribir(hoja, self.staging.leer(hoja))
+                        self.staging.eliminar(hoja)
+                except Exception as e:
+                    raise ErrorHoja(hoja, e) from e
+                logging.info(f"Hoja {hoja} finalizada con {conteos[hoja]} registros")
+            return conteos
+        finally:
+            if pool is not None:
+                # Las hojas que aún no empezaron se cancelan si hubo un error
+                pool.shutdown(wait=True, cancel_futures=True)
@@ -1,18 +1,9 @@
 import json
 import requests
 import msal
-from django.core.exceptions import ImproperlyConfigured
 from scripts.StaticPage import StaticPage
 
-with open("secret.json") as f:
-    secret = json.loads(f.read())
-
-    def get_secret(secret_name, secrets=secret):
-        try:
-            return secrets[secret_name]
-        except:
-            msg = "la variable %s no existe" % secret_name
-            raise ImproperlyConfigured(msg)
+from scripts.secretos import get_secret
 
 import uuid
 
@@ -0,0 +1,232 @@
+import datetime
+import decimal
+import logging
+
+# Máximo de filas de una hoja de Excel, incluido el encabezado.
+MAX_FILAS_EXCEL = 1048576
+# Máximo de caracteres del nombre de una hoja de Excel.
+MAX_NOMBRE_HOJA = 31
+
+# Formatos numéricos de las celdas, los mismos que usa pandas.ExcelWriter.
+FORMATO_FECHA = "yyyy-mm-dd"
+FORMATO_FECHA_HORA = "yyyy-mm-dd hh:mm:ss"
+FORMATO_HORA = "[h]:mm:ss"
+
+
+def nombre_hoja(hoja, parte=1):
+    """
+    Retorna el nombre de la hoja de Excel para una parte de una hoja lógica.
+
+    Args:
+        hoja (str): Nombre de la hoja configurada.
+        parte (int): 1 para la primera hoja, 2 en adelante para las continuaciones.
+
+    Returns:
+        str: Nombre de máximo 31 caracteres (hoja, hoja_2, hoja_3, ...).
+    """
+    if parte == 1:
+        return str(hoja)[:MAX_NOMBRE_HOJA]
+    sufijo = f"_{parte}"
+    return str(hoja)[: MAX_NOMBRE_HOJA - len(sufijo)] + sufijo
+
+
+class HojaExcel:
+    """
+    Hoja de un LibroExcel que recibe DataFrames por fragmentos.
+
+    Cada columna del fragmento se convierte una sola vez a una lista de valores de
+    Python y se le asigna el método de escritura de xlsxwriter según su dtype
+    (write_number, write_string, write_datetime...), con el formato ya creado. Así
+    el ciclo por celda no pasa por la detección de tipos de worksheet.write ni
+    crea objetos por celda. Los nulos quedan como celdas vacías.
+
+    Attributes:
+        nombre (str): Nombre de la hoja en el libro.
+        columnas (list): Encabezados de la hoja.
+        fila (int): Siguiente fila a escribir (0 es el encabezado).
+    """
+
+    def __init__(self, libro, nombre, columnas):
+        self.libro = libro
+        self.nombre = nombre
+        self.columnas = list(columnas)
+        self.hoja = libro.libro.add_worksheet(nombre)
+        self.hoja.write_row(0, 0, [str(c) for c in self.columnas], libro.formato_encabezado)
+        self.fila = 1
+
+    @property
+    def disponibles(self):
+        return MAX_FILAS_EXCEL - self.fila
+
+    def _escritor_objeto(self):
+        """
+        Escritor de columnas object (textos, fechas, Decimal, tipos mezclados).
+        """
+        hoja = self.hoja
+        formatos = self.libro.formatos
+
+        def escribir(fila, col, valor, _):
+            if valor is None:
+                return
+            if isinstance(valor, str):
+                hoja.write_string(fila, col, valor)
+            elif isinstance(valor, bool):
+                hoja.write_boolean(fila, col, valor)
+            elif isinstance(valor, (int, float, decimal.Decimal)):
+                if valor == valor:  # NaN
+                    hoja.write_number(fila, col, valor)
+            elif isinstance(valor, datetime.datetime):
+                hoja.write_datetime(fila, col, valor, formatos["fecha_hora"])
+            elif isinstance(valor, datetime.date):
+                hoja.write_datetime(fila, col, valor, formatos["fecha"])
+            elif isinstance(valor, (datetime.time, datetime.timedelta)):
+                hoja.write_datetime(fila, col, valor, formatos["hora"])
+            else:
+                hoja.write_string(fila, col, str(valor))
+
+        return escribir
+
+    def _preparar(self, serie):
+        """
+        Retorna (método, valores, formato, con_nulos) para escribir una columna.
+        """
+        import pandas as pd
+
+        hoja = self.hoja
+        formatos = self.libro.formatos
+        tipo = serie.dtype
+        if pd.api.types.is_bool_dtype(tipo):
+            return hoja.write_boolean, serie.tolist(), None, False
+        if pd.api.types.is_integer_dtype(tipo) and not serie.hasnans:
+            return hoja.write_number, serie.tolist(), None, False
+        if pd.api.types.is_numeric_dtype(tipo):
+            valores = serie.to_numpy(dtype="float64", na_value=float("nan"))
+            return hoja.write_number, valores.tolist(), None, bool(serie.hasnans)
+        if pd.api.types.is_datetime64_any_dtype(tipo):
+            if getattr(tipo, "tz", None) is not None:
+                serie = serie.dt.tz_localize(None)
+            valores = [None if pd.isna(v) else v.to_pydatetime() for v in serie]
+            return hoja.write_datetime, valores, formatos["fecha_hora"], bool(serie.hasnans)
+        if pd.api.types.is_timedelta64_dtype(tipo):
+            valores = [None if pd.isna(v) else v.to_pytimedelta() for v in serie]
+            return hoja.write_datetime, valores, formatos["hora"], bool(serie.hasnans)
+        # Columnas object homogéneas: textos y fechas (DATE de MySQL llega como datetime.date)
+        inferido = pd.api.types.infer_dtype(serie, skipna=True)
+        if inferido in ("string", "date"):
+            valores = serie.where(serie.notna(), None).tolist()
+            if inferido == "string":
+                return hoja.write_string, valores, None, bool(serie.hasnans)
+            return hoja.write_datetime, valores, formatos["fecha"], bool(serie.hasnans)
+        return self._escritor_objeto(), serie.tolist(), None, False
+
+    def agregar(self, chunk):
+        """
+        Escribe las filas del fragmento que caben en la hoja.
+
+        Args:
+            chunk (DataFrame): Fragmento con las mismas columnas de la hoja.
+
+        Returns:
+            int: Número de filas escritas (menor que len(chunk) si la hoja se llenó).
+        """
+        cantidad = min(len(chunk), self.disponibles)
+        if cantidad <= 0:
+            return 0
+        if cantidad < len(chunk):
+            chunk = chunk.iloc[:cantidad]
+
+        columnas = [self._preparar(chunk.iloc[:, i]) for i in range(chunk.shape[1])]
+        fila = self.fila
+        # constant_memory exige escribir fila por fila, en orden
+        for r in range(cantidad):
+            for c, (metodo, valores, formato, con_nulos) in enumerate(columnas):
+                valor = valores[r]
+                if con_nulos and (valor is None or valor != valor):
+                    continue
+                metodo(fila, c, valor, formato)
+            fila += 1
+        self.fila = fila
+        return cantidad
+
+
+class LibroExcel:
+    """
+    Libro de Excel en modo constant_memory de xlsxwriter, compartido por los exportadores.
+
+    En constant_memory cada fila se escribe a disco en cuanto se pasa a la
+    siguiente, por lo que la memoria no crece con el tamaño del archivo. La
+    restricción es que las hojas se escriben una a la vez y en orden de filas.
+
+    Uso:
+        with LibroExcel(file_path) as libro:
+            filas = libro.escribir_tabla("Ventas", db_connection.stream_query(sql))
+
+    Attributes:
+        ruta (str): Ruta del archivo .xlsx.
+        libro (xlsxwriter.Workbook): Libro subyacente.
+        formatos (dict): Formatos de celda creados una sola vez por libro.
+    """
+
+    def __init__(self, ruta):
+        import xlsxwriter
+
+        self.ruta = ruta
+        self.libro = xlsxwriter.Workbook(
+            ruta,
+            {
+                "constant_memory": True,
+                # Los textos se escriben tal cual: sin convertirlos en números,
+                # fórmulas o hipervínculos
+                "strings_to_numbers": False,
+                "strings_to_formulas": False,
+                "strings_to_urls": False,
+                "remove_timezone": True,
+                "nan_inf_to_errors": True,
+            },
+        )
+        self.formato_encabezado = self.libro.add_format({"bold": True})
+        self.formatos = {
+            "fecha": self.libro.add_format({"num_format": FORMATO_FECHA}),
+            "fecha_hora": self.libro.add_format({"num_format": FORMATO_FECHA_HORA}),
+            "hora": self.libro.add_format({"num_format": FORMATO_HORA}),
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cerrar()
+        return False
+
+    def hoja(self, nombre, columnas):
+        return HojaExcel(self, nombre, columnas)
+
+    def escribir_tabla(self, hoja, fragmentos):
+        """
+        Escribe todos los fragmentos de una tabla, continuando en hojas nuevas
+        (hoja_2, hoja_3, ...) cuando se alcanza el límite de filas de Excel.
+
+        Args:
+            hoja (str): Nombre de la hoja lógica.
+            fragmentos (iterable): DataFrames con las mismas columnas.
+
+        Returns:
+            int: Número de filas escritas. Si no hubo fragmentos se crea la hoja vacía.
+        """
+        actual, parte, total = None, 0, 0
+        for chunk in fragmentos:
+            inicio = 0
+            while inicio < len(chunk):
+                if actual is None or actual.disponibles <= 0:
+                    parte += 1
+                    actual = self.hoja(nombre_hoja(hoja, parte), chunk.columns)
+                    if parte > 1:
+                        logging.info(f"La hoja {hoja} continúa en {actual.nombre}")
+                inicio += actual.agregar(chunk.iloc[inicio:])
+            total += len(chunk)
+        if actual is None:
+            self.libro.add_worksheet(nombre_hoja(hoja))
+        return total
+
+    def cerrar(self):
+        self.libro.close()
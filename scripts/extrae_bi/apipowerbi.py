@@ -3,13 +3,13 @@ import pandas as pd
 from os import path, system
 from time import time
 from distutils.log import error
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 import sqlalchemy
 import pymysql
 import csv
 import zipfile
 from zipfile import ZipFile
-from scripts.conexion import Conexion as con
+from scripts.conexion import DataBaseConnection
 from scripts.config import ConfigBasic
 import json
 import msal
@@ -21,125 +21,19 @@ from email.mime.multipart import MIMEMultipart
 from email.utils import COMMASPACE
 import ast
 
-with open("secret.json") as f:
-    secret = json.loads(f.read())
-
-    def get_secret(secret_name, secrets_file="secret.json"):
-        try:
-            with open(secrets_file) as f:
-                secrets = json.loads(f.read())
-            return secrets[secret_name]
-        except KeyError:
-            raise ValueError(f"La variable {secret_name} no existe.")
-        except FileNotFoundError:
-            raise ValueError(
-                f"No se encontró el archivo de configuración {secrets_file}."
-            )
-
+from scripts.secretos import get_secret
 
 ####################################################################
 import logging
+from scripts.logs import configurar_logging
 
-logging.basicConfig(
-    filename="log.txt",
-    level=logging.DEBUG,
-    format="%(asctime)s %(message)s",
-    filemode="w",
-)
 ####################################################################
 logging.info("Inciando Proceso")
 
 
-class DataBaseConnection:
-    def __init__(self, config, mysql_engine=None, sqlite_engine=None):
-        self.config = config
-        # Asegurarse de que los engines son instancias de conexión válidas y no cadenas
-        self.engine_mysql_bi = (
-            mysql_engine if mysql_engine else self.create_engine_mysql_bi()
-        )
-        self.engine_mysql_out = (
-            mysql_engine if mysql_engine else self.create_engine_mysql_out()
-        )
-        self.engine_sqlite = (
-            sqlite_engine if sqlite_engine else create_engine("sqlite:///mydata.db")
-        )
-        # print(self.engine_sqlite)
-
-    def create_engine_mysql_bi(self):
-        # Simplificación en la obtención de los parámetros de configuración
-        user, password, host, port, database = (
-            self.config.get("nmUsrIn"),
-            self.config.get("txPassIn"),
-            self.config.get("hostServerIn"),
-            self.config.get("portServerIn"),
-            self.config.get("dbBi"),
-        )
-        return con.ConexionMariadb3(
-            str(user), str(password), str(host), int(port), str(database)
-        )
-
-    def create_engine_mysql_out(self):
-        # Simplificación en la obtención de los parámetros de configuración
-        user, password, host, port, database = (
-            self.config.get("nmUsrOut"),
-            self.config.get("txPassOut"),
-            self.config.get("hostServerOut"),
-            self.config.get("portServerOut"),
-            self.config.get("dbSidis"),
-        )
-        return con.ConexionMariadb3(
-            str(user), str(password), str(host), int(port), str(database)
-        )
-
-    def execute_query_mysql(self, query, chunksize=None):
-        # Usar el engine correctamente
-        with self.create_engine_mysql.connect() as connection:
-            cursor = connection.execution_options(isolation_level="READ COMMITTED")
-            return pd.read_sql_query(query, cursor, chunksize=chunksize)
-
-    def execute_sql_sqlite(self, sql, params=None):
-        # Usar el engine correctamente
-        with self.engine_sqlite.connect() as connection:
-            return connection.execute(sql, params)
-
-    def execute_query_mysql_chunked(self, query, table_name, chunksize=50000):
-        try:
-            # Primero, elimina la tabla si ya existe
-            self.eliminar_tabla_sqlite(table_name)
-            # Luego, realiza la consulta y almacena los resultados en SQLite
-            with self.engine_mysql.connect() as connection:
-                cursor = connection.execution_options(isolation_level="READ COMMITTED")
-
-                for chunk in pd.read_sql_query(query, con=cursor, chunksize=chunksize):
-                    chunk.to_sql(
-                        name=table_name,
-                        con=self.engine_sqlite,
-                        if_exists="append",
-                        index=False,
-                    )
-
-                # Retorna el total de registros almacenados en la tabla SQLite
-                with self.engine_sqlite.connect() as connection:
-                    # Modificar aquí para usar fetchone correctamente
-                    total_records = connection.execute(
-                        text(f"SELECT COUNT(*) FROM {table_name}")
-                    ).fetchone()[0]
-                return total_records
-
-        except Exception as e:
-            logging.error(f"Error al ejecutar el query: {e}")
-            print(f"Error al ejecutar el query: {e}")
-            raise
-        print("terminamos de ejecutar el query")
-
-    def eliminar_tabla_sqlite(self, table_name):
-        sql = text(f"DROP TABLE IF EXISTS {table_name}")
-        with self.engine_sqlite.connect() as connection:
-            connection.execute(sql)
-
-
 class Api_PowerBi:
     def __init__(self, database_name, IdtReporteIni, IdtReporteFin):
+        configurar_logging("log.txt")
         self.database_name = database_name
         self.IdtReporteIni = IdtReporteIni
         self.IdtReporteFin = IdtReporteFin
@@ -152,7 +46,6 @@ class Api_PowerBi:
             # config_basic.print_configuration()
             # print(self.config.get("txProcedureExtrae", []))
             self.db_connection = DataBaseConnection(config=self.config)
-            self.engine_sqlite = self.db_connection.engine_sqlite
             self.engine_mysql_bi = self.db_connection.engine_mysql_bi
             self.engine_mysql_out = self.db_connection.engine_mysql_out
             print("Configuraciones preliminares de actualización terminadas")
@@ -0,0 +1,230 @@
+import os
+import uuid
+import logging
+from sqlalchemy import text
+from scripts.bulk_writer import escribir_masivo, backend_para
+
+# Modos de carga de Extrae_Bi (conf_sql.txModoCarga):
+# - directo: borra el rango e inserta en la tabla final (una transacción).
+# - staging: carga una tabla de staging y luego, en una transacción corta, borra
+#   el rango e inserta desde el staging con INSERT ... SELECT.
+# - reemplazo: carga completa en el staging y RENAME TABLE atómico. Solo para
+#   procedimientos que traen la tabla completa: con un txSql que borra un rango
+#   (:fi/:ff) o con extracción incremental, se perderían las filas fuera del
+#   rango, así que en esos procesos se usa staging (ver validar_modo).
+CARGA_DIRECTA = "directo"
+CARGA_STAGING = "staging"
+CARGA_REEMPLAZO = "reemplazo"
+MODOS_CARGA = (CARGA_DIRECTA, CARGA_STAGING, CARGA_REEMPLAZO)
+
+# Variable de entorno con el modo de los procesos que no lo tienen configurado.
+ENV_MODO_CARGA = "ADMINBI_MODO_CARGA"
+
+SUFIJO_STAGING = "__stg"
+SUFIJO_ANTERIOR = "__old"
+# MySQL limita los nombres de tabla a 64 caracteres.
+LARGO_NOMBRE = 64
+# Caracteres hexadecimales del id de ejecución en el nombre del staging.
+LARGO_EJECUCION = 8
+# Horas desde su creación tras las cuales un staging o una tabla anterior de otra
+# ejecución se considera abandonado (job interrumpido). Es mayor que el timeout
+# de los jobs de RQ, así que no se toca el staging de una ejecución en curso.
+HORAS_ABANDONO = 24
+
+
+def modo_carga(txModoCarga=None):
+    """
+    Retorna el modo de carga del proceso: el de conf_sql, si no el de
+    ADMINBI_MODO_CARGA y si no CARGA_DIRECTA.
+    """
+    for modo in (txModoCarga, os.environ.get(ENV_MODO_CARGA)):
+        if not modo:
+            continue
+        modo = str(modo).strip().lower()
+        if modo in MODOS_CARGA:
+            return modo
+        logging.warning(f"Modo de carga {modo} no reconocido")
+    return CARGA_DIRECTA
+
+
+def validar_modo(modo, txSql=None, incremental=False):
+    """
+    Retorna el modo a usar: reemplazo se cambia por staging si el proceso borra un
+    rango de fechas o es incremental, porque la tabla publicada solo tendría el rango.
+    """
+    if modo != CARGA_REEMPLAZO:
+        return modo
+    por_rango = bool(txSql) and (":fi" in txSql or ":ff" in txSql)
+    if por_rango or incremental:
+        logging.error(
+            "El modo reemplazo solo aplica a procedimientos que traen la tabla completa; "
+            f"el proceso {'es incremental' if incremental else 'borra un rango de fechas'}, "
+            "se usa staging"
+        )
+        return CARGA_STAGING
+    return modo
+
+
+def _nombre(tabla, sufijo):
+    return tabla[: LARGO_NOMBRE - len(sufijo)] + sufijo
+
+
+def _patron_like(tabla, sufijo):
+    # Nombre de _nombre() con cualquier id de ejecución, escapado para LIKE
+    prefijo = _nombre(tabla, f"{sufijo}_{'0' * LARGO_EJECUCION}")[:-LARGO_EJECUCION]
+    prefijo = prefijo.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return prefijo + "_" * LARGO_EJECUCION
+
+
+class CargaStaging:
+    """
+    Carga de una tabla de BI a través de una tabla de staging.
+
+    El resultado de Sidis se inserta en <tabla>__stg (CREATE TABLE ... LIKE la
+    tabla final), sin bloquear la tabla que consulta Power BI. Luego publicar()
+    lo lleva a la tabla final en un solo paso:
+
+    - staging: DELETE del rango (txSql) e INSERT ... SELECT en una transacción.
+    - reemplazo: RENAME TABLE tabla TO tabla__old, tabla__stg TO tabla, atómico.
+
+    Si la publicación falla, el staging se conserva y se puede reintentar sin
+    volver a ejecutar el procedimiento de Sidis. El nombre del staging lleva un
+    sufijo por ejecución (<tabla>__stg_<id>), para que dos jobs que cargan la
+    misma tabla no se borren ni se publiquen el staging el uno al otro. Los que
+    deja una ejecución interrumpida los elimina preparar() de una carga posterior
+    de la misma tabla, pasadas HORAS_ABANDONO horas desde su creación.
+
+    Attributes:
+        tabla (str): Tabla final.
+        staging (str): Tabla de staging.
+        modo (str): CARGA_STAGING o CARGA_REEMPLAZO.
+        columnas (list): Columnas del resultado (las del primer fragmento).
+        filas (int): Filas cargadas en el staging.
+        cargada (bool): Si el staging tiene la extracción completa.
+        marca: Mayor valor de la columna de marca de agua cargado, si se lleva.
+    """
+
+    def __init__(self, engine, tabla, modo):
+        self.engine = engine
+        self.tabla = tabla
+        self.ejecucion = uuid.uuid4().hex[:LARGO_EJECUCION]
+        self.staging = _nombre(tabla, f"{SUFIJO_STAGING}_{self.ejecucion}")
+        self.modo = modo
+        self.columnas = None
+        self.filas = 0
+        self.cargada = False
+        self.marca = None
+        self._quote = engine.dialect.identifier_preparer.quote
+
+    def preparar(self):
+        """
+        Crea el staging vacío con la estructura de la tabla final.
+
+        Antes elimina los staging y tablas anteriores abandonados de la tabla.
+        """
+        self.limpiar_abandonados()
+        with self.engine.begin() as connection:
+            connection.execute(text(f"DROP TABLE IF EXISTS {self._quote(self.staging)}"))
+            connection.execute(
+                text(f"CREATE TABLE {self._quote(self.staging)} LIKE {self._quote(self.tabla)}")
+            )
+        self.columnas, self.filas, self.cargada = None, 0, False
+
+    def limpiar_abandonados(self, horas=HORAS_ABANDONO):
+        """
+        Elimina las tablas <tabla>__stg_<id> y <tabla>__old_<id> de otras ejecuciones
+        creadas hace más de `horas` horas. Un error se registra y no se propaga.
+
+        Returns:
+            list: Tablas eliminadas.
+        """
+        eliminadas = []
+        try:
+            with self.engine.begin() as connection:
+                tablas = connection.execute(
+                    text(
+                        "SELECT TABLE_NAME FROM information_schema.TABLES "
+                        "WHERE TABLE_SCHEMA = DATABASE() "
+                        "AND (TABLE_NAME LIKE :staging OR TABLE_NAME LIKE :anterior) "
+                        "AND CREATE_TIME < NOW() - INTERVAL :horas HOUR"
+                    ),
+                    {
+                        "staging": _patron_like(self.tabla, SUFIJO_STAGING),
+                        "anterior": _patron_like(self.tabla, SUFIJO_ANTERIOR),
+                        "horas": int(horas),
+                    },
+                ).scalars().all()
+                for tabla in tablas:
+                    if tabla == self.staging:
+                        continue
+                    connection.execute(text(f"DROP TABLE IF EXISTS {self._quote(tabla)}"))
+                    eliminadas.append(tabla)
+        except Exception as e:
+            logging.warning(f"No se pudieron limpiar los staging abandonados de {self.tabla}: {e}")
+        if eliminadas:
+            logging.info(f"{self.tabla}: staging abandonados eliminados: {', '.join(eliminadas)}")
+        return eliminadas
+
+    def escribir(self, connection, chunk, numero):
+        """
+        Inserta un fragmento en el staging. Es el `escribir` de transferencia.transferir.
+        """
+        if numero == 0:
+            self.columnas = list(chunk.columns)
+        # El método es el que el benchmark registró para la tabla final
+        escribir_masivo(connection, chunk, self.staging, backend_para(self.tabla))
+        self.filas += len(chunk)
+
+    def publicar(self, txSql=None, IdtReporteIni=None, IdtReporteFin=None):
+        """
+        Lleva el staging a la tabla final.
+
+        Sin filas no se modifica la tabla final, igual que en la carga directa.
+
+        Args:
+            txSql (str): DELETE del rango con :fi y :ff (modo staging).
+            IdtReporteIni (str): Fecha inicial del rango.
+            IdtReporteFin (str): Fecha final del rango.
+
+        Returns:
+            bool: True si se publicaron filas.
+        """
+        if not self.filas:
+            logging.info(f"{self.tabla}: la extracción no trajo filas; la tabla no se modifica")
+            self.descartar()
+            return False
+        q = self._quote
+        if self.modo == CARGA_REEMPLAZO:
+            anterior = _nombre(self.tabla, f"{SUFIJO_ANTERIOR}_{self.ejecucion}")
+            with self.engine.begin() as connection:
+                connection.execute(text(f"DROP TABLE IF EXISTS {q(anterior)}"))
+                connection.execute(
+                    text(
+                        f"RENAME TABLE {q(self.tabla)} TO {q(anterior)}, "
+                        f"{q(self.staging)} TO {q(self.tabla)}"
+                    )
+                )
+                connection.execute(text(f"DROP TABLE IF EXISTS {q(anterior)}"))
+        else:
+            # Columnas explícitas: las que no trae el resultado (por ejemplo un id
+            # autoincremental) toman su valor en la tabla final
+            columnas = ", ".join(q(c) for c in self.columnas)
+            with self.engine.begin() as connection:
+                if txSql:
+                    connection.execute(text(txSql), {"fi": IdtReporteIni, "ff": IdtReporteFin})
+                connection.execute(
+                    text(
+                        f"INSERT INTO {q(self.tabla)} ({columnas}) "
+                        f"SELECT {columnas} FROM {q(self.staging)}"
+                    )
+                )
+            self.descartar()
+        logging.info(f"{self.tabla}: {self.filas} filas publicadas desde el staging ({self.modo})")
+        return True
+
+    def descartar(self):
+        try:
+            with self.engine.begin() as connection:
+                connection.execute(text(f"DROP TABLE IF EXISTS {self._quote(self.staging)}"))
+        except Exception as e:
+            logging.warning(f"No se pudo eliminar el staging {self.staging}: {e}")
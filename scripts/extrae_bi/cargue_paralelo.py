@@ -0,0 +1,200 @@
+import os
+import copy
+import time
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from scripts.ejecucion_hojas import limite_servidor
+from scripts.extrae_bi.planificador import (
+    REPORTES_POSTERIORES,
+    Planificador,
+    planificar_extraccion,
+)
+
+# Variable de entorno con los procesos que leen y limpian los archivos de un
+# cargue (zip o planos). Con 1 (por defecto) los archivos se cargan uno después
+# del otro, como antes.
+ENV_CARGUE_PROCESOS = "ADMINBI_CARGUE_PROCESOS"
+
+# Estados de cada archivo en el resultado del cargue.
+CARGADO = "cargado"
+SIN_DATOS = "sin datos"
+ERROR = "error"
+
+# Cargadores ya configurados en el proceso hijo: (clase, argumentos) -> instancia.
+_cargadores = {}
+
+
+def procesos_cargue():
+    try:
+        return max(1, int(os.environ.get(ENV_CARGUE_PROCESOS, 1)))
+    except ValueError:
+        return 1
+
+
+def _cargador(clase, argumentos):
+    # Configurar un cargador consulta la base de datos; se hace una vez por proceso
+    clave = (clase, argumentos)
+    if clave not in _cargadores:
+        _cargadores[clave] = clase(*argumentos)
+    return _cargadores[clave]
+
+
+def _preparar_archivo(clase, argumentos, conf):
+    """
+    Lee y limpia un archivo en un proceso del pool.
+
+    Returns:
+        tuple: (DataFrame listo para insertar, segundos).
+    """
+    inicio = time.perf_counter()
+    df = _cargador(clase, argumentos).preparar_archivo(conf)
+    return df, time.perf_counter() - inicio
+
+
+class CargueParalelo:
+    """
+    Carga en paralelo los archivos de un cargue (CargueZip o CarguePlano).
+
+    La lectura y limpieza de cada archivo (pandas y normalización de texto, que
+    no liberan el GIL) se hace en un pool de procesos; el borrado del rango y la
+    inserción de cada tabla se hacen en hilos del proceso principal, en cuanto el
+    archivo está listo y con el cupo de limite_servidor del servidor BI. Los
+    reportes de REPORTES_POSTERIORES y las entradas que escriben en la misma tabla
+    conservan el orden de la lista (planificar_extraccion). Así la duración del
+    cargue se acerca a la del archivo más grande.
+
+    Attributes:
+        cargador: Instancia de CargueZip o CarguePlano ya configurada.
+        argumentos (tuple): Argumentos con que se crea el cargador en cada proceso.
+        procesos (int): Procesos del pool de lectura.
+        resultados (list): Un dict por entrada con archivo, tabla, estado, filas,
+            segundos de lectura y de carga, y el error si lo hubo.
+    """
+
+    def __init__(self, cargador, argumentos, procesos=None):
+        self.cargador = cargador
+        self.argumentos = tuple(argumentos)
+        self.procesos = procesos or procesos_cargue()
+        self.resultados = []
+        self._lock = threading.Lock()
+        self._total = 0
+
+    def _copia(self, conf):
+        # Cada tarea trabaja sobre su propia config; los engines se comparten
+        cargador = copy.copy(self.cargador)
+        cargador.config = dict(self.cargador.config)
+        cargador.actualizar_static_page(conf)
+        return cargador
+
+    def _registrar(self, resultado):
+        with self._lock:
+            self.resultados.append(resultado)
+            avance = len(self.resultados)
+        mensaje = (
+            f"[{avance}/{self._total}] {resultado['archivo']} -> {resultado['tabla']}: "
+            f"{resultado['estado']}, {resultado['filas']} filas, lectura "
+            f"{resultado['segundos_lectura']:.1f} s, carga {resultado['segundos_carga']:.1f} s"
+        )
+        if resultado["estado"] == ERROR:
+            logging.error(f"{mensaje}: {resultado['error']}")
+        else:
+            logging.info(mensaje)
+        return resultado
+
+    def _cargar_archivo(self, cargador, futuro):
+        config = cargador.config
+        resultado = {
+            "archivo": config["txDescripcion"],
+            "tabla": config["txTabla"],
+            "estado": ERROR,
+            "filas": 0,
+            "segundos_lectura": 0.0,
+            "segundos_carga": 0.0,
+            "error": None,
+        }
+        try:
+            df, resultado["segundos_lectura"] = futuro.result()
+            resultado["filas"] = len(df.index)
+            if df.empty:
+                resultado["estado"] = SIN_DATOS
+                return self._registrar(resultado)
+            inicio = time.perf_counter()
+            with limite_servidor(config, "In"):
+                cargador.consulta_sql_bi(config["IdtReporteIni"], config["IdtReporteFin"])
+                insertado = cargador.insertar_sql(df, config["txTabla"])
+            resultado["segundos_carga"] = time.perf_counter() - inicio
+            if insertado:
+                resultado["estado"] = CARGADO
+            else:
+                resultado["error"] = "la inserción falló (ver log)"
+        except Exception as e:
+            resultado["error"] = str(e)
+        return self._registrar(resultado)
+
+    def _reporte_posterior(self, cargador):
+        config = cargador.config
+        cargador.procedimiento_a_sql(
+            IdtReporteIni=config["IdtReporteIni"],
+            IdtReporteFin=config["IdtReporteFin"],
+            nmReporte=config["nmReporte"],
+            nmProcedure_in=config["nmProcedure_in"],
+            nmProcedure_out=config["nmProcedure_out"],
+            txTabla=config["txTabla"],
+        )
+
+    def ejecutar(self, confs):
+        """
+        Carga las entradas de txProcedureCargue.
+
+        Args:
+            confs (list): DataFrames de una fila de conf_sql, en el orden de la lista.
+
+        Returns:
+            list: Resultados por archivo (ver `resultados`), en el orden en que terminaron.
+        """
+        entradas = [(f"{i}:{conf['nbSql'].values[0]}", conf) for i, conf in enumerate(confs)]
+        archivos = [
+            (clave, conf)
+            for clave, conf in entradas
+            if str(conf["nmReporte"].values[0]) not in REPORTES_POSTERIORES
+        ]
+        self.resultados = []
+        self._total = len(archivos)
+        inicio = time.perf_counter()
+        logging.info(f"Cargue paralelo de {self._total} archivos con {self.procesos} procesos")
+
+        with ProcessPoolExecutor(max_workers=self.procesos) as pool:
+            # Todas las lecturas se envían de inmediato: no dependen de lo ya cargado
+            futuros = {
+                clave: pool.submit(_preparar_archivo, type(self.cargador), self.argumentos, conf)
+                for clave, conf in archivos
+            }
+            plan = planificar_extraccion(
+                [
+                    (clave, str(conf["nmReporte"].values[0]), str(conf["txTabla"].values[0]))
+                    for clave, conf in entradas
+                ]
+            )
+            confs_por_clave = dict(entradas)
+            # El mapeo de caracteres se consulta una vez y lo comparten las copias
+            self.cargador.mapeo_de_caracteres()
+            # Un hilo por entrada: las que esperan su archivo no ocupan conexiones
+            planificador = Planificador(max_hilos=max(1, len(entradas)))
+            for clave, dependencias in plan:
+                cargador = self._copia(confs_por_clave[clave])
+                if clave in futuros:
+                    funcion = lambda c=cargador, f=futuros[clave]: self._cargar_archivo(c, f)
+                else:
+                    funcion = lambda c=cargador: self._reporte_posterior(c)
+                planificador.agregar(clave, funcion, dependencias)
+            planificador.ejecutar()
+
+        cargados = sum(1 for r in self.resultados if r["estado"] == CARGADO)
+        errores = sum(1 for r in self.resultados if r["estado"] == ERROR)
+        logging.info(
+            f"Cargue paralelo terminado en {time.perf_counter() - inicio:.1f} s: "
+            f"{cargados} cargados, {self._total - cargados - errores} sin datos, {errores} con error"
+        )
+        return self.resultados
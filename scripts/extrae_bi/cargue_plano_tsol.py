@@ -2,200 +2,27 @@ import zipfile
 import os
 import pandas as pd
 import logging
+from scripts.logs import configurar_logging
 
-from scripts.conexion import Conexion as con
+from scripts.conexion import DataBaseConnection
 from scripts.config import ConfigBasic
-from sqlalchemy import create_engine, text, inspect
+from scripts.cache_artefactos import registrar_cambio_datos
+from scripts.bulk_writer import escribir_masivo
+from scripts.extrae_bi.lector_zip import abrir_texto
+from scripts.extrae_bi.cargue_paralelo import CargueParalelo, procesos_cargue
+from scripts.metadatos import cache_metadatos
+from scripts.normalizacion import (
+    MapeoCaracteres,
+    mapeo_en_servidor,
+    normalizar_columnas,
+    quitar_acentos,
+)
+from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError, OperationalError
 from django.contrib import sessions
 import re
 import ast
-from django.core.exceptions import ImproperlyConfigured
 import json
-import unicodedata
-
-logging.basicConfig(
-    filename="log.txt",
-    level=logging.DEBUG,
-    format="%(asctime)s %(message)s",
-    filemode="w",
-)
-logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
-logging.info("Iniciando Proceso CargueZip")
-
-
-def get_secret(secret_name, secrets_file="secret.json"):
-    try:
-        with open(secrets_file) as f:
-            secrets = json.loads(f.read())
-        return secrets[secret_name]
-    except KeyError:
-        raise ImproperlyConfigured(f"La variable {secret_name} no existe")
-    except FileNotFoundError:
-        raise ImproperlyConfigured(
-            f"No se encontró el archivo de configuración {secrets_file}"
-        )
-
-
-class DataBaseConnection:
-    """
-    Clase para manejar las conexiones a bases de datos MySQL y SQLite.
-
-    Esta clase facilita la conexión a las bases de datos y la ejecución de consultas SQL,
-    incluyendo la ejecución de consultas grandes en fragmentos (chunks).
-
-    Attributes:
-        config (dict): Configuración utilizada para las conexiones a las bases de datos.
-        engine_mysql (sqlalchemy.engine.base.Engine): Motor SQLAlchemy para la base de datos MySQL.
-        engine_sqlite (sqlalchemy.engine.base.Engine): Motor SQLAlchemy para la base de datos SQLite.
-    """
-
-    def __init__(self, config):
-        """
-        Inicializa la instancia de DataBaseConnection con la configuración proporcionada.
-
-        Args:
-            config (dict): Configuración para las conexiones a las bases de datos.
-            mysql_engine (sqlalchemy.engine.base.Engine, opcional): Motor SQLAlchemy para la base de datos MySQL.
-            sqlite_engine (sqlalchemy.engine.base.Engine, opcional): Motor SQLAlchemy para la base de datos SQLite.
-        """
-        self.config = config
-        # Establecer o crear el motor para MySQL
-        self.engine_mysql_bi = self.create_engine_mysql_bi()
-        self.engine_mysql_conf = self.create_engine_mysql_conf()
-        print(self.engine_mysql_bi)
-        print(self.engine_mysql_conf)
-        # Establecer o crear el motor para SQLite
-        self.engine_sqlite = create_engine("sqlite:///mydata.db")
-        print(self.engine_sqlite)
-
-    def create_engine_mysql_bi(self):
-        """
-        Crea un motor SQLAlchemy para la conexión a la base de datos MySQL.
-
-        Utiliza la configuración proporcionada para establecer la conexión.
-
-        Returns:
-            sqlalchemy.engine.base.Engine: Motor SQLAlchemy para la base de datos MySQL.
-        """
-        # Extraer los parámetros de configuración para la conexión MySQL
-        user, password, host, port, database = (
-            self.config.get("nmUsrIn"),
-            self.config.get("txPassIn"),
-            self.config.get("hostServerIn"),
-            self.config.get("portServerIn"),
-            self.config.get("dbBi"),
-        )
-        # Crear y retornar el motor de conexión
-        return con.ConexionMariadb3(
-            str(user), str(password), str(host), int(port), str(database)
-        )
-
-    def create_engine_mysql_conf(self):
-        """
-        Crea un motor SQLAlchemy para la conexión a la base de datos MySQL.
-
-        Utiliza la configuración proporcionada para establecer la conexión.
-
-        Returns:
-            sqlalchemy.engine.base.Engine: Motor SQLAlchemy para la base de datos MySQL.
-        """
-        # Extraer los parámetros de configuración para la conexión MySQL
-        user, password, host, port, database = (
-            get_secret("DB_USERNAME"),
-            get_secret("DB_PASS"),
-            get_secret("DB_HOST"),
-            int(get_secret("DB_PORT")),
-            get_secret("DB_NAME"),
-        )
-        # Crear y retornar el motor de conexión
-        return con.ConexionMariadb3(
-            str(user), str(password), str(host), int(port), str(database)
-        )
-
-    def execute_query_mysql(self, query, chunksize=None):
-        """
-        Ejecuta una consulta SQL en la base de datos MySQL.
-
-        Args:
-            query (str): La consulta SQL a ejecutar.
-            chunksize (int, opcional): El tamaño del fragmento para la ejecución de la consulta.
-
-        Returns:
-            DataFrame: Un DataFrame de pandas con los resultados de la consulta.
-        """
-        # Conectar a la base de datos y ejecutar la consulta
-        with self.create_engine_mysql_bi.connect() as connection:
-            cursor = connection.execution_options(isolation_level="READ COMMITTED")
-            return pd.read_sql_query(query, cursor, chunksize=chunksize)
-
-    def execute_sql_sqlite(self, sql, params=None):
-        """
-        Ejecuta una sentencia SQL en la base de datos SQLite.
-
-        Args:
-            sql (str): La sentencia SQL a ejecutar.
-            params (dict, opcional): Parámetros para la sentencia SQL.
-
-        Returns:
-            Resultado de la ejecución de la sentencia.
-        """
-        # Conectar a la base de datos SQLite y ejecutar la sentencia
-        with self.engine_sqlite.connect() as connection:
-            return connection.execute(sql, params)
-
-    def execute_query_mysql_chunked(self, query, table_name, chunksize=50000):
-        """
-        Ejecuta una consulta SQL en la base de datos MySQL y almacena los resultados en SQLite,
-        procesando la consulta en fragmentos (chunks).
-
-        Args:
-            query (str): La consulta SQL a ejecutar en MySQL.
-            table_name (str): El nombre de la tabla en SQLite donde se almacenarán los resultados.
-            chunksize (int, opcional): El tamaño del fragmento para la ejecución de la consulta.
-
-        Returns:
-            int: El número total de registros almacenados en la tabla SQLite.
-        """
-        try:
-            # Eliminar la tabla en SQLite si ya existe
-            self.eliminar_tabla_sqlite(table_name)
-            # Conectar a MySQL y ejecutar la consulta en fragmentos
-            with self.engine_mysql_bi.connect() as connection:
-                cursor = connection.execution_options(isolation_level="READ COMMITTED")
-                for chunk in pd.read_sql_query(query, con=cursor, chunksize=chunksize):
-                    # Almacenar cada fragmento en la tabla SQLite
-                    chunk.to_sql(
-                        name=table_name,
-                        con=self.engine_sqlite,
-                        if_exists="append",
-                        index=False,
-                    )
-
-            # Contar y retornar el total de registros en la tabla SQLite
-            with self.engine_sqlite.connect() as connection:
-                total_records = connection.execute(
-                    text(f"SELECT COUNT(*) FROM {table_name}")
-                ).fetchone()[0]
-            return total_records
-
-        except Exception as e:
-            # Registrar y propagar cualquier excepción que ocurra
-            logging.error(f"Error al ejecutar el query: {e}")
-            print(f"Error al ejecutar el query: {e}")
-            raise
-
-    def eliminar_tabla_sqlite(self, table_name):
-        """
-        Elimina una tabla específica en la base de datos SQLite.
-
-        Args:
-            table_name (str): El nombre de la tabla a eliminar.
-        """
-        # Ejecutar la sentencia para eliminar la tabla si existe
-        sql = text(f"DROP TABLE IF EXISTS {table_name}")
-        with self.engine_sqlite.connect() as connection:
-            connection.execute(sql)
 
 
 class CarguePlano:
@@ -207,6 +34,8 @@ class CarguePlano:
     """
 
     def __init__(self, database_name):
+        configurar_logging("log.txt", logging.INFO)
+        logging.info("Iniciando Proceso CargueZip")
         print("listo iniciando aqui en la clase de zip")
         """
         Inicializa la instancia de InterfaceContable.
@@ -217,6 +46,8 @@ class CarguePlano:
             IdtReporteFin (str): Identificador del fin del rango de reportes.
         """
         self.database_name = database_name
+        # Mapeo de caracteres compilado; se consulta una vez por job
+        self._mapeo_caracteres = None
         self.configurar(database_name)
 
     def configurar(self, database_name):
@@ -224,7 +55,7 @@ class CarguePlano:
         """
         Configura la conexión a las bases de datos y establece las variables de entorno necesarias.
 
-        Esta función crea una configuración básica y establece las conexiones a las bases de datos MySQL y SQLite
+        Esta función crea una configuración básica y establece las conexiones a las bases de datos MySQL
         utilizando los parámetros de configuración.
 
         Args:
@@ -239,7 +70,6 @@ class CarguePlano:
             self.config = config_basic.config
             # Establecer conexiones a las bases de datos
             self.db_connection = DataBaseConnection(config=self.config)
-            self.engine_sqlite = self.db_connection.engine_sqlite
             self.engine_mysql_bi = self.db_connection.engine_mysql_bi
             self.engine_mysql_conf = self.db_connection.engine_mysql_conf
         except Exception as e:
@@ -315,6 +145,8 @@ class CarguePlano:
             return {"success": False, "error_message": "No hay datos para procesar"}
         ItpReporte = txProcedureCargue
         print(ItpReporte)
+        if procesos_cargue() > 1:
+            return self.cargue_paralelo(ItpReporte)
         for nb_sql in ItpReporte:
             try:
                 with self.engine_mysql_conf.connect() as connection:
@@ -360,6 +192,47 @@ class CarguePlano:
                     f"No fue posible extraer la información de {self.config['nmReporte']} por {e}"
                 )
 
+    def cargue_paralelo(self, ItpReporte):
+        """
+        Carga los archivos de txProcedureCargue en paralelo (ADMINBI_CARGUE_PROCESOS > 1).
+
+        Returns:
+            list: Resultado por archivo (ver CargueParalelo.resultados).
+        """
+        confs = []
+        for nb_sql in ItpReporte:
+            if isinstance(nb_sql, list):
+                nb_sql = nb_sql[0] if nb_sql else None
+            if not nb_sql:
+                logging.error("El valor de nb_sql está vacío o es inválido.")
+                continue
+            try:
+                with self.engine_mysql_conf.connect() as connection:
+                    sql = text("SELECT * FROM powerbi_adm.conf_sql WHERE nbSql = :nb_sql")
+                    conf = pd.read_sql_query(sql, con=connection, params={"nb_sql": nb_sql})
+            except Exception as e:
+                logging.error(f"Error al consultar conf_sql para {nb_sql}: {e}")
+                continue
+            if conf.empty:
+                logging.error(f"El proceso {nb_sql} no existe en conf_sql")
+                continue
+            confs.append(conf)
+        return CargueParalelo(self, (self.database_name,)).ejecutar(confs)
+
+    def preparar_archivo(self, conf):
+        """
+        Lee y limpia el archivo de un proceso de conf_sql; lo usa CargueParalelo
+        en los procesos del pool.
+
+        Args:
+            conf (DataFrame): Fila de conf_sql del proceso.
+
+        Returns:
+            DataFrame: Datos listos para insertar, o vacío si hubo un error.
+        """
+        self.actualizar_static_page(conf)
+        return self.consulta_txt_out()
+
     def actualizar_static_page(self, df):
         self.config["txTabla"] = str(df["txTabla"].values[0])
         self.config["nmReporte"] = str(df["nmReporte"].values[0])
@@ -369,48 +242,11 @@ class CarguePlano:
         self.config["txSql"] = str(df["txSql"].values[0])
 
     def obtener_claves_primarias(self, txTabla):
-        claves_primarias = []
-        try:
-            inspector = inspect(self.engine_mysql_bi)
-
-            # Obtener la información de la clave primaria para la tabla
-            pk_constraint = inspector.get_pk_constraint(txTabla)
-            claves_primarias = pk_constraint["constrained_columns"]
-
-            # Si no hay claves primarias definidas, registra un mensaje informativo en lugar de un error
-            if not claves_primarias:
-                logging.info(f"La tabla {txTabla} no tiene claves primarias definidas.")
-
-        except Exception as e:
-            # Cambia el mensaje de error para reflejar que puede ser un problema de acceso a la base de datos o que la tabla no exista
-            logging.error(
-                f"No se pudo verificar las claves primarias de {txTabla}: {e}"
-            )
-
-        return claves_primarias
+        # Los metadatos se inspeccionan una vez y se reutilizan entre archivos y jobs
+        return list(cache_metadatos.obtener(self.engine_mysql_bi, txTabla).claves_primarias)
 
     def obtener_nombres_columnas(self, txTabla):
-        info_columnas = {}
-        try:
-            with self.engine_mysql_bi.connect() as connection:
-                inspector = inspect(self.engine_mysql_bi)
-                columnas = inspector.get_columns(txTabla)
-                for columna in columnas:
-                    nombre = columna["name"]
-                    tipo = str(columna["type"])
-                    # Ajustar la lógica para mapear tipos de SQL a tipos de Python/Pandas aquí
-                    pandas_tipo = "str"  # Por defecto, trata todo como cadena
-                    if "int" in tipo.lower():
-                        pandas_tipo = "int"
-                    elif (
-                        "float" in tipo.lower()
-                        or "decimal" in tipo.lower()
-                        or "double" in tipo.lower()
-                    ):
-                        pandas_tipo = "float"
-                    info_columnas[nombre] = pandas_tipo
-        except Exception as e:
-            logging.error(f"Error al obtener información de columnas de {txTabla}: {e}")
+        info_columnas = dict(cache_metadatos.obtener(self.engine_mysql_bi, txTabla).tipos)
         print(info_columnas)
         return info_columnas
 
@@ -424,21 +260,7 @@ class CarguePlano:
         Returns:
             dict: Un diccionario con los nombres de las columnas de texto y su tipo de dato como 'str'.
         """
-        columnas_texto = {}
-        try:
-            with self.engine_mysql_bi.connect() as connection:
-                inspector = inspect(self.engine_mysql_bi)
-                columnas = inspector.get_columns(txTabla)
-                for columna in columnas:
-                    nombre = columna["name"]
-                    tipo = str(columna["type"]).lower()
-                    if any(t in tipo for t in ["char", "text", "varchar"]):
-                        columnas_texto[nombre] = "str"
-        except Exception as e:
-            logging.error(
-                f"Error al obtener nombres de columnas de texto de {txTabla}: {e}"
-            )
-        return columnas_texto
+        return dict(cache_metadatos.obtener(self.engine_mysql_bi, txTabla).columnas_texto)
 
     def limpiar_datos_intercliente(self, df):
         """
@@ -451,15 +273,14 @@ class CarguePlano:
             DataFrame: DataFrame limpio con los datos preparados para 'tmp_intercliente'.
         """
         # Establece un valor por defecto para fechas vacías.
-        df["Fecha Ingreso"] = df["Fecha Ingreso"].apply(
-            lambda x: x if x else "2020-01-01"
-        )
+        fechas = df["Fecha Ingreso"]
+        df["Fecha Ingreso"] = fechas.where(fechas.fillna("").astype(bool), "2020-01-01")
 
         # Define la columna 'Cod. Cliente' para limpieza y preparación.
         col = "Cod. Cliente"
 
         # Convierte a texto y elimina espacios al principio y final.
-        df[col] = df[col].apply(lambda x: str(x).strip() if pd.notnull(x) else x)
+        df[col] = df[col].where(df[col].isna(), df[col].astype(str).str.strip())
 
         # Elimina saltos de línea, retornos de carro y comillas.
         df[col] = df[col].replace({"\\n": "", "\\r": "", '"': "", "'": ""}, regex=True)
@@ -470,26 +291,26 @@ class CarguePlano:
         # Establece longitudes máximas permitidas según la configuración de la base de datos.
         MAX_LENGTH = 30  # Para 'Cod. Cliente', 'Barrio' y 'Telefono'.
         MAX_LENGTH_DIR = 150  # Para 'Direccion' y 'Nom. Cliente'.
+        # Si la tabla declara otra longitud, prevalece la de la base de datos
+        longitudes = cache_metadatos.obtener(
+            self.engine_mysql_bi, self.config["txTabla"]
+        ).longitudes
 
         # Recorta los valores a la longitud máxima y maneja los valores 'NAN'.
         for field, max_len in [
-            ("Cod. Cliente", MAX_LENGTH),
-            ("Barrio", MAX_LENGTH),
-            ("Telefono", MAX_LENGTH),
-            ("Direccion", MAX_LENGTH_DIR),
-            ("Nom. Cliente", MAX_LENGTH_DIR),
+            ("Cod. Cliente", longitudes.get("Cod. Cliente", MAX_LENGTH)),
+            ("Barrio", longitudes.get("Barrio", MAX_LENGTH)),
+            ("Telefono", longitudes.get("Telefono", MAX_LENGTH)),
+            ("Direccion", longitudes.get("Direccion", MAX_LENGTH_DIR)),
+            ("Nom. Cliente", longitudes.get("Nom. Cliente", MAX_LENGTH_DIR)),
         ]:
-            df[field] = df[field].apply(
-                lambda x: str(x)[:max_len] if x != "NAN" else ""
+            df[field] = (
+                df[field].astype(str).str.slice(0, max_len).where(df[field] != "NAN", "")
             )
 
         # Filtra las filas donde 'Cod. Cliente' no es nulo, vacío o igual a 'NAN'.
-        df_filtrado = df[(df[col] != "NAN") & (df[col].str.strip() != "")]
-
-        # Elimina duplicados basados en las claves primarias de la tabla.
-        df_limpio = self.eliminar_duplicados_df(df_filtrado, self.config["txTabla"])
-
-        return df_limpio
+        # Los duplicados se eliminan en insertar_sql, después de normalizar el texto.
+        return df[(df[col] != "NAN") & (df[col].str.strip() != "")]
 
     def limpiar_espacios_y_caracteres(self, df, columnas_de_texto):
         """
@@ -502,74 +323,61 @@ class CarguePlano:
         Returns:
             DataFrame: El DataFrame con las columnas limpias.
         """
-        for col, tipo in columnas_de_texto.items():
-            if col in df:  # Verifica que la columna exista en el DataFrame.
-                # Limpieza y normalización de texto en la columna.
-                df[col] = (
-                    df[col]
-                    .astype(str)  # Convierte a cadena para manipulación de texto.
-                    .replace(
-                        {"\\n": "", "\\r": ""}, regex=True
-                    )  # Elimina saltos de línea y retornos de carro.
-                    .str.replace(
-                        r"\s+", " ", regex=True
-                    )  # Reduce espacios múltiples a uno solo.
-                    .str.strip()  # Elimina espacios al principio y al final.
-                    .str.upper()  # Convierte a mayúsculas para consistencia.
-                )
-
-                # Elimina comillas dobles y simples.
-                df[col] = df[col].str.replace('"', "").str.replace("'", "")
-
-                # Aquí asumimos que la función `remove_accents` ya está definida en tu clase.
-                # Aplica la función para remover acentos si la columna es una cadena de texto.
-                if tipo == "str":
-                    df[col] = df[col].apply(
-                        lambda x: self.remove_accents(x) if x else x
-                    )
-
-                # Elimina duplicados en el DataFrame basado en la configuración de la tabla actual.
-                df = self.eliminar_duplicados_df(df, self.config["txTabla"])
-
-        return df
+        # Una pasada de translate por columna (mayúsculas, comillas, saltos de
+        # línea y tildes en las columnas de tipo str); los duplicados se
+        # eliminan una sola vez en insertar_sql.
+        return normalizar_columnas(df, columnas_de_texto)
 
     def remove_accents(self, input_str):
-        # Define los caracteres que deseas preservar
-        preserved_chars = "Ññ@#"
-
-        # Normaliza y descompone el texto en sus componentes básicos
-        nfkd_form = unicodedata.normalize("NFKD", input_str)
-
-        # Reconstruye la cadena preservando solo los caracteres ASCII, los caracteres preservados y convirtiendo los demás a su forma base.
-        only_preserved = "".join(
-            [
-                c if c in preserved_chars else unicodedata.normalize("NFC", c)
-                for c in nfkd_form
-                if not unicodedata.combining(c)
-            ]
-        )
+        # Quita tildes conservando Ññ@# (tabla precalculada en scripts.normalizacion)
+        return quitar_acentos(input_str)
 
-        return only_preserved
+    def limpiar_caracteres_en_db(self, txTabla, mapeo_caracteres, rango=None):
+        """
+        Aplica el mapeo de caracteres en la base de datos con un solo UPDATE: cada
+        columna de texto queda con los REPLACE anidados de todo el mapeo.
 
-    def limpiar_caracteres_en_db(self, txTabla, mapeo_caracteres):
+        Args:
+            txTabla (str): Tabla a limpiar.
+            mapeo_caracteres (MapeoCaracteres): Mapeo compilado.
+            rango (tuple, opcional): (columna, mínimo, máximo) de la llave recién
+                cargada; sin rango se recorre toda la tabla.
+        """
+        info_columnas = self.obtener_nombres_columnas_texto(txTabla)
+        if not info_columnas or not mapeo_caracteres:
+            return
+        quote = self.engine_mysql_bi.dialect.identifier_preparer.quote
+        parametros = {}
+        asignaciones = [
+            f"{quote(columna)} = {mapeo_caracteres.expresion_sql(quote(columna), parametros)}"
+            for columna in info_columnas
+        ]
+        sql = f"UPDATE {quote(txTabla)} SET {', '.join(asignaciones)}"
+        if rango:
+            columna, parametros["minimo"], parametros["maximo"] = rango
+            sql += f" WHERE {quote(columna)} BETWEEN :minimo AND :maximo"
         try:
-            # Obtener los nombres de todas las columnas de la tabla
-            info_columnas = self.obtener_nombres_columnas_texto(txTabla)
-
-            with self.engine_mysql_bi.connect() as connection:
-                for columna, tipo in info_columnas.items():
-                    columna_escaped = f"`{columna}`"
-                    # Aquí podrías agregar lógica para verificar si la columna es de texto
-                    for original, reemplazo in mapeo_caracteres.items():
-                        sql = text(
-                            f"UPDATE {txTabla} SET {columna_escaped} = REPLACE({columna_escaped}, :original, :reemplazo) WHERE {columna_escaped} LIKE :original"
-                        )
-                        connection.execute(
-                            sql, {"original": original, "reemplazo": reemplazo}
-                        )
+            with self.engine_mysql_bi.begin() as connection:
+                connection.execute(text(sql), parametros)
         except Exception as e:
             logging.error(f"Error al limpiar caracteres en {txTabla}: {e}")
 
+    def rango_cargado(self, txTabla, df):
+        """
+        Retorna (columna, mínimo, máximo) de la primera llave primaria en las filas
+        cargadas, o None si la tabla no tiene llave o el DataFrame no la trae.
+        """
+        claves = self.obtener_claves_primarias(txTabla)
+        if df is None or df.empty or not claves or claves[0] not in df:
+            return None
+        columna = df[claves[0]]
+        minimo, maximo = columna.min(), columna.max()
+        return (
+            claves[0],
+            getattr(minimo, "item", lambda: minimo)(),
+            getattr(maximo, "item", lambda: maximo)(),
+        )
+
     def agregar_numero_linea(self, df):
         # Claves principales para ordenar y agrupar
         claves_principales = ["Fac. numero", "Tipo"]
@@ -647,18 +455,18 @@ class CarguePlano:
             print("Muestra del DataFrame antes de insertar en la base de datos:")
             print(resultado.head(10))  # Puedes cambiar el número dentro de head() para mostrar más filas
             
+            # Mapeo de caracteres (tabla mapeocaracteres) en memoria, antes del insert
+            self.mapeo_de_caracteres().aplicar_columnas(
+                resultado, self.obtener_nombres_columnas_texto(txTabla)
+            )
             with self.engine_mysql_bi.connect() as connection:
                 cursor = connection.execution_options(isolation_level="READ COMMITTED")
-                resultado.to_sql(
-                    name=txTabla,
-                    con=cursor,
-                    if_exists="append",
-                    index=False,
-                    index_label=None,
-                )
-                # Proceso de limpieza
-                self.proceso_de_limpieza(txTabla)
-                return logging.info("los datos se han insertado correctamente")
+                with cursor.begin():
+                    escribir_masivo(cursor, resultado, txTabla)
+            # Limpieza en el servidor (opcional), con las filas ya confirmadas
+            self.proceso_de_limpieza(txTabla, resultado)
+            logging.info("los datos se han insertado correctamente")
+            return True
         except IntegrityError as e:
             logging.error(f"Error de integridad al insertar datos en {txTabla}: {e}")
         except OperationalError as e:
@@ -671,33 +479,49 @@ class CarguePlano:
             )
         except Exception as e:
             logging.error(f"Error inesperado al insertar datos en {txTabla}: {e}")
+        return False
 
 
     def mapeo_de_caracteres(self):
+        """
+        Retorna la tabla mapeocaracteres compilada en un MapeoCaracteres. Se consulta
+        y compila una vez por job; si la consulta falla se reintenta en el siguiente archivo.
+        """
+        if self._mapeo_caracteres is not None:
+            return self._mapeo_caracteres
         try:
             with self.engine_mysql_bi.connect() as connection:
                 sql = text(f"SELECT * FROM {self.config['dbBi']}.mapeocaracteres")
                 result = connection.execute(sql)
-                return {
+                mapeo = {
                     row["caracter_original"]: row["caracter_reemplazo"]
                     for row in result.mappings()
                 }
         except Exception as e:
             logging.error(f"Error al obtener mapeo de caracteres: {e}")
-            return {}
+            return MapeoCaracteres({})
+        self._mapeo_caracteres = MapeoCaracteres(mapeo)
+        if not self._mapeo_caracteres:
+            logging.warning("La tabla mapeocaracteres está vacía; no se reemplazarán caracteres.")
+        return self._mapeo_caracteres
 
-    def proceso_de_limpieza(self, txTabla):
-        # Obtener el mapeo de caracteres
+    def proceso_de_limpieza(self, txTabla, df=None):
+        """
+        Repite el mapeo de caracteres en la base de datos, limitado al rango de
+        llaves de `df`, solo si ADMINBI_MAPEO_SERVIDOR está activo: por defecto el
+        mapeo ya se aplicó en memoria en insertar_sql.
+        """
+        if not mapeo_en_servidor():
+            return
         mapeo_caracteres = self.mapeo_de_caracteres()
-
         if not mapeo_caracteres:
             logging.error(
                 "No se pudo obtener el mapeo de caracteres. La limpieza no se realizará."
             )
             return
-
-        # Continuar con la limpieza en la base de datos
-        self.limpiar_caracteres_en_db(txTabla, mapeo_caracteres)
+        self.limpiar_caracteres_en_db(
+            txTabla, mapeo_caracteres, self.rango_cargado(txTabla, df)
+        )
 
     def consulta_txt_out(self):
         """
@@ -716,44 +540,20 @@ class CarguePlano:
             logging.error(f"Archivo no encontrado: {file_path}")
             return pd.DataFrame()
 
-        # Define las codificaciones que se intentarán para leer el archivo.
-        codificaciones = ["utf-8", "ISO-8859-1", "windows-1252"]
-        contenido = None
-
-        # Intenta leer el archivo con cada codificación disponible hasta que una funcione.
-        for codificacion in codificaciones:
-            try:
-                with open(file_path, "r", encoding=codificacion) as file:
-                    contenido = file.read()
-                    break  # Sal del bucle si la lectura es exitosa.
-            except UnicodeDecodeError as e:
-                logging.warning(
-                    f"Fallo al intentar con la codificación {codificacion}: {e}"
-                )
-
-        # Si no se pudo leer el archivo con ninguna codificación, retorna un DataFrame vacío.
-        if contenido is None:
-            logging.error(
-                f"No se pudo leer el archivo {file_path} con ninguna de las codificaciones probadas."
-            )
-            return pd.DataFrame()
-
         try:
-            # Reescribe el archivo con la codificación detectada para corregir problemas de codificación.
-            with open(file_path, "w", encoding=codificacion) as file:
-                file.write(contenido)
-
             # Determina el delimitador basado en la descripción del archivo y lee el contenido en un DataFrame.
             delimiter = (
                 "{" if self.config["txDescripcion"] == "interinfototal.txt" else "{"
             )
             tipos_columnas = self.obtener_nombres_columnas_texto(self.config["txTabla"])
-            df = pd.read_csv(
-                file_path,
-                delimiter=delimiter,
-                encoding=codificacion,
-                dtype=tipos_columnas,
-            )
+            # La codificación se detecta con el inicio del archivo y el texto se
+            # decodifica a medida que el parser lo lee, sin reescribir el archivo
+            with abrir_texto(open(file_path, "rb"), file_path) as flujo:
+                df = pd.read_csv(
+                    flujo,
+                    delimiter=delimiter,
+                    dtype=tipos_columnas,
+                )
 
             # Limpia y transforma los datos antes de devolverlos.
             return self.limpiar_y_transformar_datos(df)
@@ -804,7 +604,8 @@ class CarguePlano:
         with self.engine_mysql_bi.connect() as connection:
             cursor = connection.execution_options(isolation_level="READ COMMITTED")
             sqldelete = text(self.config["txSql"])
-            cursor.execute(sqldelete, {"fi": IdtReporteIni, "ff": IdtReporteFin})
+            with cursor.begin():
+                cursor.execute(sqldelete, {"fi": IdtReporteIni, "ff": IdtReporteFin})
         return logging.info("Datos fueron borrados")
 
     def procedimiento_a_sql(
@@ -887,9 +688,13 @@ class CarguePlano:
             print("listo iniciando aqui en la funcion procesar plano")
             expected_files = self.obtener_nombres_archivos_esperados()
 
-            self.cargue()
+            archivos = self.cargue()
+            registrar_cambio_datos(self.database_name)
 
-            return {"success": True, "message": "Archivo procesado con éxito"}
+            resultado = {"success": True, "message": "Archivo procesado con éxito"}
+            if isinstance(archivos, list):
+                resultado["archivos"] = archivos
+            return resultado
 
         except Exception as e:
             logging.error(f"Error al procesar el archivo plano: {e}")
@@ -1,103 +1,54 @@
 import os
-import pandas as pd
-from sqlalchemy import create_engine, text
-from openpyxl import Workbook
-from openpyxl.cell import WriteOnlyCell
+from sqlalchemy import text
 import logging
-from scripts.StaticPage import StaticPage
-from scripts.conexion import Conexion as con
+from scripts.logs import configurar_logging
+from scripts.conexion import DataBaseConnection
+from scripts import formatos_salida
+from scripts.ejecucion_hojas import EjecutorHojas, ErrorHoja
+from scripts import particiones
+from scripts.staging import StagingJob
 from scripts.config import ConfigBasic
 import ast
-import xlsxwriter
-
-# Configuración del logging
-logging.basicConfig(
-    filename="logCubo.txt",
-    level=logging.DEBUG,
-    format="%(asctime)s %(message)s",
-    filemode="w",
-)
-
-
-class DataBaseConnection:
-    def __init__(self, config, mysql_engine=None, sqlite_engine=None):
-        self.config = config
-        # Asegurarse de que los engines son instancias de conexión válidas y no cadenas
-        self.engine_mysql = mysql_engine if mysql_engine else self.create_engine_mysql()
-        print(self.engine_mysql)
-        self.engine_sqlite = (
-            sqlite_engine if sqlite_engine else create_engine("sqlite:///mydata.db")
-        )
-        print(self.engine_sqlite)
-
-    def create_engine_mysql(self):
-        # Simplificación en la obtención de los parámetros de configuración
-        user, password, host, port, database = (
-            self.config.get("nmUsrIn"),
-            self.config.get("txPassIn"),
-            self.config.get("hostServerIn"),
-            self.config.get("portServerIn"),
-            self.config.get("dbBi"),
-        )
-        return con.ConexionMariadb3(
-            str(user), str(password), str(host), int(port), str(database)
-        )
-
-    def execute_query_mysql(self, query, chunksize=None):
-        # Usar el engine correctamente
-        with self.create_engine_mysql.connect() as connection:
-            cursor = connection.execution_options(isolation_level="READ COMMITTED")
-            return pd.read_sql_query(query, cursor, chunksize=chunksize)
-
-    def execute_sql_sqlite(self, sql, params=None):
-        # Usar el engine correctamente
-        with self.engine_sqlite.connect() as connection:
-            return connection.execute(sql, params)
-
-    def execute_query_mysql_chunked(self, query, table_name, chunksize=50000):
-        try:
-            # Primero, elimina la tabla si ya existe
-            self.eliminar_tabla_sqlite(table_name)
-            # Luego, realiza la consulta y almacena los resultados en SQLite
-            with self.engine_mysql.connect() as connection:
-                cursor = connection.execution_options(isolation_level="READ COMMITTED")
-
-                for chunk in pd.read_sql_query(query, con=cursor, chunksize=chunksize):
-                    chunk.to_sql(
-                        name=table_name,
-                        con=self.engine_sqlite,
-                        if_exists="append",
-                        index=False,
-                    )
-
-                # Retorna el total de registros almacenados en la tabla SQLite
-                with self.engine_sqlite.connect() as connection:
-                    # Modificar aquí para usar fetchone correctamente
-                    total_records = connection.execute(
-                        text(f"SELECT COUNT(*) FROM {table_name}")
-                    ).fetchone()[0]
-                return total_records
-
-        except Exception as e:
-            logging.error(f"Error al ejecutar el query: {e}")
-            print(f"Error al ejecutar el query: {e}")
-            raise
-        print("terminamos de ejecutar el query")
-
-    def eliminar_tabla_sqlite(self, table_name):
-        sql = text(f"DROP TABLE IF EXISTS {table_name}")
-        with self.engine_sqlite.connect() as connection:
-            connection.execute(sql)
 
 
 class CuboVentas:
-    def __init__(self, database_name, IdtReporteIni, IdtReporteFin):
+    """
+    Clase CuboVentas para generar el cubo de ventas en Excel, Parquet o CSV comprimido.
+
+    Cada hoja configurada en txProcedureExcel se obtiene con un CALL al procedimiento
+    nmProcedureExcel y sus filas se escriben en el libro (scripts.excel_writer) o en
+    el archivo de la hoja (scripts.formatos_salida) a medida que llegan del cursor
+    del servidor. Con varias hojas, los procedimientos
+    se ejecutan en paralelo (scripts.ejecucion_hojas) y las hojas que terminan
+    antes de su turno esperan en el staging del job. Cuando una hoja alcanza el
+    límite de filas de Excel, el resto continúa en hojas nuevas (hoja_2, hoja_3, ...)
+    del mismo archivo.
+
+    Si la empresa tiene nbCuboIncremental, cada hoja se arma con las particiones
+    diarias de scripts.particiones y el procedimiento solo se ejecuta para los días
+    que aún no tienen partición.
+
+    Attributes:
+        database_name (str): Nombre de la base de datos a utilizar.
+        IdtReporteIni (str): Fecha inicial del reporte.
+        IdtReporteFin (str): Fecha final del reporte.
+        file_path (str): Ruta del archivo generado.
+        archivo_cubo_ventas (str): Nombre del archivo generado.
+        formato (str): Formato de salida (xlsx, parquet, csv.gz o csv.zst).
+        conteos (dict): Hoja configurada -> número de registros escritos.
+    """
+
+    def __init__(self, database_name, IdtReporteIni, IdtReporteFin, formato=None):
+        configurar_logging("logCubo.txt")
         self.database_name = database_name
         self.IdtReporteIni = IdtReporteIni
         self.IdtReporteFin = IdtReporteFin
         self.configurar(database_name)
         self.file_path = None
         self.archivo_cubo_ventas = None
+        self.conteos = {}
+        self.formato = formatos_salida.resolver_formato("cubo", formato, self.config)
+        self.staging = StagingJob(f"cubo_{database_name}")
 
     def configurar(self, database_name):
         try:
@@ -105,204 +56,74 @@ class CuboVentas:
             self.config = config_basic.config
             # config_basic.print_configuration()
             self.db_connection = DataBaseConnection(config=self.config)
-            self.engine_sqlite = self.db_connection.engine_sqlite
             self.engine_mysql = self.db_connection.engine_mysql
         except Exception as e:
             logging.error(f"Error al inicializar CuboVentas: {e}")
             raise
 
-    def generate_sqlout(self, hoja):
+    def generate_sqlout(self, hoja, IdtReporteIni=None, IdtReporteFin=None):
         sql = self.config["nmProcedureExcel"]
+        IdtReporteIni = IdtReporteIni or self.IdtReporteIni
+        IdtReporteFin = IdtReporteFin or self.IdtReporteFin
         if self.config["dbBi"] == "powerbi_tym_eje":
             return text(
-                f"CALL {sql}('{self.IdtReporteIni}','{self.IdtReporteFin}','','{str(hoja)}',0,0,0);"
+                f"CALL {sql}('{IdtReporteIni}','{IdtReporteFin}','','{str(hoja)}',0,0,0);"
             )
         return text(
-            f"CALL {sql}('{self.IdtReporteIni}','{self.IdtReporteFin}','','{str(hoja)}');"
+            f"CALL {sql}('{IdtReporteIni}','{IdtReporteFin}','','{str(hoja)}');"
         )
 
-    def guardar_datos(self, table_name, file_path, hoja, total_records, wb):
-        if total_records > 1000000:
-            self.guardar_datos_csv(table_name, file_path)
-        elif total_records > 250000:
-            self.guardar_datos_excel_xlsxwriter2(table_name, hoja, wb)
-        else:
-            self.guardar_datos_excel_xlsxwriter2(table_name, hoja, wb)
-
-    def generar_nombre_archivo(self, hoja, ext=".xlsx"):
-        self.archivo_cubo_ventas = f"Cubo_de_Ventas_{self.database_name}_de_{self.IdtReporteIni}_a_{self.IdtReporteFin}{ext}"
-        self.file_path = os.path.join("media", self.archivo_cubo_ventas)
-        return self.archivo_cubo_ventas, self.file_path
-
-    def guardar_datos_csv(self, table_name, file_path):
-        """
-        Guarda los datos de una tabla SQLite en un archivo CSV, manejando grandes volúmenes de datos.
-
-        Args:
-        table_name (str): Nombre de la tabla en SQLite de donde se extraerán los datos.
-        file_path (str): Ruta del archivo CSV de destino.
-
-        Descripción:
-        Este método extrae datos de una tabla SQLite en bloques (chunks) de tamaño definido
-        y los guarda en un archivo CSV. Es útil para manejar grandes volúmenes de datos que
-        no caben en la memoria de una sola vez.
-
-        El archivo CSV se escribe en modo 'append', lo que permite añadir datos al archivo
-        existente sin sobrescribirlo. Cada bloque de datos se lee de la tabla SQLite y se
-        escribe en el archivo CSV hasta que todos los datos han sido procesados.
-
-        Se utiliza un tamaño de bloque (chunksize) de 100000, lo que significa que los datos se
-        leerán y escribirán en bloques de 100000 filas a la vez. Este valor puede ajustarse según
-        las necesidades de rendimiento y la capacidad de la memoria.
-        """
-        chunksize = 50000  # Define el tamaño de cada bloque de datos
-
-        with self.engine_sqlite.connect() as connection:
-            # Iterar sobre los bloques (chunks) de datos de la tabla SQLite
-            for chunk in pd.read_sql_query(
-                f"SELECT * FROM {table_name}", self.engine_sqlite, chunksize=chunksize
-            ):
-                # Escribir el bloque de datos en el archivo CSV en modo 'append'
-                chunk.to_csv(file_path, mode="a", index=False)
-
-    def guardar_datos_excel_xlsxwriter(self, table_name, file_path, hoja):
-        """
-        Guarda datos de una tabla SQLite en un archivo Excel, manejando archivos grandes.
+    def incremental(self):
+        if not self.config.get("nbCuboIncremental"):
+            return False
+        if not particiones.disponible():
+            logging.warning("nbCuboIncremental está activo pero pyarrow no está instalado")
+            return False
+        return True
 
-        Args:
-        table_name (str): Nombre de la tabla en SQLite.
-        file_path (str): Ruta del archivo Excel de destino.
-        hoja (str): Nombre de la hoja de Excel.
+    def ejecutar_incremental(self, hojas, libro):
         """
-        # Definir el tamaño de cada bloque de datos (chunk)
-        chunksize = 50000
+        Escribe cada hoja a partir de sus particiones diarias, extrayendo solo los días faltantes.
 
-        # Crear un objeto ExcelWriter con xlsxwriter como motor
-        with pd.ExcelWriter(file_path, engine="xlsxwriter") as writer:
-            # Establecer conexión con la base de datos SQLite
-            with self.engine_sqlite.connect() as connection:
-                # Iniciar la fila desde donde empezar a escribir en el archivo Excel
-                startrow = 0
+        Returns:
+            dict: Hoja -> número de registros escritos.
 
-                # Iterar sobre los bloques (chunks) de datos de la tabla SQLite
-                for chunk in pd.read_sql_query(
-                    f"SELECT * FROM {table_name}",
-                    self.engine_sqlite,
-                    chunksize=chunksize,
-                ):
-                    print(f"Procesando chunk de tamaño: {len(chunk)}")
-                    # Escribir el bloque de datos en el archivo Excel
-                    chunk.to_excel(
-                        writer,
-                        sheet_name=hoja,
-                        startrow=startrow,
-                        index=False,
-                        header=not bool(startrow),
-                    )
-                    # Actualizar la fila de inicio para el siguiente bloque
-                    startrow += len(chunk)
-
-                    print(f"Próximo startrow será: {startrow}")
-
-    def guardar_datos_excel_xlsxwriter2(self, table_name, hoja, wb):
-        """
-        Guarda datos de una tabla SQLite en un archivo Excel, manejando archivos grandes.
-
-        Args:
-        table_name (str): Nombre de la tabla en SQLite.
-        file_path (str): Ruta del archivo Excel de destino.
-        hoja (str): Nombre de la hoja de Excel.
+        Raises:
+            ErrorHoja: Con la hoja que falló.
         """
-        chunksize = 50000  # Tamaño de cada bloque de datos
-
-        # Crear un objeto ExcelWriter con xlsxwriter como motor
-
-        ws = wb.create_sheet(title=hoja)
-
-        # Inicialmente, extraer solo los encabezados de la tabla
-        headers = pd.read_sql_query(
-            f"SELECT * FROM {table_name} LIMIT 0", self.engine_sqlite
-        ).columns.tolist()
-        ws.append(headers)  # Agregar los encabezados a la hoja de Excel
-
-        # Procesar los datos en chunks
-        for chunk in pd.read_sql_query(
-            f"SELECT * FROM {table_name}", self.engine_sqlite, chunksize=chunksize
-        ):
-            for index, row in chunk.iterrows():
-                cells = [WriteOnlyCell(ws, value=value) for value in row]
-                ws.append(cells)
-
-    def guardar_datos_excel_openpyxl(self, table_name, file_path, hoja):
+        dias = particiones.dias_rango(self.IdtReporteIni, self.IdtReporteFin)
+        diarias = particiones.ParticionesDiarias(
+            self.db_connection,
+            self.database_name,
+            [self.config.get("dbBi"), self.config.get("nmProcedureExcel")],
+        )
+        conteos = {}
+        for hoja in hojas:
+            try:
+                conteos[hoja] = libro.escribir_tabla(
+                    hoja, diarias.leer(hoja, dias, self.generate_sqlout)
+                )
+            except Exception as e:
+                raise ErrorHoja(hoja, e) from e
+            logging.info(f"Hoja {hoja} finalizada con {conteos[hoja]} registros")
+        diarias.limpiar()
+        return conteos
+
+    def procedimientos_cache(self):
         """
-        Guarda datos de una tabla SQLite en un archivo Excel, manejando archivos grandes.
-
-        Args:
-            table_name (str): Nombre de la tabla en SQLite.
-            file_path (str): Ruta del archivo Excel de destino.
-            hoja (str): Nombre de la hoja de Excel.
+        Configuración que determina el contenido del archivo, para la clave de caché.
         """
-        chunksize = 50000  # Tamaño de cada bloque de datos
-
-        # Crear un libro de trabajo en modo de solo escritura
-        wb = Workbook(write_only=True)
-        ws = wb.create_sheet(title=hoja)
-
-        # Establecer conexión con SQLite y leer los datos en chunks
-        with self.engine_sqlite.connect() as connection:
-            first_chunk = True
-            for chunk in pd.read_sql_table(
-                table_name, con=connection, chunksize=chunksize
-            ):
-                # Agregar encabezados solo para el primer chunk
-                if first_chunk:
-                    ws.append(chunk.columns.tolist())
-                    first_chunk = False
-
-                # Escribir los datos del chunk en la hoja de Excel
-                for row in chunk.itertuples(index=False, name=None):
-                    ws.append(row)
-
-        # Guardar el libro de trabajo
-        wb.save(file_path)
-        print(f"Archivo Excel {file_path} generado exitosamente")
-
-        print(f"Archivo Excel {file_path} generado exitosamente")
-
-    def guardar_datos_excel_completo(self, table_name, file_path, hoja):
-        with pd.ExcelWriter(file_path, engine="openpyxl") as writer:
-            with self.engine_sqlite.connect() as connection:
-                df = pd.read_sql_table(table_name, con=connection)
-                df.to_excel(writer, index=False, sheet_name=hoja)
-
-    def procesar_hoja(self, hoja, wb):
-        try:
-            sqlout = self.generate_sqlout(hoja)
-            print(sqlout)
-            table_name = f"my_table_{self.database_name}_{hoja}"
-            total_records = self.db_connection.execute_query_mysql_chunked(
-                query=sqlout, table_name=table_name
-            )
-
-            print(f"Total de registros: {total_records}")
-
-            archivo_cubo_ventas, file_path = self.generar_nombre_archivo(
-                hoja, ext=".csv" if total_records > 1000000 else ".xlsx"
-            )
-            print(f"aqui se genero el nombre del archivo {file_path}")
-            self.guardar_datos(table_name, file_path, hoja, total_records, wb)
-            print(f"Archivo {archivo_cubo_ventas} generado exitosamente")
+        return [
+            self.formato,
+            self.config.get("dbBi"),
+            self.config.get("nmProcedureExcel"),
+            self.config.get("txProcedureExcel"),
+        ]
 
-            self.db_connection.eliminar_tabla_sqlite(table_name)
-            print(f"Procesamiento de la hoja {hoja} finalizado")
-            return True
-        except Exception as e:
-            print(f"Error al procesar la hoja {hoja}: {e}")
-            logging.error(f"Error al procesar la hoja {hoja}: {e}")
-            return {
-                "success": False,
-                "error_message": f"Error al procesar la hoja {hoja}: {e}",
-            }
+    def generar_nombre_archivo(self, ext=".xlsx"):
+        self.archivo_cubo_ventas = f"Cubo_de_Ventas_{self.database_name}_de_{self.IdtReporteIni}_a_{self.IdtReporteFin}{ext}"
+        self.file_path = os.path.join("media", self.archivo_cubo_ventas)
+        return self.archivo_cubo_ventas, self.file_path
 
     def procesar_datos(self):
         txProcedureExcel_str = self.config["txProcedureExcel"]
@@ -317,22 +138,46 @@ class CuboVentas:
         if not self.config["txProcedureExcel"]:
             return {"success": False, "error_message": "No hay datos para procesar"}
 
-        wb = Workbook(write_only=True)
+        hojas = list(self.config["txProcedureExcel"])
+        self.generar_nombre_archivo(formatos_salida.extension(self.formato, len(hojas)))
+        self.conteos = {}
+        error = None
+        ejecutor = EjecutorHojas(self.db_connection, self.staging)
 
-        for hoja in self.config["txProcedureExcel"]:
-            print(f"Procesando hoja {hoja}")
-            if not self.procesar_hoja(hoja, wb):
-                return {
-                    "success": False,
-                    "error_message": f"Error al procesar la hoja {hoja}",
-                }
-        # Guardar el libro de trabajo
-        wb.save(self.file_path)
+        # El libro se cierra (y termina de escribirse) al salir del bloque; la
+        # carpeta de staging del job se elimina aun si hay errores
+        with self.staging, formatos_salida.abrir_salida(self.file_path, self.formato) as libro:
+            try:
+                if self.incremental():
+                    self.conteos = self.ejecutar_incremental(hojas, libro)
+                else:
+                    self.conteos = ejecutor.ejecutar(
+                        hojas,
+                        self.generate_sqlout,
+                        libro.escribir_tabla,
+                    )
+            except ErrorHoja as e:
+                print(e)
+                logging.error(str(e))
+                error = {"success": False, "error_message": str(e)}
+
+        if error:
+            # No se deja en media un archivo incompleto
+            if os.path.exists(self.file_path):
+                os.remove(self.file_path)
+            return error
+
+        total_registros = sum(self.conteos.values())
         print("Proceso finalizado")
         print(self.file_path)
         print(self.archivo_cubo_ventas)
+        logging.info(
+            f"Archivo {self.archivo_cubo_ventas} generado con {total_registros} registros"
+        )
         return {
             "success": True,
             "file_path": self.file_path,
             "file_name": self.archivo_cubo_ventas,
+            "registros": dict(self.conteos),
+            "total_registros": total_registros,
         }
@@ -1,64 +1,13 @@
 import os
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 import logging
+from scripts.logs import configurar_logging
 import ast
 import time
-from scripts.conexion import Conexion as con
+from scripts.conexion import DataBaseConnection
 from scripts.config import ConfigBasic
-
-# Configuración del logging
-logging.basicConfig(
-    filename="logExtractor.txt",
-    level=logging.DEBUG,
-    format="%(asctime)s %(message)s",
-    filemode="w",
-)
-
-
-class DataBaseConnection:
-    """
-    Clase para gestionar las conexiones a las bases de datos MySQL y SQLite.
-
-    Atributos:
-        config (dict): Configuración para las conexiones.
-        engine_mysql_bi (object): Engine de SQLAlchemy para la base de datos BI.
-        engine_mysql_out (object): Engine de SQLAlchemy para la base de datos de salida.
-        engine_sqlite (object): Engine de SQLAlchemy para la base de datos SQLite.
-    """
-
-    def __init__(self, config, mysql_engine=None, sqlite_engine=None):
-        """
-        Inicializa una instancia de DataBaseConnection.
-
-        Args:
-            config (dict): Configuración para las conexiones.
-            mysql_engine (object, opcional): Engine de SQLAlchemy para MySQL, si ya existe.
-            sqlite_engine (object, opcional): Engine de SQLAlchemy para SQLite, si ya existe.
-        """
-        self.config = config
-        self.engine_mysql_bi = mysql_engine or self.create_engine_mysql("in")
-        self.engine_mysql_out = mysql_engine or self.create_engine_mysql("out")
-        self.engine_sqlite = sqlite_engine or create_engine("sqlite:///mydata.db")
-
-    def create_engine_mysql(self, db_type):
-        """
-        Crea un engine de SQLAlchemy para una base de datos MySQL.
-
-        Args:
-            db_type (str): Tipo de base de datos ('bi' o 'out').
-
-        Returns:
-            object: Engine de SQLAlchemy para la base de datos especificada.
-        """
-        user, password, host, port, database = (
-            self.config.get(f"nmUsr{db_type.capitalize()}"),
-            self.config.get(f"txPass{db_type.capitalize()}"),
-            self.config.get(f"hostServer{db_type.capitalize()}"),
-            self.config.get(f"portServer{db_type.capitalize()}"),
-            self.config.get(f"db{db_type.capitalize()}"),
-        )
-        return con.ConexionMariadb3(user, password, host, int(port), database)
+from scripts.cache_artefactos import registrar_cambio_datos
 
 
 class ExtraeBI:
@@ -82,6 +31,7 @@ class ExtraeBI:
             IdtReporteIni (int): ID de inicio del reporte.
             IdtReporteFin (int): ID de fin del reporte.
         """
+        configurar_logging("logExtractor.txt")
         self.database_name = database_name
         self.IdtReporteIni = IdtReporteIni
         self.IdtReporteFin = IdtReporteFin
@@ -274,4 +224,6 @@ class ExtraeBI:
             logging.error(f"Error general en el extractor: {e}")
             return {"success": False, "error": str(e)}
         finally:
+            # También tras un error: los procesos que terminaron ya escribieron
+            registrar_cambio_datos(self.database_name, self.IdtReporteIni, self.IdtReporteFin)
             logging.info("Finalizado el procedimiento de ejecución SQL.")
@@ -1,9 +1,27 @@
 import os
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import text, bindparam
 import logging
-from scripts.conexion import Conexion as con
+from scripts.logs import configurar_logging
+from scripts.conexion import DataBaseConnection
 from scripts.config import ConfigBasic
+from scripts.cache_artefactos import registrar_cambio_datos
+from scripts.bulk_writer import escribir_masivo
+from scripts.ejecucion_hojas import cupos_servidores, limite_servidor
+from scripts.extrae_bi.planificador import (
+    Planificador,
+    planificar_extraccion,
+    REPORTES_POSTERIORES,
+)
+from scripts.extrae_bi.transferencia import transferir, filas_por_fragmento
+from scripts.extrae_bi.carga_staging import (
+    CargaStaging,
+    modo_carga,
+    validar_modo,
+    CARGA_DIRECTA,
+)
+from scripts.extrae_bi.incremental import MarcasAgua, es_incremental, marca_maxima, upsert_mysql
+import functools
 import ast
 import json
 from django.core.exceptions import ImproperlyConfigured
@@ -11,108 +29,15 @@ import ast
 import sqlalchemy
 import time
 
-# Configuración del logging
-logging.basicConfig(
-    filename="logExtractor.txt",
-    level=logging.DEBUG,
-    format="%(asctime)s %(message)s",
-    filemode="w",
-)
-
-
-class DataBaseConnection:
-    def __init__(self, config, mysql_engine=None, sqlite_engine=None):
-        self.config = config
-        # Asegurarse de que los engines son instancias de conexión válidas y no cadenas
-        self.engine_mysql_bi = (
-            mysql_engine if mysql_engine else self.create_engine_mysql_bi()
-        )
-        self.engine_mysql_out = (
-            mysql_engine if mysql_engine else self.create_engine_mysql_out()
-        )
-        self.engine_sqlite = (
-            sqlite_engine if sqlite_engine else create_engine("sqlite:///mydata.db")
-        )
-        print(self.engine_sqlite)
-
-    def create_engine_mysql_bi(self):
-        # Simplificación en la obtención de los parámetros de configuración
-        user, password, host, port, database = (
-            self.config.get("nmUsrIn"),
-            self.config.get("txPassIn"),
-            self.config.get("hostServerIn"),
-            self.config.get("portServerIn"),
-            self.config.get("dbBi"),
-        )
-        return con.ConexionMariadb3(
-            str(user), str(password), str(host), int(port), str(database)
-        )
-
-    def create_engine_mysql_out(self):
-        # Simplificación en la obtención de los parámetros de configuración
-        user, password, host, port, database = (
-            self.config.get("nmUsrOut"),
-            self.config.get("txPassOut"),
-            self.config.get("hostServerOut"),
-            self.config.get("portServerOut"),
-            self.config.get("dbSidis"),
-        )
-        return con.ConexionMariadb3(
-            str(user), str(password), str(host), int(port), str(database)
-        )
-
-    def execute_query_mysql(self, query, chunksize=None):
-        # Usar el engine correctamente
-        with self.create_engine_mysql.connect() as connection:
-            cursor = connection.execution_options(isolation_level="READ COMMITTED")
-            return pd.read_sql_query(query, cursor, chunksize=chunksize)
-
-    def execute_sql_sqlite(self, sql, params=None):
-        # Usar el engine correctamente
-        with self.engine_sqlite.connect() as connection:
-            return connection.execute(sql, params)
-
-    def execute_query_mysql_chunked(self, query, table_name, chunksize=50000):
-        try:
-            # Primero, elimina la tabla si ya existe
-            self.eliminar_tabla_sqlite(table_name)
-            # Luego, realiza la consulta y almacena los resultados en SQLite
-            with self.engine_mysql.connect() as connection:
-                cursor = connection.execution_options(isolation_level="READ COMMITTED")
-
-                for chunk in pd.read_sql_query(query, con=cursor, chunksize=chunksize):
-                    chunk.to_sql(
-                        name=table_name,
-                        con=self.engine_sqlite,
-                        if_exists="append",
-                        index=False,
-                    )
-
-                # Retorna el total de registros almacenados en la tabla SQLite
-                with self.engine_sqlite.connect() as connection:
-                    # Modificar aquí para usar fetchone correctamente
-                    total_records = connection.execute(
-                        text(f"SELECT COUNT(*) FROM {table_name}")
-                    ).fetchone()[0]
-                return total_records
-
-        except Exception as e:
-            logging.error(f"Error al ejecutar el query: {e}")
-            print(f"Error al ejecutar el query: {e}")
-            raise
-        print("terminamos de ejecutar el query")
-
-    def eliminar_tabla_sqlite(self, table_name):
-        sql = text(f"DROP TABLE IF EXISTS {table_name}")
-        with self.engine_sqlite.connect() as connection:
-            connection.execute(sql)
-
 
 class Extrae_Bi:
     def __init__(self, database_name, IdtReporteIni, IdtReporteFin):
+        configurar_logging("logExtractor.txt")
         self.database_name = database_name
         self.IdtReporteIni = IdtReporteIni
         self.IdtReporteFin = IdtReporteFin
+        # Si la última ejecución tuvo procesos incrementales (escriben fuera del rango)
+        self._hubo_incremental = False
         self.configurar(database_name)
 
     def configurar(self, database_name):
@@ -122,90 +47,101 @@ class Extrae_Bi:
             config_basic.print_configuration()
             print(self.config.get("txProcedureExtrae", []))
             self.db_connection = DataBaseConnection(config=self.config)
-            self.engine_sqlite = self.db_connection.engine_sqlite
             self.engine_mysql_bi = self.db_connection.engine_mysql_bi
             self.engine_mysql_out = self.db_connection.engine_mysql_out
+            self.engine_mysql_conf = self.db_connection.engine_mysql_conf
             print("Configuraciones preliminares de actualización terminadas")
         except Exception as e:
             logging.error(f"Error al inicializar Actualización: {e}")
             raise
 
+    def consultar_procesos(self, txProcedureExtrae):
+        """
+        Lee de conf_sql, en una sola consulta, los procesos de la lista.
+
+        Returns:
+            dict: nbSql (str) -> fila de conf_sql como diccionario.
+        """
+        # SELECT *: las columnas opcionales (txModoCarga) pueden no existir aún
+        sql = text("SELECT * FROM powerbi_adm.conf_sql WHERE nbSql IN :ids").bindparams(bindparam("ids", expanding=True))
+        with self.engine_mysql_bi.connect() as connectionin:
+            result = connectionin.execute(sql, {"ids": [int(a) for a in txProcedureExtrae]})
+            return {str(fila["nbSql"]): dict(fila) for fila in result.mappings()}
+
     def extractor(self):
+        """
+        Ejecuta los procesos de txProcedureExtrae.
+
+        Las extracciones independientes se ejecutan en paralelo y los reportes de
+        post-proceso (update_cubo_bi, impactos_bi, ...) esperan a que terminen las
+        cargas anteriores en la lista; ver scripts.extrae_bi.planificador.
+
+        Returns:
+            dict: success y, por proceso, si terminó sin error.
+        """
         print("Iniciando extractor")
         try:
             txProcedureExtrae = self.config.get("txProcedureExtrae", [])
             print("txProcedureExtrae:", txProcedureExtrae)
             if isinstance(txProcedureExtrae, str):
                 txProcedureExtrae = ast.literal_eval(txProcedureExtrae)
-            print(
-                "Tipo de txProcedureExtrae:", type(txProcedureExtrae)
-            )  # Esto debería mostrarte <class 'list'>
-            for a in txProcedureExtrae:
-                print("Procesando:", a)
-                with self.engine_mysql_bi.connect() as connectionin:
-                    sql = text("SELECT * FROM powerbi_adm.conf_sql WHERE nbSql = :a")
-                    result = connectionin.execute(sql, {"a": a})
-                    df = pd.DataFrame(result.fetchall(), columns=result.keys())
-
-                    if not df.empty:
-                        self.config["txTabla"] = str(df["txTabla"].values[0])
-                        self.config["nmReporte"] = str(df["nmReporte"].values[0])
-                        self.config["nmProcedure_out"] = str(
-                            df["nmProcedure_out"].values[0]
-                        )
-                        self.config["nmProcedure_in"] = str(
-                            df["nmProcedure_in"].values[0]
-                        )
-                        self.config["txSql"] = str(df["txSql"].values[0])
-
-                        logging.info(f"Se va a procesar {self.config['nmReporte']}")
-
-                        try:
-                            self.procedimiento_a_sql(
-                                IdtReporteIni=self.IdtReporteIni,
-                                IdtReporteFin=self.IdtReporteFin,
-                                nmReporte=self.config.get("nmReporte"),
-                                nmProcedure_out=self.config.get("nmProcedure_out"),
-                                txTabla=self.config.get("txTabla"),
-                            )
-                            logging.info(
-                                f"La información se generó con éxito de {self.config.get('nmReporte')}"
-                            )
-                        except Exception as e:
-                            logging.info(
-                                f"No fue posible extraer la información de {self.config.get('nmReporte')} por {e}"
-                            )
-                            print(
-                                f"Error al ejecutar procedimiento_a_sql para {self.config.get('nmReporte')}: {e}"
-                            )
-                    else:
-                        logging.warning(
-                            f"No se encontraron resultados para nbSql = {a}"
-                        )
-                        print(f"No se encontraron resultados para nbSql = {a}")
+            procesos = self.consultar_procesos(txProcedureExtrae) if txProcedureExtrae else {}
+
+            entradas = []
+            self._hubo_incremental = any(es_incremental(fila) for fila in procesos.values())
+            for posicion, a in enumerate(txProcedureExtrae):
+                fila = procesos.get(str(a))
+                if fila is None:
+                    logging.warning(f"No se encontraron resultados para nbSql = {a}")
+                    print(f"No se encontraron resultados para nbSql = {a}")
+                    continue
+                entradas.append((f"{posicion}:{fila['nmReporte']}", fila))
+
+            planificador = Planificador()
+            plan = planificar_extraccion(
+                [(clave, fila["nmReporte"], fila["txTabla"]) for clave, fila in entradas]
+            )
+            for (clave, fila), (_, dependencias) in zip(entradas, plan):
+                planificador.agregar(
+                    clave,
+                    functools.partial(
+                        self.procedimiento_a_sql,
+                        IdtReporteIni=self.IdtReporteIni,
+                        IdtReporteFin=self.IdtReporteFin,
+                        nmReporte=str(fila["nmReporte"]),
+                        nmProcedure_out=str(fila["nmProcedure_out"]),
+                        txTabla=str(fila["txTabla"]),
+                        txSql=str(fila["txSql"]),
+                        txModoCarga=fila.get("txModoCarga"),
+                        incremental=fila if es_incremental(fila) else None,
+                    ),
+                    dependencias,
+                )
+
+            tareas = planificador.ejecutar()
             print("Extracción completada con éxito")
-            return {"success": True}
+            return {
+                "success": True,
+                "procesos": {clave: tarea.error is None for clave, tarea in tareas.items()},
+            }
         except Exception as e:
             print(f"Error general en el extractor: {e}")
-            return {"success": False, "error": str(e)}
-        except Exception as e:
-            logging.error(
-                f"Error durante la ejecución de la lista de procedimientos con nbSql = {a}: {e}"
-            )
+            logging.error(f"Error durante la ejecución de la lista de procedimientos: {e}")
             return {"success": False, "error": str(e)}
         finally:
+            # También tras un error: los procesos que terminaron ya escribieron.
+            # Los incrementales escriben filas fuera del rango: se invalida todo
+            if self._hubo_incremental:
+                registrar_cambio_datos(self.database_name)
+            else:
+                registrar_cambio_datos(self.database_name, self.IdtReporteIni, self.IdtReporteFin)
             logging.info("Finalizado el procedimiento de ejecución SQL.")
 
     def insertar_sql(self, resultado_out, txTabla):
         with self.engine_mysql_bi.connect() as connectionin:
             cursorbi = connectionin.execution_options(isolation_level="READ COMMITTED")
-            resultado_out.to_sql(
-                name=txTabla,
-                con=cursorbi,
-                if_exists="append",
-                index=False,
-                index_label=None,
-            )
+            with cursorbi.begin():
+                escribir_masivo(cursorbi, resultado_out, txTabla)
             # logging.getLogger('sqlalchemy.engine').setLevel(logging.INFO)
             return logging.info("los datos se han insertado correctamente")
 
@@ -255,27 +191,122 @@ class Extrae_Bi:
         # Si se alcanza este punto, se agotaron los reintentos sin éxito
         return None
 
-    def consulta_sql_bi(self, IdtReporteIni, IdtReporteFin):
+    def transferir_sql(
+        self,
+        IdtReporteIni,
+        IdtReporteFin,
+        nmReporte,
+        nmProcedure_out,
+        txTabla,
+        txSql=None,
+        carga=None,
+        txSqlIncremental=None,
+        marca=None,
+        columna_marca=None,
+    ):
+        """
+        Copia el resultado del procedimiento de Sidis a la tabla de BI por fragmentos.
+
+        El resultado se lee con un cursor del lado del servidor y pasa por una cola
+        acotada a un hilo que lo inserta en BI mientras se siguen leyendo filas, así
+        que la memoria no depende del tamaño de la extracción. El rango se borra al
+        llegar el primer fragmento con filas (sin filas, la tabla no se toca) y el
+        borrado y las inserciones se confirman juntos al final.
+
+        Por eso, en este modo directo los bloqueos del DELETE sobre el rango se
+        mantienen durante toda la extracción: las cargas y actualizaciones que
+        toquen esas filas en BI esperan hasta que termine. Confirmar el borrado
+        antes dejaría el rango vacío (o a medias) a la vista de los reportes si
+        la transferencia falla. Para tablas grandes o consultadas durante la
+        carga conviene el modo staging (`carga`), que solo bloquea la tabla
+        final mientras publicar() la actualiza desde el staging.
+
+        Con `carga` (CargaStaging) las filas van a la tabla de staging y la tabla
+        final no se toca; la publica después carga.publicar().
+
+        Con `txSqlIncremental` se ejecuta esa consulta en Sidis (con :marca) en vez
+        del procedimiento y las filas se insertan o actualizan (upsert_mysql) sin
+        borrar el rango.
+
+        Returns:
+            EstadisticasTransferencia: Filas, bytes y velocidad de la transferencia;
+                con `columna_marca`, su atributo marca tiene el mayor valor cargado.
+        """
+        # Cupos por servidor compartidos por todos los jobs (en Redis): el CALL
+        # pesa sobre Sidis y el borrado e inserción sobre BI. cupos_servidores
+        # los toma en orden de host y puerto (uno solo si es el mismo servidor)
+        if txSqlIncremental:
+            sqlout = text(txSqlIncremental)
+        else:
+            sqlout = text(f"CALL {nmProcedure_out}(:IdtReporteIni, :IdtReporteFin, :nmReporte)")
+        fragmentos = self.db_connection.stream_query(
+            sqlout,
+            params={
+                "IdtReporteIni": IdtReporteIni,
+                "IdtReporteFin": IdtReporteFin,
+                "nmReporte": nmReporte,
+                "marca": marca,
+            },
+            chunksize=filas_por_fragmento(),
+            engine=self.engine_mysql_out,
+        )
+        with cupos_servidores(self.config, "Out", "In"), self.engine_mysql_bi.begin() as connectionin:
+
+            marca_nueva = [None]
+
+            def escribir(chunk, numero):
+                if columna_marca:
+                    marca_nueva[0] = marca_maxima(marca_nueva[0], chunk, columna_marca)
+                if txSqlIncremental:
+                    chunk.to_sql(
+                        name=txTabla,
+                        con=connectionin,
+                        if_exists="append",
+                        index=False,
+                        method=upsert_mysql,
+                    )
+                    return
+                if carga is not None:
+                    carga.escribir(connectionin, chunk, numero)
+                    return
+                if numero == 0:
+                    # Queda en la transacción de todo el streaming (ver docstring)
+                    connectionin.execute(
+                        text(txSql or self.config["txSql"]),
+                        {"fi": IdtReporteIni, "ff": IdtReporteFin},
+                    )
+                escribir_masivo(connectionin, chunk, txTabla)
+
+            estadisticas = transferir(fragmentos, escribir, txTabla)
+        estadisticas.marca = marca_nueva[0]
+        if carga is not None:
+            carga.cargada = True
+        print(f"Transferencia {estadisticas.resumen()}")
+        return estadisticas
+
+    def consulta_sql_bi(self, IdtReporteIni, IdtReporteFin, txSql=None):
         """
         Ejecuta una consulta SQL en la base de datos BI para borrar datos
         entre dos fechas especificadas.
 
-        Este método asume que `self.config["txSql"]` contiene una consulta SQL
-        preparada para ejecutar una operación de borrado, donde `:fi` y `:ff`
-        son marcadores de posición para las fechas de inicio y fin, respectivamente.
+        Este método asume que `txSql` (por defecto `self.config["txSql"]`) contiene
+        una consulta SQL preparada para ejecutar una operación de borrado, donde `:fi`
+        y `:ff` son marcadores de posición para las fechas de inicio y fin, respectivamente.
 
         Parámetros:
         - IdtReporteIni: Fecha de inicio para la condición del borrado.
         - IdtReporteFin: Fecha de fin para la condición del borrado.
+        - txSql: Consulta del proceso; se recibe explícita porque los procesos se
+          ejecutan en paralelo y no pueden compartir self.config.
 
         La función no devuelve ningún valor, pero registra un mensaje de éxito
         una vez que los datos han sido borrados.
         """
         try:
-            # Establecer conexión con la base de datos BI
-            with self.engine_mysql_bi.connect() as connection:
+            # Establecer conexión con la base de datos BI; begin() confirma el borrado
+            with self.engine_mysql_bi.begin() as connection:
                 # Preparar la consulta SQL con parámetros de seguridad
-                sqldelete = text(self.config["txSql"])
+                sqldelete = text(txSql or self.config["txSql"])
                 # Ejecutar la consulta con los parámetros proporcionados
                 connection.execute(
                     sqldelete, {"fi": IdtReporteIni, "ff": IdtReporteFin}
@@ -291,37 +322,94 @@ class Extrae_Bi:
             raise
 
     def procedimiento_a_sql(
-        self, IdtReporteIni, IdtReporteFin, nmReporte, nmProcedure_out, txTabla
+        self,
+        IdtReporteIni,
+        IdtReporteFin,
+        nmReporte,
+        nmProcedure_out,
+        txTabla,
+        txSql=None,
+        txModoCarga=None,
+        incremental=None,
     ):
-        es_vacio = (
-            True  # Python utiliza snake_case para nombres de variables por convención
-        )
+        """
+        Ejecuta un proceso de conf_sql con hasta tres intentos.
 
-        reportes_especificos = {
-            "update_cubo_bi",
-            "borra_impactos_bi",
-            "impactos_bi",
-            "actualizar_usuarios_periodo",
-            "actualizar_usuarios_conteo_diario",
-        }
+        Con `incremental` (la fila de conf_sql con txSqlIncremental y
+        txColumnaMarca) solo se extraen las filas posteriores a la marca de agua
+        de la tabla y se insertan o actualizan; cada nbDiasReconciliacion días, o
+        si la tabla no tiene marca, se recarga el rango completo como siempre.
+
+        Raises:
+            Exception: El error del último intento, si los tres fallan.
+        """
+        modo = validar_modo(modo_carga(txModoCarga), txSql, incremental is not None)
+        carga = None
+        marcas, incremental_activo, columna_marca = None, False, None
+        if incremental is not None and nmReporte not in REPORTES_POSTERIORES:
+            marcas = MarcasAgua(self.engine_mysql_conf, self.database_name)
+            columna_marca = incremental["txColumnaMarca"]
+            marca, dtReconciliacion = marcas.leer(txTabla)
+            incremental_activo = not marcas.requiere_reconciliacion(
+                marca, dtReconciliacion, incremental.get("nbDiasReconciliacion")
+            )
+            logging.info(
+                f"{txTabla}: extracción {'incremental desde ' + str(marca) if incremental_activo else 'completa (reconciliación)'}"
+            )
+        if nmReporte not in REPORTES_POSTERIORES and modo != CARGA_DIRECTA and not incremental_activo:
+            carga = CargaStaging(self.engine_mysql_bi, txTabla, modo)
 
         for intento in range(3):  # Intentar la conexión hasta tres veces
             try:
-                if nmReporte in reportes_especificos:
-                    self.consulta_sql_bi(IdtReporteIni, IdtReporteFin)
-                    es_vacio = True
-                else:
-                    resultado_out = self.consulta_sql_out(
+                if nmReporte in REPORTES_POSTERIORES:
+                    with limite_servidor(self.config, "In"):
+                        self.consulta_sql_bi(IdtReporteIni, IdtReporteFin, txSql)
+                elif incremental_activo:
+                    # El upsert es idempotente: un reintento repite la misma marca
+                    estadisticas = self.transferir_sql(
+                        IdtReporteIni=IdtReporteIni,
+                        IdtReporteFin=IdtReporteFin,
+                        nmReporte=nmReporte,
                         nmProcedure_out=nmProcedure_out,
+                        txTabla=txTabla,
+                        txSqlIncremental=incremental["txSqlIncremental"],
+                        marca=marca,
+                        columna_marca=columna_marca,
+                    )
+                    marcas.guardar(txTabla, estadisticas.marca)
+                elif carga is not None:
+                    # Si falla la publicación, el reintento la repite con el
+                    # staging ya cargado, sin volver a ejecutar el procedimiento
+                    if not carga.cargada:
+                        carga.preparar()
+                        carga.marca = self.transferir_sql(
+                            IdtReporteIni=IdtReporteIni,
+                            IdtReporteFin=IdtReporteFin,
+                            nmReporte=nmReporte,
+                            nmProcedure_out=nmProcedure_out,
+                            txTabla=txTabla,
+                            txSql=txSql,
+                            carga=carga,
+                            columna_marca=columna_marca,
+                        ).marca
+                    with limite_servidor(self.config, "In"):
+                        carga.publicar(txSql, IdtReporteIni, IdtReporteFin)
+                    if marcas is not None:
+                        marcas.guardar(txTabla, carga.marca, reconciliado=True)
+                else:
+                    # Un reintento vuelve a borrar el rango: lo insertado en un
+                    # intento fallido se descarta con su transacción
+                    estadisticas = self.transferir_sql(
                         IdtReporteIni=IdtReporteIni,
                         IdtReporteFin=IdtReporteFin,
                         nmReporte=nmReporte,
+                        nmProcedure_out=nmProcedure_out,
+                        txTabla=txTabla,
+                        txSql=txSql,
+                        columna_marca=columna_marca,
                     )
-                    es_vacio = resultado_out.empty
-
-                if not es_vacio:
-                    self.consulta_sql_bi(IdtReporteIni, IdtReporteFin)
-                    self.insertar_sql(txTabla=txTabla, resultado_out=resultado_out)
+                    if marcas is not None:
+                        marcas.guardar(txTabla, estadisticas.marca, reconciliado=True)
 
                 logging.info(f"Proceso completado para {txTabla}.")
                 return
@@ -334,7 +422,11 @@ class Extrae_Bi:
                     logging.error(
                         "Se agotaron los intentos. No se pudo ejecutar el procedimiento."
                     )
-                    break
+                    if carga is not None:
+                        carga.descartar()
+                    # El Planificador registra el error de la tarea y el resultado
+                    # del extractor lo reporta en "procesos"
+                    raise
                 else:
                     logging.info(
                         f"Reintentando procedimiento (Intento {intento + 1}/3)..."
@@ -0,0 +1,179 @@
+import numbers
+import datetime
+import logging
+from sqlalchemy import text
+
+# Días entre recargas completas del rango cuando conf_sql.nbDiasReconciliacion está vacío.
+DIAS_RECONCILIACION = 7
+
+
+def es_incremental(fila):
+    """
+    Indica si un proceso de conf_sql tiene configurada la extracción incremental.
+    """
+    return bool(fila.get("txSqlIncremental")) and bool(fila.get("txColumnaMarca"))
+
+
+def upsert_mysql(tabla, conexion, columnas, filas):
+    """
+    Método de inserción para DataFrame.to_sql: INSERT ... ON DUPLICATE KEY UPDATE.
+
+    Las filas que ya existen (según la llave primaria o un índice único de la
+    tabla) se actualizan con los valores nuevos en vez de duplicarse.
+
+    Args:
+        tabla (pandas.io.sql.SQLTable): Tabla destino.
+        conexion (sqlalchemy.engine.Connection): Conexión de to_sql.
+        columnas (list): Columnas del DataFrame.
+        filas (iterable): Tuplas con los valores.
+
+    Returns:
+        int: Filas afectadas según MySQL (2 por cada fila actualizada).
+    """
+    quote = conexion.dialect.identifier_preparer.quote
+    nombre = quote(tabla.name)
+    if tabla.schema:
+        nombre = f"{quote(tabla.schema)}.{nombre}"
+    nombres = [f"c{i}" for i in range(len(columnas))]
+    sql = text(
+        f"INSERT INTO {nombre} ({', '.join(quote(c) for c in columnas)}) "
+        f"VALUES ({', '.join(':' + n for n in nombres)}) "
+        f"ON DUPLICATE KEY UPDATE {', '.join(f'{quote(c)} = VALUES({quote(c)})' for c in columnas)}"
+    )
+    resultado = conexion.execute(sql, [dict(zip(nombres, fila)) for fila in filas])
+    return resultado.rowcount
+
+
+def marca_maxima(actual, chunk, columna):
+    """
+    Retorna el mayor valor entre `actual` y la columna de marca del fragmento.
+    """
+    if columna not in chunk.columns:
+        raise KeyError(f"El resultado no tiene la columna de marca de agua {columna}")
+    valor = chunk[columna].max()
+    if valor is None or valor != valor:  # sin valores o NaN/NaT
+        return actual
+    return valor if actual is None or valor > actual else actual
+
+
+def texto_marca(marca):
+    """
+    Convierte la marca de agua al texto que se guarda en conf_marca_agua.
+
+    pandas entrega los ids como float cuando la columna tiene nulos (123.0) y las
+    fechas como Timestamp; se guardan como entero y como fecha ISO
+    (YYYY-MM-DD HH:MM:SS[.ffffff]) para que :marca se compare bien en Sidis.
+
+    Returns:
+        str: Texto de la marca, o None sin marca.
+    """
+    if marca is None:
+        return None
+    if hasattr(marca, "to_pydatetime"):  # pandas.Timestamp
+        marca = marca.to_pydatetime()
+    elif hasattr(marca, "dtype") and str(marca.dtype).startswith("datetime64"):
+        marca = marca.astype("datetime64[us]").item()
+    if isinstance(marca, datetime.datetime):
+        return marca.isoformat(sep=" ")
+    if isinstance(marca, datetime.date):
+        return marca.isoformat()
+    if isinstance(marca, bool):
+        return str(int(marca))
+    if isinstance(marca, numbers.Integral):
+        return str(int(marca))
+    if isinstance(marca, numbers.Real) and float(marca).is_integer():
+        return str(int(marca))
+    return str(marca)
+
+
+class MarcasAgua:
+    """
+    Marcas de agua de la extracción incremental de un tenant (tabla conf_marca_agua).
+
+    Por tabla se guarda el mayor valor de la columna de marca (fecha de
+    modificación o id creciente) ya cargado y la fecha de la última recarga
+    completa del rango, que sirve de reconciliación: recupera las filas borradas
+    o corregidas en Sidis que la extracción incremental no ve.
+
+    Attributes:
+        engine (sqlalchemy.engine.Engine): Motor de la base de configuración
+            (powerbi_adm), el mismo de las demás tablas conf_*.
+        tenant (str): Nombre de la base de datos del tenant.
+    """
+
+    def __init__(self, engine, tenant):
+        self.engine = engine
+        self.tenant = tenant
+
+    def leer(self, txTabla):
+        """
+        Returns:
+            tuple: (marca, dtReconciliacion); (None, None) si la tabla no tiene marca.
+        """
+        with self.engine.connect() as connection:
+            fila = (
+                connection.execute(
+                    text(
+                        "SELECT txMarca, dtReconciliacion FROM powerbi_adm.conf_marca_agua "
+                        "WHERE name = :name AND txTabla = :txTabla"
+                    ),
+                    {"name": self.tenant, "txTabla": txTabla},
+                )
+                .mappings()
+                .first()
+            )
+        if fila is None:
+            return None, None
+        return fila["txMarca"], fila["dtReconciliacion"]
+
+    def requiere_reconciliacion(self, marca, dtReconciliacion, nbDiasReconciliacion=None):
+        """
+        Indica si corresponde la recarga completa: sin marca, sin recarga previa o
+        con la última recarga hace nbDiasReconciliacion días o más.
+        """
+        if marca is None or dtReconciliacion is None:
+            return True
+        dias = DIAS_RECONCILIACION if nbDiasReconciliacion is None else int(nbDiasReconciliacion)
+        return datetime.datetime.now() - dtReconciliacion >= datetime.timedelta(days=dias)
+
+    def guardar(self, txTabla, marca, reconciliado=False):
+        """
+        Registra la marca de agua de la tabla.
+
+        Un error al guardar no se propaga: los datos ya se cargaron, y sin la marca
+        nueva la siguiente ejecución repite filas (el upsert las absorbe) o hace
+        la recarga completa.
+
+        Args:
+            txTabla (str): Tabla destino.
+            marca: Mayor valor cargado de la columna de marca; None conserva el anterior.
+            reconciliado (bool): Si la carga fue una recarga completa del rango.
+        """
+        ahora = datetime.datetime.now()
+        try:
+            self._guardar(txTabla, marca, reconciliado, ahora)
+        except Exception as e:
+            logging.warning(f"No se pudo guardar la marca de agua de {txTabla}: {e}")
+            return
+        logging.info(f"Marca de agua de {txTabla}: {marca} (recarga completa: {reconciliado})")
+
+    def _guardar(self, txTabla, marca, reconciliado, ahora):
+        with self.engine.begin() as connection:
+            connection.execute(
+                text(
+                    "INSERT INTO powerbi_adm.conf_marca_agua "
+                    "(name, txTabla, txMarca, dtReconciliacion, dtActualizacion) "
+                    "VALUES (:name, :txTabla, :txMarca, :dtReconciliacion, :ahora) "
+                    "ON DUPLICATE KEY UPDATE "
+                    "txMarca = COALESCE(VALUES(txMarca), txMarca), "
+                    "dtReconciliacion = COALESCE(VALUES(dtReconciliacion), dtReconciliacion), "
+                    "dtActualizacion = VALUES(dtActualizacion)"
+                ),
+                {
+                    "name": self.tenant,
+                    "txTabla": txTabla,
+                    "txMarca": texto_marca(marca),
+                    "dtReconciliacion": ahora if reconciliado else None,
+                    "ahora": ahora,
+                },
+            )
@@ -1,160 +1,13 @@
 import os
-import pandas as pd
-from sqlalchemy import create_engine, text
-from openpyxl import Workbook
-from openpyxl.cell import WriteOnlyCell
+from sqlalchemy import text
 import logging
-from scripts.conexion import Conexion as con
+from scripts.logs import configurar_logging
+from scripts.conexion import DataBaseConnection
+from scripts import formatos_salida
+from scripts.ejecucion_hojas import EjecutorHojas, ErrorHoja
+from scripts.staging import StagingJob
 from scripts.config import ConfigBasic
 import ast
-import xlsxwriter
-
-# Configuración del logging
-logging.basicConfig(
-    filename="logInterface.txt",
-    level=logging.DEBUG,
-    format="%(asctime)s %(message)s",
-    filemode="w",
-)
-
-
-class DataBaseConnection:
-    """
-    Clase para manejar las conexiones a bases de datos MySQL y SQLite.
-
-    Esta clase facilita la conexión a las bases de datos y la ejecución de consultas SQL,
-    incluyendo la ejecución de consultas grandes en fragmentos (chunks).
-
-    Attributes:
-        config (dict): Configuración utilizada para las conexiones a las bases de datos.
-        engine_mysql (sqlalchemy.engine.base.Engine): Motor SQLAlchemy para la base de datos MySQL.
-        engine_sqlite (sqlalchemy.engine.base.Engine): Motor SQLAlchemy para la base de datos SQLite.
-    """
-
-    def __init__(self, config, mysql_engine=None, sqlite_engine=None):
-        """
-        Inicializa la instancia de DataBaseConnection con la configuración proporcionada.
-
-        Args:
-            config (dict): Configuración para las conexiones a las bases de datos.
-            mysql_engine (sqlalchemy.engine.base.Engine, opcional): Motor SQLAlchemy para la base de datos MySQL.
-            sqlite_engine (sqlalchemy.engine.base.Engine, opcional): Motor SQLAlchemy para la base de datos SQLite.
-        """
-        self.config = config
-        # Establecer o crear el motor para MySQL
-        self.engine_mysql = mysql_engine if mysql_engine else self.create_engine_mysql()
-        # print(self.engine_mysql)
-        # Establecer o crear el motor para SQLite
-        self.engine_sqlite = (
-            sqlite_engine if sqlite_engine else create_engine("sqlite:///mydata.db")
-        )
-        # print(self.engine_sqlite)
-
-    def create_engine_mysql(self):
-        """
-        Crea un motor SQLAlchemy para la conexión a la base de datos MySQL.
-
-        Utiliza la configuración proporcionada para establecer la conexión.
-
-        Returns:
-            sqlalchemy.engine.base.Engine: Motor SQLAlchemy para la base de datos MySQL.
-        """
-        # Extraer los parámetros de configuración para la conexión MySQL
-        user, password, host, port, database = (
-            self.config.get("nmUsrIn"),
-            self.config.get("txPassIn"),
-            self.config.get("hostServerIn"),
-            self.config.get("portServerIn"),
-            self.config.get("dbBi"),
-        )
-        # Crear y retornar el motor de conexión
-        return con.ConexionMariadb3(
-            str(user), str(password), str(host), int(port), str(database)
-        )
-
-    def execute_query_mysql(self, query, chunksize=None):
-        """
-        Ejecuta una consulta SQL en la base de datos MySQL.
-
-        Args:
-            query (str): La consulta SQL a ejecutar.
-            chunksize (int, opcional): El tamaño del fragmento para la ejecución de la consulta.
-
-        Returns:
-            DataFrame: Un DataFrame de pandas con los resultados de la consulta.
-        """
-        # Conectar a la base de datos y ejecutar la consulta
-        with self.create_engine_mysql.connect() as connection:
-            cursor = connection.execution_options(isolation_level="READ COMMITTED")
-            return pd.read_sql_query(query, cursor, chunksize=chunksize)
-
-    def execute_sql_sqlite(self, sql, params=None):
-        """
-        Ejecuta una sentencia SQL en la base de datos SQLite.
-
-        Args:
-            sql (str): La sentencia SQL a ejecutar.
-            params (dict, opcional): Parámetros para la sentencia SQL.
-
-        Returns:
-            Resultado de la ejecución de la sentencia.
-        """
-        # Conectar a la base de datos SQLite y ejecutar la sentencia
-        with self.engine_sqlite.connect() as connection:
-            return connection.execute(sql, params)
-
-    def execute_query_mysql_chunked(self, query, table_name, chunksize=50000):
-        """
-        Ejecuta una consulta SQL en la base de datos MySQL y almacena los resultados en SQLite,
-        procesando la consulta en fragmentos (chunks).
-
-        Args:
-            query (str): La consulta SQL a ejecutar en MySQL.
-            table_name (str): El nombre de la tabla en SQLite donde se almacenarán los resultados.
-            chunksize (int, opcional): El tamaño del fragmento para la ejecución de la consulta.
-
-        Returns:
-            int: El número total de registros almacenados en la tabla SQLite.
-        """
-        try:
-            # Eliminar la tabla en SQLite si ya existe
-            self.eliminar_tabla_sqlite(table_name)
-            # Conectar a MySQL y ejecutar la consulta en fragmentos
-            with self.engine_mysql.connect() as connection:
-                cursor = connection.execution_options(isolation_level="READ COMMITTED")
-                for chunk in pd.read_sql_query(query, con=cursor, chunksize=chunksize):
-                    # Almacenar cada fragmento en la tabla SQLite
-                    chunk.to_sql(
-                        name=table_name,
-                        con=self.engine_sqlite,
-                        if_exists="append",
-                        index=False,
-                    )
-
-            # Contar y retornar el total de registros en la tabla SQLite
-            with self.engine_sqlite.connect() as connection:
-                total_records = connection.execute(
-                    text(f"SELECT COUNT(*) FROM {table_name}")
-                ).fetchone()[0]
-            return total_records
-
-        except Exception as e:
-            # Registrar y propagar cualquier excepción que ocurra
-            logging.error(f"Error al ejecutar el query: {e}")
-            print(f"Error al ejecutar el query: {e}")
-            raise
-
-    def eliminar_tabla_sqlite(self, table_name):
-        """
-        Elimina una tabla específica en la base de datos SQLite.
-
-        Args:
-            table_name (str): El nombre de la tabla a eliminar.
-        """
-        # Ejecutar la sentencia para eliminar la tabla si existe
-        sql = text(f"DROP TABLE IF EXISTS {table_name}")
-        with self.engine_sqlite.connect() as connection:
-            connection.execute(sql)
 
 
 class InterfaceContable:
@@ -162,21 +15,23 @@ class InterfaceContable:
     Clase InterfaceContable para manejar la generación de informes contables.
 
     Esta clase se encarga de configurar la conexión a la base de datos, procesar los datos y generar informes
-    en formato Excel basados en los datos de una base de datos contable.
+    en formato Excel (o Parquet / CSV comprimido, ver scripts.formatos_salida) basados en los datos de una
+    base de datos contable.
 
     Attributes:
         database_name (str): Nombre de la base de datos a utilizar.
         IdtReporteIni (str): Identificador del inicio del rango de reportes.
         IdtReporteFin (str): Identificador del fin del rango de reportes.
-        file_path (str): Ruta del archivo Excel generado.
-        archivo_interface (str): Nombre del archivo Excel generado.
+        file_path (str): Ruta del archivo generado.
+        archivo_interface (str): Nombre del archivo generado.
+        formato (str): Formato de salida (xlsx, parquet, csv.gz o csv.zst).
         config (dict): Configuración para las conexiones a bases de datos y otras operaciones.
         db_connection (DataBaseConnection): Objeto para manejar la conexión a las bases de datos.
-        engine_sqlite (sqlalchemy.engine.base.Engine): Motor SQLAlchemy para la base de datos SQLite.
+        staging (StagingJob): Área de trabajo en disco donde se guardan los resultados de cada hoja.
         engine_mysql (sqlalchemy.engine.base.Engine): Motor SQLAlchemy para la base de datos MySQL.
     """
 
-    def __init__(self, database_name, IdtReporteIni, IdtReporteFin):
+    def __init__(self, database_name, IdtReporteIni, IdtReporteFin, formato=None):
         """
         Inicializa la instancia de InterfaceContable.
 
@@ -184,19 +39,23 @@ class InterfaceContable:
             database_name (str): Nombre de la base de datos.
             IdtReporteIni (str): Identificador del inicio del rango de reportes.
             IdtReporteFin (str): Identificador del fin del rango de reportes.
+            formato (str, opcional): Formato elegido en el formulario; por defecto el de la empresa o xlsx.
         """
+        configurar_logging("logInterface.txt")
         self.database_name = database_name
         self.IdtReporteIni = IdtReporteIni
         self.IdtReporteFin = IdtReporteFin
         self.configurar(database_name)
         self.file_path = None
         self.archivo_interface = None
+        self.formato = formatos_salida.resolver_formato("interface", formato, self.config)
+        self.staging = StagingJob(f"interface_{database_name}")
 
     def configurar(self, database_name):
         """
         Configura la conexión a las bases de datos y establece las variables de entorno necesarias.
 
-        Esta función crea una configuración básica y establece las conexiones a las bases de datos MySQL y SQLite
+        Esta función crea una configuración básica y establece las conexiones a las bases de datos MySQL
         utilizando los parámetros de configuración.
 
         Args:
@@ -211,7 +70,6 @@ class InterfaceContable:
             self.config = config_basic.config
             # Establecer conexiones a las bases de datos
             self.db_connection = DataBaseConnection(config=self.config)
-            self.engine_sqlite = self.db_connection.engine_sqlite
             self.engine_mysql = self.db_connection.engine_mysql
         except Exception as e:
             # Registrar y propagar excepciones que ocurran durante la configuración
@@ -247,13 +105,22 @@ class InterfaceContable:
             f"CALL {sql}('{self.IdtReporteIni}','{self.IdtReporteFin}','','{str(hoja)}');"
         )
 
-    def guardar_datos(self, table_name, hoja, total_records, writer):
-        if total_records > 1000000:
-            self.guardar_datos_excel_xlsxwriter(table_name, hoja, writer)
-        elif total_records > 250000:
-            self.guardar_datos_excel_xlsxwriter(table_name, hoja, writer)
-        else:
-            self.guardar_datos_excel_xlsxwriter(table_name, hoja, writer)
+    def procedimientos_cache(self):
+        """
+        Retorna la configuración que determina el contenido del archivo.
+
+        Forma parte de la clave de scripts.cache_artefactos: si cambia el procedimiento
+        o sus hojas, la caché deja de servir los archivos anteriores.
+
+        Returns:
+            list: Formato de salida, base de datos BI, procedimiento y hojas configuradas.
+        """
+        return [
+            self.formato,
+            self.config.get("dbBi"),
+            self.config.get("nmProcedureInterface"),
+            self.config.get("txProcedureInterface"),
+        ]
 
     def generar_nombre_archivo(self, ext=".xlsx"):
         """
@@ -275,107 +142,17 @@ class InterfaceContable:
         # Devolver el nombre del archivo y la ruta completa
         return self.archivo_interface, self.file_path
 
-    def guardar_datos_excel_xlsxwriter(self, table_name, hoja, writer):
-        """
-        Guarda los datos de una tabla SQLite en una hoja de un archivo Excel, utilizando el motor xlsxwriter.
-
-        Args:
-            table_name (str): Nombre de la tabla en SQLite de donde se extraen los datos.
-            hoja (str): Nombre de la hoja en el archivo Excel donde se guardarán los datos.
-            writer (pd.ExcelWriter): Objeto ExcelWriter que se utiliza para escribir en el archivo Excel.
-        """
-        # Definir el tamaño de cada bloque de datos (chunk)
-        chunksize = 50000
-
-        # Establecer conexión con la base de datos SQLite
-        with self.engine_sqlite.connect() as connection:
-            # Iniciar la fila desde donde empezar a escribir en el archivo Excel
-            startrow = 0
-
-            # Iterar sobre los bloques (chunks) de datos de la tabla SQLite
-            for chunk in pd.read_sql_query(
-                f"SELECT * FROM {table_name}", self.engine_sqlite, chunksize=chunksize
-            ):
-                # Imprimir el tamaño del chunk actual para seguimiento
-                print(f"Procesando chunk de tamaño: {len(chunk)}")
-
-                # Escribir el bloque de datos en el archivo Excel
-                # 'header' se establece en False para todos los chunks después del primero
-                chunk.to_excel(
-                    writer,
-                    sheet_name=hoja,
-                    startrow=startrow,
-                    index=False,
-                    header=not bool(startrow),
-                )
-
-                # Actualizar la fila de inicio para el siguiente bloque
-                startrow += len(chunk)
-
-                # Imprimir la próxima fila inicial para seguimiento
-                print(f"Próximo startrow será: {startrow}")
-
-            # Establecer el estado de la hoja de Excel como visible
-            writer.sheets[hoja].sheet_state = "visible"
-
-    def procesar_hoja(self, hoja, writer):
-        """
-        Procesa una hoja específica de datos, ejecutando una consulta SQL, guardando los resultados en una hoja de Excel,
-        y luego eliminando la tabla SQLite temporal.
-
-        Args:
-            hoja (str): Nombre de la hoja a procesar, que también se utiliza para nombrar la tabla SQLite temporal y la hoja de Excel.
-            writer (pd.ExcelWriter): Objeto ExcelWriter que se utiliza para escribir en el archivo Excel.
-
-        Returns:
-            bool: Verdadero si la hoja se procesó con éxito, Falso si ocurrió una excepción.
-        """
-        try:
-            # Generar la consulta SQL para esta hoja específica
-            sqlout = self.generate_sqlout(hoja)
-            # print(sqlout)
-
-            # Crear un nombre de tabla temporal en SQLite basado en el nombre de la hoja
-            table_name = f"my_table_{self.database_name}_{hoja}"
-
-            # Ejecutar la consulta SQL y guardar los resultados en la tabla SQLite
-            # Devuelve el total de registros procesados
-            total_records = self.db_connection.execute_query_mysql_chunked(
-                query=sqlout, table_name=table_name
-            )
-            print(f"Total de registros: {total_records}")
-
-            # Guardar los datos de la tabla SQLite en el archivo Excel
-            self.guardar_datos(table_name, hoja, total_records, writer)
-
-            # Eliminar la tabla SQLite temporal después de guardar los datos
-            self.db_connection.eliminar_tabla_sqlite(table_name)
-            print(f"Procesamiento de la hoja {hoja} finalizado")
-
-            return True
-
-        except Exception as e:
-            # En caso de cualquier excepción, registrar el error y devolver un estado de error
-            print(f"Error al procesar la hoja {hoja}: {e}")
-            logging.error(f"Error al procesar la hoja {hoja}: {e}")
-            return {
-                "success": False,
-                "error_message": f"Error al procesar la hoja {hoja}: {e}",
-            }
-
     def procesar_datos(self):
         """
-        Procesa los datos para todas las hojas especificadas en la configuración, guardándolos en un archivo Excel.
+        Procesa los datos para todas las hojas especificadas en la configuración, guardándolos en el formato de salida.
 
-        Este método genera el nombre del archivo, procesa cada hoja especificada en la configuración y guarda los datos
-        en el archivo Excel. Si ocurre un error durante el procesamiento de cualquier hoja, el método termina prematuramente.
+        Este método genera el nombre del archivo, ejecuta los procedimientos de las hojas especificadas en la configuración
+        (en paralelo, ver scripts.ejecucion_hojas) y guarda los datos en el archivo en el orden configurado.
+        Si ocurre un error durante el procesamiento de cualquier hoja, el método termina prematuramente.
 
         Returns:
             dict: Un diccionario indicando el éxito o fracaso del proceso y, en caso de éxito, la ruta y el nombre del archivo generado.
         """
-        # Generar el nombre del archivo para guardar los datos de todas las hojas
-        self.archivo_interface, self.file_path = self.generar_nombre_archivo()
-
         # Convertir la configuración de hojas a procesar de una cadena a una lista, si es necesario
         txProcedureInterface_str = self.config["txProcedureInterface"]
         if isinstance(txProcedureInterface_str, str):
@@ -392,19 +169,37 @@ class InterfaceContable:
         if not self.config["txProcedureInterface"]:
             return {"success": False, "error_message": "No hay datos para procesar"}
 
+        # Generar el nombre del archivo para guardar los datos de todas las hojas
+        hojas = list(self.config["txProcedureInterface"])
+        self.archivo_interface, self.file_path = self.generar_nombre_archivo(
+            formatos_salida.extension(self.formato, len(hojas))
+        )
+
         print("Procesando datos para iniciar el proceso")
 
-        # Crear un único ExcelWriter para guardar todas las hojas
-        with pd.ExcelWriter(self.file_path, engine="xlsxwriter") as writer:
-            for hoja in self.config["txProcedureInterface"]:
-                print(f"Procesando hoja {hoja}")
-                # Procesar cada hoja individualmente
-                if not self.procesar_hoja(hoja, writer):
-                    # En caso de error en el procesamiento de una hoja, devolver un estado de error
-                    return {
-                        "success": False,
-                        "error_message": f"Error al procesar la hoja {hoja}",
-                    }
+        ejecutor = EjecutorHojas(self.db_connection, self.staging)
+        error = None
+
+        # Crear un único archivo para guardar todas las hojas; la carpeta de
+        # staging del job se elimina al terminar, aun si hay errores
+        with self.staging, formatos_salida.abrir_salida(self.file_path, self.formato) as libro:
+            try:
+                conteos = ejecutor.ejecutar(
+                    hojas,
+                    self.generate_sqlout,
+                    libro.escribir_tabla,
+                )
+            except ErrorHoja as e:
+                # En caso de error en el procesamiento de una hoja, devolver un estado de error
+                print(e)
+                logging.error(str(e))
+                error = {"success": False, "error_message": str(e)}
+
+        if error:
+            # No se deja en media un archivo incompleto
+            if os.path.exists(self.file_path):
+                os.remove(self.file_path)
+            return error
 
         print("Proceso finalizado")
         print(self.file_path)
@@ -415,6 +210,7 @@ class InterfaceContable:
             "success": True,
             "file_path": self.file_path,
             "file_name": self.archivo_interface,
+            "registros": conteos,
         }
 
 
@@ -0,0 +1,182 @@
+import io
+import codecs
+import logging
+import zipfile
+
+# Bytes del inicio del archivo con que se elige la codificación.
+TAMANO_MUESTRA = 1024 * 1024
+# Bytes que se descomprimen y decodifican en cada lectura.
+TAMANO_BLOQUE = 256 * 1024
+# Codificaciones de los planos de TSOL: UTF-8 o, desde Windows, windows-1252 /
+# ISO-8859-1.
+UTF8 = "utf-8"
+WINDOWS_1252 = "windows-1252"
+ISO_8859_1 = "ISO-8859-1"
+
+
+def detectar_codificacion(muestra):
+    """
+    Elige la codificación de un archivo a partir de los primeros bytes.
+
+    UTF-8 si la muestra es UTF-8 válido (un carácter cortado al final de la
+    muestra no cuenta como error). Si no, windows-1252 cuando la muestra tiene
+    bytes 0x80-0x9F que en esa codificación son caracteres (comillas tipográficas,
+    €), e ISO-8859-1 en otro caso.
+
+    Args:
+        muestra (bytes): Primeros bytes del archivo.
+
+    Returns:
+        str: Nombre de la codificación.
+    """
+    try:
+        codecs.getincrementaldecoder(UTF8)().decode(muestra, final=False)
+        return UTF8
+    except UnicodeDecodeError:
+        pass
+    if any(0x80 <= b <= 0x9F for b in muestra):
+        try:
+            muestra.decode(WINDOWS_1252)
+            return WINDOWS_1252
+        except UnicodeDecodeError:
+            pass
+    return ISO_8859_1
+
+
+class FlujoTexto(io.TextIOBase):
+    """
+    Decodifica un flujo binario por bloques, para pasarlo a pd.read_csv.
+
+    Si más adelante aparece un byte que no es UTF-8 (archivos que solo tienen
+    tildes después de la muestra), el resto se decodifica con windows-1252 o
+    ISO-8859-1, sin volver a leer lo ya entregado.
+
+    Attributes:
+        codificacion (str): Codificación en uso.
+    """
+
+    def __init__(self, binario, codificacion, inicial=b"", nombre=""):
+        self._binario = binario
+        self._pendiente = inicial
+        self._decodificador = codecs.getincrementaldecoder(codificacion)()
+        self._texto = ""
+        self._fin = False
+        self.codificacion = codificacion
+        self.nombre = nombre
+
+    def readable(self):
+        return True
+
+    def _decodificar(self, datos, final=False):
+        try:
+            return self._decodificador.decode(datos, final=final)
+        except UnicodeDecodeError:
+            if self.codificacion != UTF8:
+                raise
+            # Bytes que el decodificador UTF-8 tenía a la espera de completar un carácter
+            retenidos = self._decodificador.getstate()[0]
+            datos = retenidos + datos
+            self.codificacion = (
+                WINDOWS_1252 if detectar_codificacion(datos) == WINDOWS_1252 else ISO_8859_1
+            )
+            logging.warning(
+                f"{self.nombre}: bytes no UTF-8 después de la muestra; se continúa con {self.codificacion}"
+            )
+            self._decodificador = codecs.getincrementaldecoder(self.codificacion)(errors="replace")
+            return self._decodificador.decode(datos, final=final)
+
+    def _llenar(self, minimo):
+        while not self._fin and (minimo < 0 or len(self._texto) < minimo):
+            datos = self._pendiente or self._binario.read(TAMANO_BLOQUE)
+            self._pendiente = b""
+            if not datos:
+                self._texto += self._decodificar(b"", final=True)
+                self._fin = True
+                break
+            self._texto += self._decodificar(datos)
+
+    def read(self, size=-1):
+        size = -1 if size is None else size
+        self._llenar(size)
+        if size < 0:
+            texto, self._texto = self._texto, ""
+        else:
+            texto, self._texto = self._texto[:size], self._texto[size:]
+        return texto
+
+    def readline(self, size=-1):
+        while "\n" not in self._texto and not self._fin:
+            self._llenar(len(self._texto) + 1)
+        fin = self._texto.find("\n") + 1 or len(self._texto)
+        if size is not None and size >= 0:
+            fin = min(fin, size)
+        linea, self._texto = self._texto[:fin], self._texto[fin:]
+        return linea
+
+    def close(self):
+        try:
+            self._binario.close()
+        finally:
+            super().close()
+
+
+def abrir_texto(binario, nombre=""):
+    """
+    Retorna un FlujoTexto sobre un archivo binario, con la codificación detectada
+    en los primeros TAMANO_MUESTRA bytes (que se leen una sola vez).
+    """
+    muestra = binario.read(TAMANO_MUESTRA)
+    codificacion = detectar_codificacion(muestra)
+    logging.info(f"{nombre}: codificación {codificacion}")
+    return FlujoTexto(binario, codificacion, inicial=muestra, nombre=nombre)
+
+
+class LectorZip:
+    """
+    Lee los archivos de un zip sin extraerlos a disco.
+
+    Cada miembro se descomprime por bloques a medida que el parser de CSV lo
+    consume, en vez de extraer el zip, leer cada archivo completo para probar
+    codificaciones y reescribirlo antes de parsearlo.
+
+    Uso:
+        with LectorZip(ruta) as lector:
+            with lector.abrir_texto("intercliente.txt") as flujo:
+                df = pd.read_csv(flujo, delimiter=";")
+
+    Attributes:
+        ruta (str): Ruta del archivo zip.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._zip = zipfile.ZipFile(ruta, "r")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cerrar()
+        return False
+
+    def nombres(self):
+        return self._zip.namelist()
+
+    def existe(self, nombre):
+        try:
+            self._zip.getinfo(nombre)
+            return True
+        except KeyError:
+            return False
+
+    def abrir_texto(self, nombre):
+        """
+        Abre un miembro del zip como texto decodificado.
+
+        Raises:
+            KeyError: Si el zip no tiene ese archivo.
+        """
+        return abrir_texto(self._zip.open(nombre, "r"), nombre)
+
+    def cerrar(self):
+        self._zip.close()
@@ -0,0 +1,168 @@
+import os
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# Variable de entorno con el número de extracciones que un job ejecuta a la vez.
+ENV_EXTRACCIONES_CONCURRENTES = "ADMINBI_EXTRACCIONES_CONCURRENTES"
+MAX_EXTRACCIONES_CONCURRENTES = 4
+
+# Reportes de conf_sql que procesan en BI lo ya cargado (no extraen de Sidis).
+# Cada uno es una barrera: corre cuando terminan todas las entradas anteriores
+# de la lista y las posteriores esperan a que termine.
+REPORTES_POSTERIORES = {
+    "update_cubo_bi",
+    "borra_impactos_bi",
+    "impactos_bi",
+    "actualizar_usuarios_periodo",
+    "actualizar_usuarios_conteo_diario",
+}
+
+
+def extracciones_concurrentes():
+    try:
+        return max(
+            1,
+            int(os.environ.get(ENV_EXTRACCIONES_CONCURRENTES, MAX_EXTRACCIONES_CONCURRENTES)),
+        )
+    except ValueError:
+        return MAX_EXTRACCIONES_CONCURRENTES
+
+
+class Tarea:
+    """
+    Nodo del grafo de ejecución.
+
+    Attributes:
+        clave (str): Identificador único de la tarea.
+        funcion (callable): Función sin argumentos que ejecuta la tarea.
+        dependencias (set): Claves de las tareas que deben terminar antes.
+        resultado: Lo que retornó la función.
+        error (Exception): Excepción de la función, o None.
+        segundos (float): Duración de la ejecución.
+    """
+
+    def __init__(self, clave, funcion, dependencias=()):
+        self.clave = clave
+        self.funcion = funcion
+        self.dependencias = set(dependencias)
+        self.resultado = None
+        self.error = None
+        self.segundos = 0.0
+
+    def ejecutar(self):
+        inicio = time.perf_counter()
+        try:
+            self.resultado = self.funcion()
+        except Exception as e:
+            self.error = e
+            logging.error(f"La tarea {self.clave} falló: {e}")
+        finally:
+            self.segundos = time.perf_counter() - inicio
+        return self
+
+
+class Planificador:
+    """
+    Ejecuta un grafo de tareas con dependencias en un pool de hilos.
+
+    Una tarea se envía al pool en cuanto terminan todas sus dependencias, así que
+    las independientes corren al mismo tiempo y la duración total se acerca a la
+    de la ruta crítica. Una dependencia que falla no detiene a las demás tareas:
+    igual que la ejecución secuencial anterior, el error queda registrado y el
+    proceso continúa.
+
+    Attributes:
+        tareas (dict): Clave -> Tarea, en el orden en que se agregaron.
+        max_hilos (int): Tareas que se ejecutan a la vez.
+    """
+
+    def __init__(self, max_hilos=None):
+        self.tareas = {}
+        self.max_hilos = max_hilos or extracciones_concurrentes()
+
+    def agregar(self, clave, funcion, dependencias=()):
+        """
+        Agrega una tarea al grafo.
+
+        Args:
+            clave (str): Identificador único.
+            funcion (callable): Función sin argumentos.
+            dependencias (iterable): Claves de tareas ya agregadas que deben terminar antes.
+        """
+        faltantes = set(dependencias) - set(self.tareas)
+        if faltantes:
+            raise ValueError(f"La tarea {clave} depende de tareas no registradas: {faltantes}")
+        if clave in self.tareas:
+            raise ValueError(f"La tarea {clave} ya está registrada")
+        self.tareas[clave] = Tarea(clave, funcion, dependencias)
+        return self.tareas[clave]
+
+    def ejecutar(self):
+        """
+        Ejecuta todas las tareas respetando las dependencias.
+
+        Returns:
+            dict: Clave -> Tarea ya ejecutada (con resultado, error y segundos).
+        """
+        pendientes = dict(self.tareas)
+        terminadas = set()
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_hilos) as pool:
+            en_curso = {}
+            while pendientes or en_curso:
+                # Como las dependencias deben existir al agregar una tarea, el grafo
+                # no tiene ciclos y siempre hay algo listo o en curso
+                listas = [t for t in pendientes.values() if t.dependencias <= terminadas]
+                for tarea in listas:
+                    del pendientes[tarea.clave]
+                    en_curso[pool.submit(tarea.ejecutar)] = tarea
+                hechos, _ = wait(list(en_curso), return_when=FIRST_COMPLETED)
+                for futuro in hechos:
+                    tarea = en_curso.pop(futuro)
+                    terminadas.add(tarea.clave)
+                    logging.info(f"Tarea {tarea.clave} terminada en {tarea.segundos:.1f} s")
+        total = time.perf_counter() - inicio
+        suma = sum(t.segundos for t in self.tareas.values())
+        logging.info(
+            f"{len(self.tareas)} tareas en {total:.1f} s (suma secuencial {suma:.1f} s, "
+            f"{self.max_hilos} hilos)"
+        )
+        return self.tareas
+
+
+def planificar_extraccion(entradas):
+    """
+    Calcula las dependencias de una lista de procesos de conf_sql.
+
+    - Los reportes de REPORTES_POSTERIORES son barreras: dependen de todo lo
+      anterior en la lista y todo lo posterior depende de ellos.
+    - Dos entradas que escriben en la misma tabla se ejecutan en el orden de la
+      lista (cada una borra el rango e inserta).
+    - Las demás entradas son independientes.
+
+    Args:
+        entradas (list): (clave, nmReporte, txTabla) en el orden de txProcedureExtrae.
+
+    Returns:
+        list: (clave, dependencias) en el mismo orden.
+    """
+    plan = []
+    barrera = None
+    desde_barrera = []
+    ultima_por_tabla = {}
+    for clave, nmReporte, txTabla in entradas:
+        if nmReporte in REPORTES_POSTERIORES:
+            dependencias = set(desde_barrera)
+            if barrera is not None:
+                dependencias.add(barrera)
+            barrera, desde_barrera = clave, []
+            ultima_por_tabla = {}
+        else:
+            dependencias = {barrera} if barrera is not None else set()
+            if txTabla in ultima_por_tabla:
+                dependencias.add(ultima_por_tabla[txTabla])
+            ultima_por_tabla[txTabla] = clave
+            desde_barrera.append(clave)
+        plan.append((clave, dependencias))
+    return plan
@@ -1,163 +1,14 @@
 import os
-import pandas as pd
-from sqlalchemy import create_engine, text
-from openpyxl import Workbook
-from openpyxl.cell import WriteOnlyCell
+from sqlalchemy import text
 import logging
-from scripts.StaticPage import StaticPage
-from scripts.conexion import Conexion as con
+from scripts.logs import configurar_logging
+from scripts.conexion import DataBaseConnection
+from scripts.constructor_zip import ConstructorZip
+from scripts.ejecucion_hojas import limite_servidor
+from scripts.staging import directorio_base
+from scripts import formatos_salida
 from scripts.config import ConfigBasic
 import ast
-import xlsxwriter
-import zipfile
-from zipfile import ZipFile
-
-# Configuración del logging
-logging.basicConfig(
-    filename="logInterface.txt",
-    level=logging.DEBUG,
-    format="%(asctime)s %(message)s",
-    filemode="w",
-)
-
-
-class DataBaseConnection:
-    """
-    Clase para manejar las conexiones a bases de datos MySQL y SQLite.
-
-    Esta clase facilita la conexión a las bases de datos y la ejecución de consultas SQL,
-    incluyendo la ejecución de consultas grandes en fragmentos (chunks).
-
-    Attributes:
-        config (dict): Configuración utilizada para las conexiones a las bases de datos.
-        engine_mysql (sqlalchemy.engine.base.Engine): Motor SQLAlchemy para la base de datos MySQL.
-        engine_sqlite (sqlalchemy.engine.base.Engine): Motor SQLAlchemy para la base de datos SQLite.
-    """
-
-    def __init__(self, config, mysql_engine=None, sqlite_engine=None):
-        """
-        Inicializa la instancia de DataBaseConnection con la configuración proporcionada.
-
-        Args:
-            config (dict): Configuración para las conexiones a las bases de datos.
-            mysql_engine (sqlalchemy.engine.base.Engine, opcional): Motor SQLAlchemy para la base de datos MySQL.
-            sqlite_engine (sqlalchemy.engine.base.Engine, opcional): Motor SQLAlchemy para la base de datos SQLite.
-        """
-        self.config = config
-        # Establecer o crear el motor para MySQL
-        self.engine_mysql = mysql_engine if mysql_engine else self.create_engine_mysql()
-        # print(self.engine_mysql)
-        # Establecer o crear el motor para SQLite
-        self.engine_sqlite = (
-            sqlite_engine if sqlite_engine else create_engine("sqlite:///mydata.db")
-        )
-        # print(self.engine_sqlite)
-
-    def create_engine_mysql(self):
-        """
-        Crea un motor SQLAlchemy para la conexión a la base de datos MySQL.
-
-        Utiliza la configuración proporcionada para establecer la conexión.
-
-        Returns:
-            sqlalchemy.engine.base.Engine: Motor SQLAlchemy para la base de datos MySQL.
-        """
-        # Extraer los parámetros de configuración para la conexión MySQL
-        user, password, host, port, database = (
-            self.config.get("nmUsrIn"),
-            self.config.get("txPassIn"),
-            self.config.get("hostServerIn"),
-            self.config.get("portServerIn"),
-            self.config.get("dbBi"),
-        )
-        # Crear y retornar el motor de conexión
-        return con.ConexionMariadb3(
-            str(user), str(password), str(host), int(port), str(database)
-        )
-
-    def execute_query_mysql(self, query, chunksize=None):
-        """
-        Ejecuta una consulta SQL en la base de datos MySQL.
-
-        Args:
-            query (str): La consulta SQL a ejecutar.
-            chunksize (int, opcional): El tamaño del fragmento para la ejecución de la consulta.
-
-        Returns:
-            DataFrame: Un DataFrame de pandas con los resultados de la consulta.
-        """
-        # Conectar a la base de datos y ejecutar la consulta
-        with self.create_engine_mysql.connect() as connection:
-            cursor = connection.execution_options(isolation_level="READ COMMITTED")
-            return pd.read_sql_query(query, cursor, chunksize=chunksize)
-
-    def execute_sql_sqlite(self, sql, params=None):
-        """
-        Ejecuta una sentencia SQL en la base de datos SQLite.
-
-        Args:
-            sql (str): La sentencia SQL a ejecutar.
-            params (dict, opcional): Parámetros para la sentencia SQL.
-
-        Returns:
-            Resultado de la ejecución de la sentencia.
-        """
-        # Conectar a la base de datos SQLite y ejecutar la sentencia
-        with self.engine_sqlite.connect() as connection:
-            return connection.execute(sql, params)
-
-    def execute_query_mysql_chunked(self, query, table_name, chunksize=50000):
-        """
-        Ejecuta una consulta SQL en la base de datos MySQL y almacena los resultados en SQLite,
-        procesando la consulta en fragmentos (chunks).
-
-        Args:
-            query (str): La consulta SQL a ejecutar en MySQL.
-            table_name (str): El nombre de la tabla en SQLite donde se almacenarán los resultados.
-            chunksize (int, opcional): El tamaño del fragmento para la ejecución de la consulta.
-
-        Returns:
-            int: El número total de registros almacenados en la tabla SQLite.
-        """
-        try:
-            # Eliminar la tabla en SQLite si ya existe
-            self.eliminar_tabla_sqlite(table_name)
-            # Conectar a MySQL y ejecutar la consulta en fragmentos
-            with self.engine_mysql.connect() as connection:
-                cursor = connection.execution_options(isolation_level="READ COMMITTED")
-                for chunk in pd.read_sql_query(query, con=cursor, chunksize=chunksize):
-                    # Almacenar cada fragmento en la tabla SQLite
-                    chunk.to_sql(
-                        name=table_name,
-                        con=self.engine_sqlite,
-                        if_exists="append",
-                        index=False,
-                    )
-
-            # Contar y retornar el total de registros en la tabla SQLite
-            with self.engine_sqlite.connect() as connection:
-                total_records = connection.execute(
-                    text(f"SELECT COUNT(*) FROM {table_name}")
-                ).fetchone()[0]
-            return total_records
-
-        except Exception as e:
-            # Registrar y propagar cualquier excepción que ocurra
-            logging.error(f"Error al ejecutar el query: {e}")
-            print(f"Error al ejecutar el query: {e}")
-            raise
-
-    def eliminar_tabla_sqlite(self, table_name):
-        """
-        Elimina una tabla específica en la base de datos SQLite.
-
-        Args:
-            table_name (str): El nombre de la tabla a eliminar.
-        """
-        # Ejecutar la sentencia para eliminar la tabla si existe
-        sql = text(f"DROP TABLE IF EXISTS {table_name}")
-        with self.engine_sqlite.connect() as connection:
-            connection.execute(sql)
 
 
 class InterfacePlano:
@@ -171,15 +22,15 @@ class InterfacePlano:
         database_name (str): Nombre de la base de datos a utilizar.
         IdtReporteIni (str): Identificador del inicio del rango de reportes.
         IdtReporteFin (str): Identificador del fin del rango de reportes.
-        file_path (str): Ruta del archivo Excel generado.
-        archivo_plano (str): Nombre del archivo Excel generado.
+        file_path (str): Ruta del zip generado.
+        archivo_plano (str): Nombre del zip generado.
+        formato (str): Formato de cada hoja dentro del zip (zip para .txt, parquet, csv.gz o csv.zst).
         config (dict): Configuración para las conexiones a bases de datos y otras operaciones.
         db_connection (DataBaseConnection): Objeto para manejar la conexión a las bases de datos.
-        engine_sqlite (sqlalchemy.engine.base.Engine): Motor SQLAlchemy para la base de datos SQLite.
         engine_mysql (sqlalchemy.engine.base.Engine): Motor SQLAlchemy para la base de datos MySQL.
     """
 
-    def __init__(self, database_name, IdtReporteIni, IdtReporteFin):
+    def __init__(self, database_name, IdtReporteIni, IdtReporteFin, formato=None):
         """
         Inicializa la instancia de InterfaceContable.
 
@@ -187,19 +38,22 @@ class InterfacePlano:
             database_name (str): Nombre de la base de datos.
             IdtReporteIni (str): Identificador del inicio del rango de reportes.
             IdtReporteFin (str): Identificador del fin del rango de reportes.
+            formato (str, opcional): Formato elegido en el formulario; por defecto el de la empresa o .txt.
         """
+        configurar_logging("logInterface.txt")
         self.database_name = database_name
         self.IdtReporteIni = IdtReporteIni
         self.IdtReporteFin = IdtReporteFin
         self.configurar(database_name)
         self.file_path = None
         self.archivo_plano = None
+        self.formato = formatos_salida.resolver_formato("plano", formato, self.config)
 
     def configurar(self, database_name):
         """
         Configura la conexión a las bases de datos y establece las variables de entorno necesarias.
 
-        Esta función crea una configuración básica y establece las conexiones a las bases de datos MySQL y SQLite
+        Esta función crea una configuración básica y establece las conexiones a las bases de datos MySQL
         utilizando los parámetros de configuración.
 
         Args:
@@ -215,7 +69,6 @@ class InterfacePlano:
             # Establecer conexiones a las bases de datos
             # config_basic.print_configuration()
             self.db_connection = DataBaseConnection(config=self.config)
-            self.engine_sqlite = self.db_connection.engine_sqlite
             self.engine_mysql = self.db_connection.engine_mysql
         except Exception as e:
             # Registrar y propagar excepciones que ocurran durante la configuración
@@ -253,8 +106,24 @@ class InterfacePlano:
             f"CALL {sql}('{self.IdtReporteIni}','{self.IdtReporteFin}','','{str(hoja)}');"
         )
 
-    def guardar_datos(self, table_name, buffer):
-        self.guardar_datos_csv(table_name, buffer)
+    def procedimientos_cache(self):
+        """
+        Retorna la configuración que determina el contenido del archivo.
+
+        Forma parte de la clave de scripts.cache_artefactos: si cambian los procedimientos
+        o sus hojas, la caché deja de servir los archivos anteriores.
+
+        Returns:
+            list: Formato de salida, base de datos BI, procedimientos y hojas de los dos formatos de plano.
+        """
+        return [
+            self.formato,
+            self.config.get("dbBi"),
+            self.config.get("nmProcedureCsv"),
+            self.config.get("txProcedureCsv"),
+            self.config.get("nmProcedureCsv2"),
+            self.config.get("txProcedureCsv2"),
+        ]
 
     def generar_nombre_archivo(self, ext=".zip"):
         """
@@ -276,97 +145,76 @@ class InterfacePlano:
         # Devolver el nombre del archivo y la ruta completa
         return self.archivo_plano, self.file_path
 
-    def guardar_datos_csv(self, table_name, buffer):
+    def escribir_csv(self, sqlout, entrada, sep, header, float_format):
         """
-        Guarda los datos de una tabla SQLite en un archivo CSV, manejando grandes volúmenes de datos.
+        Escribe el resultado de una consulta en una entrada del zip, en el formato de salida.
 
-        Args:
-        table_name (str): Nombre de la tabla en SQLite de donde se extraerán los datos.
-        file_path (str): Ruta del archivo CSV de destino.
+        Las filas se leen del cursor del servidor por fragmentos y cada fragmento se
+        codifica y se comprime en cuanto llega, sin tablas temporales.
 
-        Descripción:
-        Este método extrae datos de una tabla SQLite en bloques (chunks) de tamaño definido
-        y los guarda en un archivo CSV. Es útil para manejar grandes volúmenes de datos que
-        no caben en la memoria de una sola vez.
+        Args:
+            sqlout (sqlalchemy.sql.elements.TextClause): Consulta a ejecutar.
+            entrada (EntradaComprimida): Entrada del zip donde se escriben los bytes.
+            sep (str): Separador de columnas.
+            header (bool): Si se escribe el encabezado (solo antes del primer fragmento).
+            float_format (str): Formato de los números decimales.
 
-        El archivo CSV se escribe en modo 'append', lo que permite añadir datos al archivo
-        existente sin sobrescribirlo. Cada bloque de datos se lee de la tabla SQLite y se
-        escribe en el archivo CSV hasta que todos los datos han sido procesados.
+        Returns:
+            int: Número de registros escritos.
+        """
+        return formatos_salida.escribir_hoja(
+            self.formato,
+            entrada.escribir,
+            self.db_connection.stream_query(sqlout),
+            sep=sep,
+            header=header,
+            float_format=float_format,
+        )
 
-        Se utiliza un tamaño de bloque (chunksize) de 100000, lo que significa que los datos se
-        leerán y escribirán en bloques de 100000 filas a la vez. Este valor puede ajustarse según
-        las necesidades de rendimiento y la capacidad de la memoria.
+    def generar_zip(self, hojas, generar_sql, **formato):
         """
-        chunksize = 50000  # Define el tamaño de cada bloque de datos
-
-        with self.engine_sqlite.connect() as connection:
-            for chunk in pd.read_sql_query(
-                f"SELECT * FROM {table_name}", self.engine_sqlite, chunksize=chunksize
-            ):
-                if chunk.empty:
-                    print(f"No hay datos en el chunk para la tabla {table_name}")
-                    continue
-
-                try:
-                    chunk.to_csv(
-                        buffer, sep="|", index=False, float_format="%.2f", header=True
-                    )
-                    print(f"Datos escritos en el buffer para la tabla {table_name}")
-                except Exception as e:
-                    print(f"Error al escribir datos en el buffer: {e}")
-                    raise
-
-    def procesar_hoja(self, hoja, buffer):
-        """
-        Procesa una hoja específica de datos, ejecutando una consulta SQL, guardando los resultados en una hoja de Excel,
-        y luego eliminando la tabla SQLite temporal.
+        Genera el zip con un archivo por hoja (.txt, o .parquet / .csv.gz / .csv.zst).
+
+        Los procedimientos de las hojas se ejecutan y comprimen en paralelo
+        (scripts.constructor_zip), respetando el cupo de procedimientos por servidor,
+        y las entradas quedan en el zip en el orden configurado. Los formatos que ya
+        vienen comprimidos se guardan en el zip sin volver a comprimir.
 
         Args:
-            hoja (str): Nombre de la hoja a procesar, que también se utiliza para nombrar la tabla SQLite temporal y la hoja de Excel.
-            writer (pd.ExcelWriter): Objeto ExcelWriter que se utiliza para escribir en el archivo Excel.
+            hojas (list): Hojas a incluir, en orden.
+            generar_sql (callable): hoja -> consulta del procedimiento.
+            **formato: sep, header y float_format del CSV.
 
         Returns:
-            bool: Verdadero si la hoja se procesó con éxito, Falso si ocurrió una excepción.
+            dict: Hoja -> número de registros escritos.
         """
-        try:
-            # Generar la consulta SQL para esta hoja específica
-            sqlout = self.generate_sqlout(hoja)
-            # print(sqlout)
-
-            # Crear un nombre de tabla temporal en SQLite basado en el nombre de la hoja
-            table_name = f"my_table_{self.database_name}_{hoja}"
-
-            # Ejecutar la consulta SQL y guardar los resultados en la tabla SQLite
-            # Devuelve el total de registros procesados
-            total_records = self.db_connection.execute_query_mysql_chunked(
-                query=sqlout, table_name=table_name
-            )
-            print(f"Total de registros: {total_records}")
+        if self.formato == formatos_salida.FORMATO_PLANO:
+            constructor, sufijo = ConstructorZip(self.file_path, directorio_base()), "txt"
+        else:
+            constructor = ConstructorZip(self.file_path, directorio_base(), nivel=0)
+            sufijo = self.formato
+        limite = limite_servidor(self.config)
+        conteos = {}
 
-            # Guardar los datos de la tabla SQLite en el archivo Excel
-            self.guardar_datos(table_name, buffer)
+        def productor(hoja):
+            def producir(entrada):
+                with limite:
+                    print(f"Procesando hoja {hoja}")
+                    conteos[hoja] = self.escribir_csv(generar_sql(hoja), entrada, **formato)
 
-            # Eliminar la tabla SQLite temporal después de guardar los datos
-            self.db_connection.eliminar_tabla_sqlite(table_name)
-            print(f"Procesamiento de la hoja {hoja} finalizado")
+            return producir
 
-            return True
-
-        except Exception as e:
-            # En caso de cualquier excepción, registrar el error y devolver un estado de error
-            print(f"Error al procesar la hoja {hoja}: {e}")
-            logging.error(f"Error al procesar la hoja {hoja}: {e}")
-            return {
-                "success": False,
-                "error_message": f"Error al procesar la hoja {hoja}: {e}",
-            }
+        for hoja in hojas:
+            constructor.agregar(f"{hoja}.{sufijo}", productor(hoja))
+        constructor.construir()
+        return conteos
 
     def procesar_datos(self):
         """
-        Procesa los datos para todas las hojas especificadas en la configuración, guardándolos en un archivo Excel.
+        Procesa los datos para todas las hojas especificadas en la configuración, guardándolos en un archivo zip.
 
         Este método genera el nombre del archivo, procesa cada hoja especificada en la configuración y guarda los datos
-        en el archivo Excel. Si ocurre un error durante el procesamiento de cualquier hoja, el método termina prematuramente.
+        en el zip. Si ocurre un error durante el procesamiento de cualquier hoja, no se genera el archivo.
 
         Returns:
             dict: Un diccionario indicando el éxito o fracaso del proceso y, en caso de éxito, la ruta y el nombre del archivo generado.
@@ -390,18 +238,23 @@ class InterfacePlano:
 
         print("Procesando datos para iniciar el proceso")
 
-        # Crear un único Zip para guardar todas las hojas
-        with zipfile.ZipFile(self.file_path, "w") as zf:
-            for hoja in self.config["txProcedureCsv"]:
-                print(f"Procesando hoja {hoja}")
-                # Procesar cada hoja individualmente
-                with zf.open(hoja + ".txt", "w") as buffer:
-                    if not self.procesar_hoja(hoja, buffer):
-                        # En caso de error en el procesamiento de una hoja, devolver un estado de error
-                        return {
-                            "success": False,
-                            "error_message": f"Error al procesar la hoja {hoja}",
-                        }
+        # Crear un único Zip con un archivo por hoja
+        try:
+            conteos = self.generar_zip(
+                self.config["txProcedureCsv"],
+                self.generate_sqlout,
+                sep="|",
+                header=True,
+                float_format="%.2f",
+            )
+        except Exception as e:
+            # En caso de error en el procesamiento de una hoja, devolver un estado de error
+            print(f"Error al generar el plano: {e}")
+            logging.error(f"Error al generar el plano: {e}")
+            return {
+                "success": False,
+                "error_message": f"Error al generar el plano: {e}",
+            }
 
         print("Proceso finalizado")
         # print(self.file_path)
@@ -412,6 +265,7 @@ class InterfacePlano:
             "success": True,
             "file_path": self.file_path,
             "file_name": self.archivo_plano,
+            "registros": conteos,
         }
 
     def generate_sqlout2(self, hoja):
@@ -443,93 +297,12 @@ class InterfacePlano:
             f"CALL {sql}('{self.IdtReporteIni}','{self.IdtReporteFin}','','{str(hoja)}');"
         )
 
-    def guardar_datos2(self, table_name, buffer):
-        self.guardar_datos_csv2(table_name, buffer)
-
-    def guardar_datos_csv2(self, table_name, buffer):
-        """
-        Guarda los datos de una tabla SQLite en un archivo CSV, manejando grandes volúmenes de datos.
-
-        Args:
-        table_name (str): Nombre de la tabla en SQLite de donde se extraerán los datos.
-        file_path (str): Ruta del archivo CSV de destino.
-
-        Descripción:
-        Este método extrae datos de una tabla SQLite en bloques (chunks) de tamaño definido
-        y los guarda en un archivo CSV. Es útil para manejar grandes volúmenes de datos que
-        no caben en la memoria de una sola vez.
-
-        El archivo CSV se escribe en modo 'append', lo que permite añadir datos al archivo
-        existente sin sobrescribirlo. Cada bloque de datos se lee de la tabla SQLite y se
-        escribe en el archivo CSV hasta que todos los datos han sido procesados.
-
-        Se utiliza un tamaño de bloque (chunksize) de 100000, lo que significa que los datos se
-        leerán y escribirán en bloques de 100000 filas a la vez. Este valor puede ajustarse según
-        las necesidades de rendimiento y la capacidad de la memoria.
-        """
-        chunksize = 50000  # Define el tamaño de cada bloque de datos
-
-        with self.engine_sqlite.connect() as connection:
-            # Iterar sobre los bloques (chunks) de datos de la tabla SQLite
-            for chunk in pd.read_sql_query(
-                f"SELECT * FROM {table_name}", self.engine_sqlite, chunksize=chunksize
-            ):
-                # Escribir el bloque de datos en el archivo CSV en modo 'append'
-                chunk.to_csv(
-                    buffer, sep=",", index=False, header=False, float_format="%.0f"
-                )
-
-    def procesar_hoja2(self, hoja, buffer):
-        """
-        Procesa una hoja específica de datos, ejecutando una consulta SQL, guardando los resultados en una hoja de Excel,
-        y luego eliminando la tabla SQLite temporal.
-
-        Args:
-            hoja (str): Nombre de la hoja a procesar, que también se utiliza para nombrar la tabla SQLite temporal y la hoja de Excel.
-            writer (pd.ExcelWriter): Objeto ExcelWriter que se utiliza para escribir en el archivo Excel.
-
-        Returns:
-            bool: Verdadero si la hoja se procesó con éxito, Falso si ocurrió una excepción.
-        """
-        try:
-            # Generar la consulta SQL para esta hoja específica
-            sqlout = self.generate_sqlout2(hoja)
-            # print(sqlout)
-
-            # Crear un nombre de tabla temporal en SQLite basado en el nombre de la hoja
-            table_name = f"my_table_{self.database_name}_{hoja}"
-
-            # Ejecutar la consulta SQL y guardar los resultados en la tabla SQLite
-            # Devuelve el total de registros procesados
-            total_records = self.db_connection.execute_query_mysql_chunked(
-                query=sqlout, table_name=table_name
-            )
-            print(f"Total de registros: {total_records}")
-
-            # Guardar los datos de la tabla SQLite en el archivo Excel
-            self.guardar_datos2(table_name, buffer)
-
-            # Eliminar la tabla SQLite temporal después de guardar los datos
-            self.db_connection.eliminar_tabla_sqlite(table_name)
-            print(f"Procesamiento de la hoja {hoja} finalizado")
-
-            return True
-
-        except Exception as e:
-            # En caso de cualquier excepción, registrar el error y devolver un estado de error
-            print(f"Error al procesar la hoja {hoja}: {e}")
-            logging.error(f"Error al procesar la hoja {hoja}: {e}")
-            return {
-                "success": False,
-                "error_message": f"Error al procesar la hoja {hoja}: {e}",
-            }
-
     def procesar_datos2(self):
         """
-        Procesa los datos para todas las hojas especificadas en la configuración, guardándolos en un archivo Excel.
+        Procesa los datos para todas las hojas especificadas en la configuración, guardándolos en un archivo zip.
 
         Este método genera el nombre del archivo, procesa cada hoja especificada en la configuración y guarda los datos
-        en el archivo Excel. Si ocurre un error durante el procesamiento de cualquier hoja, el método termina prematuramente.
+        en el zip. Si ocurre un error durante el procesamiento de cualquier hoja, no se genera el archivo.
 
         Returns:
             dict: Un diccionario indicando el éxito o fracaso del proceso y, en caso de éxito, la ruta y el nombre del archivo generado.
@@ -553,18 +326,23 @@ class InterfacePlano:
 
         print("Procesando datos para iniciar el proceso")
 
-        # Crear un único Zip para guardar todas las hojas
-        with zipfile.ZipFile(self.file_path, "w") as zf:
-            for hoja in self.config["txProcedureCsv2"]:
-                print(f"Procesando hoja {hoja}")
-                # Procesar cada hoja individualmente
-                with zf.open(hoja + ".txt", "w") as buffer:
-                    if not self.procesar_hoja2(hoja, buffer):
-                        # En caso de error en el procesamiento de una hoja, devolver un estado de error
-                        return {
-                            "success": False,
-                            "error_message": f"Error al procesar la hoja {hoja}",
-                        }
+        # Crear un único Zip con un archivo por hoja
+        try:
+            conteos = self.generar_zip(
+                self.config["txProcedureCsv2"],
+                self.generate_sqlout2,
+                sep=",",
+                header=False,
+                float_format="%.0f",
+            )
+        except Exception as e:
+            # En caso de error en el procesamiento de una hoja, devolver un estado de error
+            print(f"Error al generar el plano: {e}")
+            logging.error(f"Error al generar el plano: {e}")
+            return {
+                "success": False,
+                "error_message": f"Error al generar el plano: {e}",
+            }
 
         print("Proceso finalizado")
         # print(self.file_path)
@@ -575,6 +353,7 @@ class InterfacePlano:
             "success": True,
             "file_path": self.file_path,
             "file_name": self.archivo_plano,
+            "registros": conteos,
         }
 
     def evaluar_y_procesar_datos(self):
@@ -0,0 +1,140 @@
+import os
+import time
+import queue
+import logging
+import threading
+
+# Variable de entorno con las filas de cada fragmento leído de Sidis.
+ENV_FILAS_FRAGMENTO = "ADMINBI_TRANSFERENCIA_FILAS"
+FILAS_FRAGMENTO = 50000
+# Fragmentos que pueden esperar en la cola entre la lectura y la escritura. Con
+# el que lee el productor y el que escribe el consumidor, la memoria queda
+# acotada a FRAGMENTOS_EN_COLA + 2 fragmentos sin importar el tamaño del resultado.
+FRAGMENTOS_EN_COLA = 4
+
+# Marca de fin de la lectura.
+_FIN = object()
+
+
+def filas_por_fragmento():
+    try:
+        return max(1, int(os.environ.get(ENV_FILAS_FRAGMENTO, FILAS_FRAGMENTO)))
+    except ValueError:
+        return FILAS_FRAGMENTO
+
+
+class EstadisticasTransferencia:
+    """
+    Filas, bytes y tiempos de una transferencia.
+
+    Attributes:
+        tabla (str): Tabla destino.
+        filas (int): Filas escritas.
+        bytes (int): Tamaño en memoria de los fragmentos escritos.
+        fragmentos (int): Fragmentos escritos.
+        segundos (float): Duración total.
+        espera_lectura (float): Segundos que el escritor esperó fragmentos.
+        espera_escritura (float): Segundos que el lector esperó espacio en la cola.
+    """
+
+    def __init__(self, tabla):
+        self.tabla = tabla
+        self.filas = 0
+        self.bytes = 0
+        self.fragmentos = 0
+        self.segundos = 0.0
+        self.espera_lectura = 0.0
+        self.espera_escritura = 0.0
+
+    def resumen(self):
+        segundos = self.segundos or 1e-9
+        return (
+            f"{self.tabla}: {self.filas} filas en {self.segundos:.1f} s "
+            f"({self.filas / segundos:,.0f} filas/s, {self.bytes / segundos / 1048576:,.1f} MB/s, "
+            f"{self.fragmentos} fragmentos; espera lectura {self.espera_lectura:.1f} s, "
+            f"espera escritura {self.espera_escritura:.1f} s)"
+        )
+
+
+def transferir(fragmentos, escribir, tabla, capacidad=FRAGMENTOS_EN_COLA):
+    """
+    Copia fragmentos de un origen a un destino con lectura y escritura simultáneas.
+
+    El hilo que llama recorre `fragmentos` (el cursor del lado del servidor de
+    Sidis sigue en el hilo que lo abrió) y deja cada fragmento en una cola
+    acotada; un hilo escritor los toma y llama a `escribir`. Si la escritura es
+    más lenta, la lectura se detiene al llenarse la cola; si falla la escritura,
+    la lectura se interrumpe y el error se propaga.
+
+    Args:
+        fragmentos (iterable): DataFrames a transferir, en orden.
+        escribir (callable): (DataFrame, número de fragmento) -> None. Se llama
+            solo con fragmentos con filas, siempre desde el mismo hilo.
+        tabla (str): Nombre de la tabla destino, para las estadísticas.
+        capacidad (int, opcional): Fragmentos que pueden esperar en la cola.
+
+    Returns:
+        EstadisticasTransferencia: Resultado de la transferencia.
+    """
+    estadisticas = EstadisticasTransferencia(tabla)
+    cola = queue.Queue(maxsize=max(1, capacidad))
+    error = []
+    detener = threading.Event()
+
+    def escritor():
+        try:
+            while True:
+                inicio = time.perf_counter()
+                chunk = cola.get()
+                estadisticas.espera_lectura += time.perf_counter() - inicio
+                if chunk is _FIN:
+                    return
+                escribir(chunk, estadisticas.fragmentos)
+                estadisticas.fragmentos += 1
+                estadisticas.filas += len(chunk)
+                estadisticas.bytes += int(chunk.memory_usage(index=False, deep=True).sum())
+        except BaseException as e:
+            error.append(e)
+            detener.set()
+            # Vacía la cola para que el lector no quede bloqueado en put()
+            while True:
+                try:
+                    cola.get_nowait()
+                except queue.Empty:
+                    break
+
+    inicio = time.perf_counter()
+    hilo = threading.Thread(target=escritor, name=f"transferencia-{tabla}", daemon=True)
+    hilo.start()
+    try:
+        for chunk in fragmentos:
+            if detener.is_set():
+                break
+            if chunk is None or chunk.empty:
+                continue
+            espera = time.perf_counter()
+            while not detener.is_set():
+                try:
+                    cola.put(chunk, timeout=1)
+                    break
+                except queue.Full:
+                    continue
+            estadisticas.espera_escritura += time.perf_counter() - espera
+    finally:
+        # Cierra el cursor de origen si la lectura se interrumpió
+        cerrar = getattr(fragmentos, "close", None)
+        if cerrar is not None:
+            cerrar()
+        # Con el escritor detenido por un error la cola pudo quedar llena
+        while hilo.is_alive():
+            try:
+                cola.put(_FIN, timeout=1)
+                break
+            except queue.Full:
+                continue
+        hilo.join()
+    estadisticas.segundos = time.perf_counter() - inicio
+    if error:
+        raise error[0]
+    logging.info(f"Transferencia {estadisticas.resumen()}")
+    return estadisticas
@@ -5,6 +5,7 @@ from distutils.log import error
 from sqlalchemy.sql import text
 from scripts.config import ConfigBasic
 from scripts.StaticPage import StaticPage
+from scripts.bulk_writer import escribir_masivo
 
 # import json
 import sqlalchemy
@@ -72,13 +73,7 @@ class Union_Alpina:
                 try:
                     # Inicia la transacción
                     with connectionin.begin():
-                        resultado_out.to_sql(
-                            name=txTabla,
-                            con=connectionin,
-                            if_exists="append",
-                            index=False,
-                            index_label=None,
-                        )
+                        escribir_masivo(connectionin, resultado_out, txTabla)
 
                     # logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
                     return logging.info("los datos se han insertado correctamente")
@@ -0,0 +1,384 @@
+import os
+import zlib
+import shutil
+import logging
+import zipfile
+import tempfile
+import importlib.util
+
+from scripts.staging import directorio_base
+
+# Formatos de salida de los exportadores. xlsx es el formato del cubo y la
+# interface; zip (archivos .txt) el del plano.
+FORMATO_EXCEL = "xlsx"
+FORMATO_PLANO = "zip"
+FORMATO_PARQUET = "parquet"
+FORMATO_CSV_GZ = "csv.gz"
+FORMATO_CSV_ZST = "csv.zst"
+
+ETIQUETAS = {
+    FORMATO_EXCEL: "Excel (.xlsx)",
+    FORMATO_PLANO: "Planos .txt en zip",
+    FORMATO_PARQUET: "Parquet",
+    FORMATO_CSV_GZ: "CSV comprimido gzip (.csv.gz)",
+    FORMATO_CSV_ZST: "CSV comprimido zstd (.csv.zst)",
+}
+# Formatos columnares o comprimidos, comunes a todos los exportadores.
+FORMATOS_ARCHIVO = (FORMATO_PARQUET, FORMATO_CSV_GZ, FORMATO_CSV_ZST)
+FORMATOS = {
+    "cubo": (FORMATO_EXCEL,) + FORMATOS_ARCHIVO,
+    "interface": (FORMATO_EXCEL,) + FORMATOS_ARCHIVO,
+    "plano": (FORMATO_PLANO,) + FORMATOS_ARCHIVO,
+}
+
+# Nivel de gzip: el 6 de gzip por defecto comprime casi igual que el 9 en una fracción del tiempo.
+NIVEL_GZIP = 6
+# Compresión de las columnas de Parquet.
+COMPRESION_PARQUET = "zstd"
+
+
+def _pyarrow():
+    """
+    Importa pyarrow solo al escribir Parquet o zstd. Retorna None si no está instalado.
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet
+
+        return pyarrow
+    except ImportError:
+        return None
+
+
+def disponible(formato, importar=True):
+    """
+    Indica si el formato se puede escribir en este servidor.
+
+    Args:
+        formato (str): Formato de salida.
+        importar (bool): Con False solo se busca pyarrow en el entorno, sin
+            importarlo ni revisar su códec zstd; es la verificación de las vistas,
+            que no deben cargar pyarrow en cada GET.
+    """
+    if formato in (FORMATO_PARQUET, FORMATO_CSV_ZST):
+        if not importar:
+            return importlib.util.find_spec("pyarrow") is not None
+        pa = _pyarrow()
+        return pa is not None and pa.Codec.is_available("zstd")
+    return formato in ETIQUETAS
+
+
+def opciones(tipo):
+    """
+    Retorna los formatos que se pueden elegir en la página del exportador.
+
+    No importa pyarrow; si al ejecutar el job el formato resulta no disponible,
+    resolver_formato usa el predeterminado del exportador.
+
+    Returns:
+        list: (formato, etiqueta) de los formatos disponibles en este servidor.
+    """
+    return [
+        (formato, ETIQUETAS[formato])
+        for formato in FORMATOS[tipo]
+        if disponible(formato, importar=False)
+    ]
+
+
+def resolver_formato(tipo, solicitado, config):
+    """
+    Elige el formato de salida: el del formulario, si no el de la empresa
+    (txFormatoSalida) y si no el predeterminado del exportador.
+
+    Args:
+        tipo (str): "cubo", "interface" o "plano".
+        solicitado (str): Formato elegido en el formulario (puede ser vacío).
+        config (dict): Configuración del tenant.
+
+    Returns:
+        str: Formato válido para el exportador.
+    """
+    permitidos = FORMATOS[tipo]
+    for formato in (solicitado, config.get("txFormatoSalida")):
+        if not formato:
+            continue
+        formato = str(formato).strip().lower().lstrip(".")
+        if formato in permitidos and disponible(formato):
+            return formato
+        logging.warning(f"Formato de salida {formato} no disponible para {tipo}")
+    return permitidos[0]
+
+
+def extension(formato, hojas):
+    """
+    Retorna la extensión del archivo: la del formato con una sola hoja, .zip con varias.
+    """
+    if formato == FORMATO_EXCEL or (formato in FORMATOS_ARCHIVO and hojas == 1):
+        return f".{formato}"
+    return ".zip"
+
+
+class _Destino:
+    """
+    Archivo de solo escritura sobre una función que recibe bytes, para pyarrow.
+    """
+
+    def __init__(self, escribir):
+        self._escribir = escribir
+        self._posicion = 0
+        self.closed = False
+
+    def write(self, datos):
+        datos = bytes(datos)
+        self._escribir(datos)
+        self._posicion += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self._posicion
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def escribir_parquet(escribir, fragmentos):
+    """
+    Escribe los fragmentos como un archivo Parquet, un row group por fragmento.
+
+    Las columnas de texto se codifican con diccionario (los nombres de producto,
+    cliente o vendedor se repiten en millones de filas) y todas se comprimen con zstd.
+
+    El esquema del archivo debe conocerse antes del primer row group, pero un
+    fragmento no basta para fijarlo: una columna puede llegar entera en el
+    primero y con decimales después, o solo con nulos al inicio. Por eso cada
+    fragmento se guarda primero en Arrow IPC (en el staging del job), se amplía
+    el esquema con _tipo_comun y al final se escriben todos convertidos a él.
+    Las columnas que solo traen nulos se declaran texto.
+
+    Args:
+        escribir (callable): Recibe los bytes del archivo, en orden.
+        fragmentos (iterable): DataFrames con las mismas columnas.
+
+    Returns:
+        int: Número de filas escritas.
+    """
+    pa = _pyarrow()
+    import pyarrow.ipc
+
+    directorio = tempfile.mkdtemp(prefix="parquet_", dir=directorio_base())
+    opciones = pa.ipc.IpcWriteOptions(compression="zstd")
+    try:
+        segmentos, tipos, total = [], {}, 0
+        for chunk in fragmentos:
+            tabla = pa.Table.from_pandas(chunk, preserve_index=False).replace_schema_metadata()
+            for campo in tabla.schema:
+                anterior = tipos.get(campo.name)
+                tipos[campo.name] = (
+                    campo.type if anterior is None else _tipo_comun(pa, anterior, campo.type)
+                )
+            ruta = os.path.join(directorio, f"{len(segmentos):06d}.arrow")
+            with pa.OSFile(ruta, "wb") as destino:
+                with pa.ipc.new_file(destino, tabla.schema, options=opciones) as escritor:
+                    escritor.write_table(tabla)
+            segmentos.append(ruta)
+            total += len(chunk)
+
+        if not segmentos:
+            # Sin filas: un Parquet válido sin columnas
+            pa.parquet.write_table(pa.table({}), _Destino(escribir))
+            return total
+
+        esquema = pa.schema(
+            [
+                pa.field(nombre, pa.string() if pa.types.is_null(tipo) else tipo)
+                for nombre, tipo in tipos.items()
+            ]
+        )
+        textos = [
+            c.name for c in esquema if pa.types.is_string(c.type) or pa.types.is_large_string(c.type)
+        ]
+        with pa.parquet.ParquetWriter(
+            _Destino(escribir),
+            esquema,
+            compression=COMPRESION_PARQUET,
+            use_dictionary=textos or False,
+        ) as escritor:
+            for ruta in segmentos:
+                with pa.memory_map(ruta) as origen:
+                    tabla = pa.ipc.open_file(origen).read_all()
+                escritor.write_table(_ajustar_tabla(pa, tabla, esquema))
+                os.remove(ruta)
+        return total
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def _tipo_comun(pa, a, b):
+    """
+    Tipo que admite sin pérdida los valores de dos fragmentos de una columna.
+
+    Nulo se une con cualquier tipo, enteros con enteros dan int64, enteros y
+    decimales dan float64, fechas con distinta unidad se llevan a la mayor
+    precisión; cualquier otra combinación se escribe como texto.
+    """
+    t = pa.types
+    if a == b:
+        return a
+    if t.is_null(a):
+        return b
+    if t.is_null(b):
+        return a
+    if t.is_integer(a) and t.is_integer(b):
+        return pa.int64()
+    if (t.is_integer(a) or t.is_floating(a)) and (t.is_integer(b) or t.is_floating(b)):
+        return pa.float64()
+    if t.is_timestamp(a) and t.is_timestamp(b) and a.tz == b.tz:
+        unidades = ("s", "ms", "us", "ns")
+        return pa.timestamp(max(a.unit, b.unit, key=unidades.index), tz=a.tz)
+    if (t.is_string(a) or t.is_large_string(a)) and (t.is_string(b) or t.is_large_string(b)):
+        return pa.large_string()
+    return pa.string()
+
+
+def _ajustar_tabla(pa, tabla, esquema):
+    """
+    Convierte las columnas de un fragmento a los tipos del esquema del archivo.
+
+    La conversión es segura: el esquema ya se amplió con _tipo_comun para todos
+    los fragmentos, así que ningún valor se trunca.
+    """
+    import pyarrow.compute as pc
+
+    columnas = []
+    for campo in esquema:
+        columna = tabla.column(campo.name)
+        if columna.type != campo.type:
+            columna = pc.cast(columna, campo.type)
+        columnas.append(columna)
+    return pa.Table.from_arrays(columnas, schema=esquema)
+
+
+def escribir_csv(escribir, fragmentos, compresion=None, sep=",", header=True, float_format=None):
+    """
+    Escribe los fragmentos como CSV en UTF-8, comprimido con gzip o zstd.
+
+    Args:
+        escribir (callable): Recibe los bytes del archivo, en orden.
+        fragmentos (iterable): DataFrames con las mismas columnas.
+        compresion (str, opcional): "gz", "zst" o None para texto plano.
+        sep (str): Separador de columnas.
+        header (bool): Si se escribe el encabezado (solo antes del primer fragmento).
+        float_format (str, opcional): Formato de los números decimales.
+
+    Returns:
+        int: Número de filas escritas.
+    """
+    if compresion == "gz":
+        # wbits 31: flujo deflate con encabezado y cola gzip
+        compresor = zlib.compressobj(NIVEL_GZIP, zlib.DEFLATED, 31)
+        agregar = lambda datos: escribir(compresor.compress(datos))
+        terminar = lambda: escribir(compresor.flush())
+    elif compresion == "zst":
+        pa = _pyarrow()
+        flujo = pa.CompressedOutputStream(pa.PythonFile(_Destino(escribir), mode="w"), "zstd")
+        agregar = flujo.write
+        terminar = flujo.close
+    else:
+        agregar = escribir
+        terminar = lambda: None
+
+    total = 0
+    try:
+        for chunk in fragmentos:
+            agregar(
+                chunk.to_csv(
+                    sep=sep, index=False, header=header, float_format=float_format
+                ).encode("utf-8")
+            )
+            header = False
+            total += len(chunk)
+    finally:
+        terminar()
+    return total
+
+
+def escribir_hoja(formato, escribir, fragmentos, **csv):
+    """
+    Escribe una hoja en uno de los FORMATOS_ARCHIVO (con FORMATO_PLANO, CSV sin comprimir).
+
+    Returns:
+        int: Número de filas escritas.
+    """
+    if formato == FORMATO_PARQUET:
+        return escribir_parquet(escribir, fragmentos)
+    compresion = {FORMATO_CSV_GZ: "gz", FORMATO_CSV_ZST: "zst"}.get(formato)
+    return escribir_csv(escribir, fragmentos, compresion, **csv)
+
+
+class ArchivoPorHoja:
+    """
+    Salida Parquet o CSV comprimido con la misma interfaz de LibroExcel.
+
+    Cada hoja se escribe en su propio archivo (hoja.parquet, hoja.csv.gz...). Con
+    una sola hoja ese archivo es la salida; con varias se empaquetan en un zip sin
+    volver a comprimir, porque cada archivo ya lo está.
+
+    Uso:
+        with abrir_salida(file_path, formato) as salida:
+            filas = salida.escribir_tabla("Ventas", db_connection.stream_query(sql))
+
+    Attributes:
+        ruta (str): Ruta del archivo final.
+        formato (str): Uno de FORMATOS_ARCHIVO.
+        archivos (list): (nombre en el zip, ruta temporal) de cada hoja escrita.
+    """
+
+    def __init__(self, ruta, formato, directorio_temporal=None, **csv):
+        self.ruta = ruta
+        self.formato = formato
+        self.csv = csv
+        self.directorio = tempfile.mkdtemp(prefix="salida_", dir=directorio_temporal)
+        self.archivos = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.cerrar()
+        else:
+            shutil.rmtree(self.directorio, ignore_errors=True)
+        return False
+
+    def escribir_tabla(self, hoja, fragmentos):
+        nombre = f"{hoja}.{self.formato}"
+        ruta = os.path.join(self.directorio, f"{len(self.archivos):05d}.{self.formato}")
+        with open(ruta, "wb") as archivo:
+            total = escribir_hoja(self.formato, archivo.write, fragmentos, **self.csv)
+        self.archivos.append((nombre, ruta))
+        return total
+
+    def cerrar(self):
+        try:
+            if len(self.archivos) == 1:
+                shutil.move(self.archivos[0][1], self.ruta)
+            else:
+                with zipfile.ZipFile(self.ruta, "w", zipfile.ZIP_STORED, allowZip64=True) as zf:
+                    for nombre, ruta in self.archivos:
+                        zf.write(ruta, nombre)
+        finally:
+            shutil.rmtree(self.directorio, ignore_errors=True)
+
+
+def abrir_salida(ruta, formato, directorio_temporal=None, **csv):
+    """
+    Retorna la salida de un exportador para el formato: LibroExcel o ArchivoPorHoja.
+    """
+    if formato == FORMATO_EXCEL:
+        from scripts.excel_writer import LibroExcel
+
+        return LibroExcel(ruta)
+    return ArchivoPorHoja(ruta, formato, directorio_temporal, **csv)
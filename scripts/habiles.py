@@ -246,12 +246,13 @@ class CalendarioLaboral:
 
 
 # Ejemplo de uso
-calendario_con_sabados = CalendarioLaboral(year=2024, incluir_sabados=True)
-calendario_sin_sabados = CalendarioLaboral(year=2024, incluir_sabados=False)
-
-print("Con sábados:")
-dias_habiles_df = calendario_con_sabados.dias_habiles_del_anno_df()
-dias_habiles_df.to_excel("dias_habiles_2024_consabados.xlsx", index=False)
-print("Sin sábados:")
-dias_habiles_df = calendario_con_sabados.dias_habiles_del_anno_df()
-dias_habiles_df.to_excel("dias_habiles_2024_sinsabados.xlsx", index=False)
+if __name__ == "__main__":
+    calendario_con_sabados = CalendarioLaboral(year=2024, incluir_sabados=True)
+    calendario_sin_sabados = CalendarioLaboral(year=2024, incluir_sabados=False)
+
+    print("Con sábados:")
+    dias_habiles_df = calendario_con_sabados.dias_habiles_del_anno_df()
+    dias_habiles_df.to_excel("dias_habiles_2024_consabados.xlsx", index=False)
+    print("Sin sábados:")
+    dias_habiles_df = calendario_con_sabados.dias_habiles_del_anno_df()
+    dias_habiles_df.to_excel("dias_habiles_2024_sinsabados.xlsx", index=False)
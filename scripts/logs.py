@@ -0,0 +1,25 @@
+import logging
+
+
+def configurar_logging(filename="log.txt", nivel_sqlalchemy=None):
+    """
+    Configura el logging raíz del proceso la primera vez que se llama.
+
+    Los procesos lo llaman al construirse en lugar de hacerlo al importar el módulo,
+    de modo que importar los scripts (vistas, encolado de tareas, arranque de
+    workers) no abre archivos de log. El archivo se abre en modo append: cada
+    work-horse de RQ configura el logging en su primer job y no debe borrar lo
+    que escribieron los demás procesos.
+
+    Args:
+        filename (str): Archivo de log.
+        nivel_sqlalchemy (int, opcional): Nivel para el logger sqlalchemy.engine.
+    """
+    logging.basicConfig(
+        filename=filename,
+        level=logging.DEBUG,
+        format="%(asctime)s %(message)s",
+        filemode="a",
+    )
+    if nivel_sqlalchemy is not None:
+        logging.getLogger("sqlalchemy.engine").setLevel(nivel_sqlalchemy)
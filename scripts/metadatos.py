@@ -0,0 +1,104 @@
+import time
+import threading
+import logging
+from sqlalchemy import inspect
+
+# Segundos que se conservan los metadatos de una tabla. Los cambios de esquema
+# en las tablas de BI son poco frecuentes y se hacen fuera de los cargues.
+TTL_METADATOS = 600
+
+
+class MetadatosTabla:
+    """
+    Estructura de una tabla leída con una sola inspección.
+
+    Attributes:
+        claves_primarias (list): Columnas de la clave primaria, en orden.
+        tipos (dict): Nombre de columna -> tipo pandas ("int", "float" o "str").
+        columnas_texto (dict): Columnas char/varchar/text -> "str".
+        longitudes (dict): Columnas de texto con longitud declarada -> longitud máxima.
+    """
+
+    def __init__(self, claves_primarias, columnas):
+        self.claves_primarias = list(claves_primarias)
+        self.tipos = {}
+        self.columnas_texto = {}
+        self.longitudes = {}
+        for columna in columnas:
+            nombre = columna["name"]
+            tipo = str(columna["type"]).lower()
+            # Mapeo de tipos SQL a tipos de Python/Pandas; por defecto se trata como cadena
+            if "int" in tipo:
+                self.tipos[nombre] = "int"
+            elif "float" in tipo or "decimal" in tipo or "double" in tipo:
+                self.tipos[nombre] = "float"
+            else:
+                self.tipos[nombre] = "str"
+            if any(t in tipo for t in ["char", "text", "varchar"]):
+                self.columnas_texto[nombre] = "str"
+                longitud = getattr(columna["type"], "length", None)
+                if longitud:
+                    self.longitudes[nombre] = int(longitud)
+
+
+class CacheMetadatos:
+    """
+    Caché de metadatos de tablas por engine, compartida por los jobs del proceso.
+
+    Attributes:
+        tablas (dict): (url del engine, tabla) -> (expira, MetadatosTabla).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tablas = {}
+
+    def _clave(self, engine, txTabla):
+        return (engine.url.render_as_string(hide_password=True), txTabla)
+
+    def obtener(self, engine, txTabla):
+        """
+        Retorna los metadatos de la tabla, inspeccionándola solo si no están en caché.
+
+        Args:
+            engine (sqlalchemy.engine.base.Engine): Motor de la base de datos de la tabla.
+            txTabla (str): Nombre de la tabla.
+
+        Returns:
+            MetadatosTabla: Metadatos de la tabla (vacíos si no se pudo inspeccionar).
+        """
+        clave = self._clave(engine, txTabla)
+        ahora = time.monotonic()
+        entrada = self.tablas.get(clave)
+        if entrada is not None and entrada[0] > ahora:
+            return entrada[1]
+
+        try:
+            # Un solo Inspector: get_pk_constraint y get_columns comparten su caché interna
+            inspector = inspect(engine)
+            columnas = inspector.get_columns(txTabla)
+            claves_primarias = inspector.get_pk_constraint(txTabla)["constrained_columns"]
+        except Exception as e:
+            # No se guarda en caché para reintentar en la siguiente llamada
+            logging.error(f"No se pudieron obtener los metadatos de {txTabla}: {e}")
+            return MetadatosTabla([], [])
+
+        if not claves_primarias:
+            logging.info(f"La tabla {txTabla} no tiene claves primarias definidas.")
+        metadatos = MetadatosTabla(claves_primarias, columnas)
+        with self._lock:
+            self.tablas[clave] = (ahora + TTL_METADATOS, metadatos)
+        return metadatos
+
+    def invalidar(self, engine=None, txTabla=None):
+        """
+        Descarta los metadatos en caché, todos o los de un engine y/o tabla.
+        """
+        url = engine.url.render_as_string(hide_password=True) if engine is not None else None
+        with self._lock:
+            for clave in list(self.tablas):
+                if (url is None or clave[0] == url) and (txTabla is None or clave[1] == txTabla):
+                    del self.tablas[clave]
+
+
+cache_metadatos = CacheMetadatos()
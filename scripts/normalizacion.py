@@ -0,0 +1,232 @@
+import os
+import re
+import logging
+import unicodedata
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+
+# Caracteres que se conservan al quitar tildes.
+PRESERVADOS = "Ññ@#"
+# Caracteres que se eliminan del texto de los planos.
+ELIMINADOS = "\n\r\"'"
+# Variable de entorno con los procesos para normalizar columnas grandes; con 1
+# (por defecto) todo se hace en el proceso que llama.
+ENV_PROCESOS = "ADMINBI_NORMALIZACION_PROCESOS"
+# Filas mínimas de una columna para repartirla entre procesos: con menos, enviar
+# los datos a otro proceso cuesta más que normalizarlos.
+FILAS_MINIMAS_PARALELO = 200000
+# Variable de entorno que, con 1, repite el mapeo de caracteres en la base de datos
+# después de insertar (por defecto solo se aplica en memoria antes del insert).
+ENV_MAPEO_SERVIDOR = "ADMINBI_MAPEO_SERVIDOR"
+
+
+def _sin_tilde(caracter):
+    """
+    Forma base de un carácter: descomposición NFKD sin marcas combinantes.
+    """
+    if caracter in PRESERVADOS:
+        return caracter
+    return "".join(
+        unicodedata.normalize("NFC", c)
+        for c in unicodedata.normalize("NFKD", caracter)
+        if not unicodedata.combining(c)
+    )
+
+
+@lru_cache(maxsize=None)
+def tabla_acentos():
+    """
+    Tabla de str.translate que quita tildes y diacríticos (conserva PRESERVADOS).
+
+    Se calcula una vez por proceso sobre el plano multilingüe básico; solo guarda
+    los caracteres que cambian.
+    """
+    tabla = {}
+    for codigo in range(0x80, 0x10000):
+        caracter = chr(codigo)
+        base = _sin_tilde(caracter)
+        if base != caracter:
+            tabla[codigo] = base
+    return tabla
+
+
+@lru_cache(maxsize=None)
+def tabla_limpieza(acentos=True):
+    """
+    Tabla de str.translate que en una pasada pasa a mayúsculas, quita tildes
+    (si `acentos`), elimina comillas y saltos de línea y convierte los demás
+    espacios (tabulador, espacio duro...) en espacio simple.
+    """
+    tabla = {ord(c): "" for c in ELIMINADOS}
+    for codigo in range(0x10000):
+        caracter = chr(codigo)
+        if codigo in tabla:
+            continue
+        if caracter.isspace():
+            if caracter != " ":
+                tabla[codigo] = " "
+            continue
+        destino = caracter.upper()
+        if acentos:
+            destino = "".join(_sin_tilde(c) for c in destino)
+        if destino != caracter:
+            tabla[codigo] = destino
+    return tabla
+
+
+def quitar_acentos(texto):
+    return texto.translate(tabla_acentos())
+
+
+def normalizar_texto(serie, acentos=True):
+    """
+    Normaliza una columna de texto de un plano.
+
+    Equivale a eliminar saltos de línea y comillas, reducir espacios a uno, quitar
+    espacios a los extremos, pasar a mayúsculas y quitar tildes conservando Ññ@#,
+    con un translate y dos operaciones de texto por columna en vez de una
+    normalización Unicode por valor.
+
+    Args:
+        serie (Series): Columna a normalizar; los valores se convierten a texto.
+        acentos (bool): Si se quitan las tildes.
+
+    Returns:
+        Series: Columna normalizada.
+    """
+    return (
+        serie.astype(str)
+        .str.translate(tabla_limpieza(acentos))
+        .str.replace(r" {2,}", " ", regex=True)
+        .str.strip()
+    )
+
+
+def procesos_normalizacion():
+    try:
+        return max(1, int(os.environ.get(ENV_PROCESOS, 1)))
+    except ValueError:
+        return 1
+
+
+def _normalizar_fragmento(argumentos):
+    serie, acentos = argumentos
+    return normalizar_texto(serie, acentos)
+
+
+def normalizar_columnas(df, columnas, procesos=None):
+    """
+    Normaliza las columnas de texto de un DataFrame.
+
+    Con ADMINBI_NORMALIZACION_PROCESOS > 1, las columnas de más de
+    FILAS_MINIMAS_PARALELO filas se parten en fragmentos que se normalizan en
+    procesos separados (las operaciones de texto de pandas no liberan el GIL).
+
+    Args:
+        df (DataFrame): DataFrame a limpiar; se modifica y se retorna.
+        columnas (dict | iterable): Columnas a normalizar. Con un dict, se quitan
+            las tildes solo en las de tipo "str".
+        procesos (int, opcional): Procesos a usar; por defecto procesos_normalizacion().
+
+    Returns:
+        DataFrame: El mismo DataFrame con las columnas normalizadas.
+    """
+    if isinstance(columnas, dict):
+        objetivos = [(c, tipo == "str") for c, tipo in columnas.items() if c in df]
+    else:
+        objetivos = [(c, True) for c in columnas if c in df]
+    procesos = procesos or procesos_normalizacion()
+
+    if procesos <= 1 or len(df) < FILAS_MINIMAS_PARALELO:
+        for columna, acentos in objetivos:
+            df[columna] = normalizar_texto(df[columna], acentos)
+        return df
+
+    import pandas as pd
+
+    tamano = -(-len(df) // procesos)
+    try:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            for columna, acentos in objetivos:
+                serie = df[columna]
+                fragmentos = [
+                    (serie.iloc[i : i + tamano], acentos) for i in range(0, len(serie), tamano)
+                ]
+                partes = list(pool.map(_normalizar_fragmento, fragmentos))
+                df[columna] = pd.concat(partes)
+    except Exception as e:
+        logging.warning(f"No se pudo normalizar en paralelo ({e}); se continúa en este proceso")
+        for columna, acentos in objetivos:
+            df[columna] = normalizar_texto(df[columna], acentos)
+    return df
+
+
+def mapeo_en_servidor():
+    return os.environ.get(ENV_MAPEO_SERVIDOR, "0").strip().lower() in ("1", "true", "si", "sí")
+
+
+class MapeoCaracteres:
+    """
+    Reemplazos de la tabla mapeocaracteres compilados una vez por job.
+
+    Si todos los originales son de un carácter se aplican con un str.translate;
+    si no, con una sola expresión regular que prueba primero los más largos. Los
+    reemplazos son simultáneos: el resultado de uno no vuelve a reemplazarse.
+
+    Attributes:
+        mapeo (dict): Carácter (o texto) original -> reemplazo.
+    """
+
+    def __init__(self, mapeo):
+        self.mapeo = {original: reemplazo or "" for original, reemplazo in mapeo.items() if original}
+        self._tabla = None
+        self._patron = None
+        if all(len(original) == 1 for original in self.mapeo):
+            self._tabla = str.maketrans(self.mapeo)
+        else:
+            self._patron = re.compile(
+                "|".join(re.escape(o) for o in sorted(self.mapeo, key=len, reverse=True))
+            )
+
+    def __bool__(self):
+        return bool(self.mapeo)
+
+    def _reemplazo(self, coincidencia):
+        return self.mapeo[coincidencia.group(0)]
+
+    def aplicar(self, serie):
+        """
+        Aplica los reemplazos a una columna de texto (los nulos se conservan).
+        """
+        texto = serie.astype(str)
+        if self._tabla is not None:
+            texto = texto.str.translate(self._tabla)
+        else:
+            texto = texto.str.replace(self._patron, self._reemplazo, regex=True)
+        return texto.where(serie.notna(), serie)
+
+    def aplicar_columnas(self, df, columnas):
+        """
+        Aplica los reemplazos a las columnas indicadas que existan en el DataFrame.
+
+        Returns:
+            DataFrame: El mismo DataFrame, modificado.
+        """
+        if self:
+            for columna in columnas:
+                if columna in df:
+                    df[columna] = self.aplicar(df[columna])
+        return df
+
+    def expresion_sql(self, columna, parametros):
+        """
+        Expresión SQL con los REPLACE anidados sobre una columna ya escapada.
+
+        Los valores se agregan a `parametros` como parámetros con nombre m<i>o / m<i>r.
+        """
+        expresion = columna
+        for i, (original, reemplazo) in enumerate(self.mapeo.items()):
+            parametros[f"m{i}o"] = original
+            parametros[f"m{i}r"] = reemplazo
+            expresion = f"REPLACE({expresion}, :m{i}o, :m{i}r)"
+        return expresion
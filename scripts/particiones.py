@@ -0,0 +1,269 @@
+import os
+import re
+import time
+import hashlib
+import datetime
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from scripts.cache_artefactos import cache_artefactos, PARTICIONES
+from scripts.ejecucion_hojas import hojas_concurrentes, limite_servidor
+
+# Variable de entorno con los días que se conserva una partición sin leerse.
+ENV_DIAS_PARTICIONES = "ADMINBI_PARTICIONES_DIAS"
+DIAS_PARTICIONES = 30
+# Variable de entorno con los días recientes (hoy incluido) que se consideran
+# abiertos: Sidis todavía los modifica y las extracciones incrementales o
+# nocturnas los reescriben, así que siempre se extraen y nunca se guardan.
+ENV_DIAS_ABIERTOS = "ADMINBI_PARTICIONES_DIAS_ABIERTOS"
+DIAS_ABIERTOS = 3
+
+
+def _pyarrow():
+    """
+    Importa pyarrow al escribir o leer particiones. Retorna None si no está instalado.
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet
+
+        return pyarrow
+    except ImportError:
+        return None
+
+
+def disponible():
+    return _pyarrow() is not None
+
+
+def dias_rango(IdtReporteIni, IdtReporteFin):
+    """
+    Retorna los días del rango, ambos extremos incluidos.
+
+    Args:
+        IdtReporteIni (str | datetime.date): Fecha inicial (YYYY-MM-DD).
+        IdtReporteFin (str | datetime.date): Fecha final (YYYY-MM-DD).
+
+    Returns:
+        list: datetime.date de cada día, en orden.
+    """
+    inicio = datetime.date.fromisoformat(str(IdtReporteIni)[:10])
+    fin = datetime.date.fromisoformat(str(IdtReporteFin)[:10])
+    return [inicio + datetime.timedelta(days=i) for i in range((fin - inicio).days + 1)]
+
+
+def primer_dia_abierto(hoy=None):
+    """
+    Retorna el primer día que no se guarda en particiones (ver ENV_DIAS_ABIERTOS).
+    """
+    try:
+        dias = max(1, int(os.environ.get(ENV_DIAS_ABIERTOS, DIAS_ABIERTOS)))
+    except ValueError:
+        dias = DIAS_ABIERTOS
+    return (hoy or datetime.date.today()) - datetime.timedelta(days=dias - 1)
+
+
+def _nombre_seguro(valor):
+    return re.sub(r"[^\w.-]", "_", str(valor))
+
+
+def _fecha(valor):
+    return None if valor is None else datetime.date.fromisoformat(str(valor)[:10])
+
+
+class ParticionesDiarias:
+    """
+    Resultado por día de los procedimientos de las hojas de un tenant, en Parquet.
+
+    Para armar un rango se ejecuta el procedimiento solo para los días que no
+    tienen partición vigente (un CALL por día, con el mismo día como fecha inicial
+    y final) y el resto se lee del disco. Las particiones viven en la carpeta del
+    tenant de la caché de artefactos:
+
+        media/cache/<tenant>/particiones/<firma>/<hoja>/<YYYY-MM-DD>.<marca>.parquet
+
+    donde la firma identifica la base de BI y el procedimiento, y la marca es la
+    marca de agua del tenant (cache_artefactos.marca_agua) al iniciar la
+    extracción del día. Una partición deja de estar vigente cuando
+    powerbi_adm.conf_cambio_datos tiene un cambio posterior a su marca que cubre
+    ese día (o sin rango), así que también la invalidan las cargas registradas
+    desde otro equipo (main.py). Si la marca es anterior al cambio más antiguo
+    que se conserva no se sabe qué cambió y tampoco está vigente. Las particiones
+    que no están vigentes se eliminan al encontrarlas. Los días desde
+    primer_dia_abierto() no se guardan: se extraen en cada solicitud.
+
+    Solo es correcto para procedimientos cuyo resultado de un rango es la unión de
+    los resultados de cada día (filas con fecha, sin acumulados del rango); por eso
+    se activa por empresa con nbCuboIncremental.
+
+    Attributes:
+        db_connection (DataBaseConnection): Conexiones del tenant.
+        carpeta (str): Carpeta de las particiones del procedimiento.
+        marca_agua (int): Marca de agua del tenant al iniciar, o None si no se pudo
+            consultar; en ese caso todos los días se extraen y nada se guarda.
+        cambios (list): (id, IdtReporteIni, IdtReporteFin) de conf_cambio_datos.
+    """
+
+    def __init__(self, db_connection, tenant, firma, max_hilos=None):
+        self.db_connection = db_connection
+        self.tenant = tenant
+        self.carpeta = os.path.join(
+            cache_artefactos.directorio,
+            os.path.basename(str(tenant)),
+            PARTICIONES,
+            hashlib.sha256(repr(firma).encode("utf-8")).hexdigest()[:16],
+        )
+        self.max_hilos = max_hilos or hojas_concurrentes()
+        self.limite = limite_servidor(db_connection.config)
+        self.primer_dia_abierto = primer_dia_abierto()
+        # (hoja, día) -> ruta de la partición vigente encontrada por faltantes()
+        self._vigentes = {}
+        marca = cache_artefactos.marca_agua(tenant)
+        self.marca_agua = None if marca is None else int(marca or 0)
+        self.cambios = []
+        if self.marca_agua is not None:
+            try:
+                self.cambios = [
+                    (int(id_cambio), _fecha(inicio), _fecha(fin))
+                    for id_cambio, inicio, fin in cache_artefactos.cambios(tenant)
+                ]
+            except Exception as e:
+                logging.warning(f"No se pudieron consultar los cambios de {tenant}: {e}")
+                self.marca_agua = None
+        if self.marca_agua is None:
+            logging.warning(f"Particiones de {tenant} desactivadas: sin marca de agua")
+
+    def _ruta(self, hoja, dia, marca):
+        return os.path.join(self.carpeta, _nombre_seguro(hoja), f"{dia.isoformat()}.{marca}.parquet")
+
+    def vigente(self, dia, marca):
+        """
+        Indica si una partición del día escrita con la marca `marca` sigue vigente.
+        """
+        if self.marca_agua is None or dia >= self.primer_dia_abierto:
+            return False
+        if self.cambios and marca < self.cambios[0][0]:
+            return False
+        return not any(
+            id_cambio > marca and (inicio is None or fin is None or inicio <= dia <= fin)
+            for id_cambio, inicio, fin in self.cambios
+        )
+
+    def faltantes(self, hoja, dias):
+        """
+        Retorna los días sin partición vigente y elimina las particiones vencidas de la hoja.
+        """
+        carpeta = os.path.join(self.carpeta, _nombre_seguro(hoja))
+        try:
+            archivos = os.listdir(carpeta)
+        except OSError:
+            archivos = []
+        pedidos = set(dias)
+        for archivo in archivos:
+            partes = archivo.split(".")
+            try:
+                dia, marca = datetime.date.fromisoformat(partes[0]), int(partes[1])
+                valida = len(partes) == 3 and partes[2] == "parquet" and self.vigente(dia, marca)
+            except (ValueError, IndexError):
+                valida = False
+            if not valida:
+                if not archivo.endswith(".tmp"):
+                    try:
+                        os.remove(os.path.join(carpeta, archivo))
+                    except OSError:
+                        pass
+                continue
+            if dia in pedidos:
+                self._vigentes[(hoja, dia)] = os.path.join(carpeta, archivo)
+        return [dia for dia in dias if (hoja, dia) not in self._vigentes]
+
+    def _extraer_dia(self, hoja, dia, generar_sql):
+        import pandas as pd
+
+        pa = _pyarrow()
+        with self.limite:
+            fragmentos = list(self.db_connection.stream_query(generar_sql(hoja, dia, dia)))
+        df = pd.concat(fragmentos, ignore_index=True) if fragmentos else pd.DataFrame()
+        if self.marca_agua is None or dia >= self.primer_dia_abierto:
+            return df
+
+        # Con la marca del inicio: un cambio registrado durante la extracción la invalida
+        ruta = self._ruta(hoja, dia, self.marca_agua)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        pa.parquet.write_table(pa.Table.from_pandas(df, preserve_index=False), temporal)
+        os.replace(temporal, ruta)
+        return df
+
+    def completar(self, hoja, dias, generar_sql):
+        """
+        Ejecuta el procedimiento para los días sin partición vigente, en paralelo.
+
+        Args:
+            hoja (str): Hoja configurada.
+            dias (list): Días del rango solicitado.
+            generar_sql (callable): (hoja, IdtReporteIni, IdtReporteFin) -> consulta.
+
+        Returns:
+            dict: Día -> DataFrame de los días extraídos en esta llamada.
+        """
+        faltantes = self.faltantes(hoja, dias)
+        logging.info(
+            f"Hoja {hoja}: {len(dias) - len(faltantes)} días en particiones, {len(faltantes)} por extraer"
+        )
+        if not faltantes:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.max_hilos, len(faltantes))) as pool:
+            futuros = {
+                dia: pool.submit(self._extraer_dia, hoja, dia, generar_sql) for dia in faltantes
+            }
+            return {dia: futuro.result() for dia, futuro in futuros.items()}
+
+    def leer(self, hoja, dias, generar_sql):
+        """
+        Entrega, en orden de días, los fragmentos de la hoja para el rango.
+
+        Una partición que desaparece entre faltantes() y la lectura (la eliminó
+        limpiar() u otro proceso) se reemplaza extrayendo ese día.
+
+        Args:
+            hoja (str): Hoja configurada.
+            dias (list): Días del rango solicitado.
+            generar_sql (callable): (hoja, IdtReporteIni, IdtReporteFin) -> consulta.
+
+        Yields:
+            DataFrame: Filas de cada día que tiene resultados.
+        """
+        pa = _pyarrow()
+        extraidos = self.completar(hoja, dias, generar_sql)
+        for dia in dias:
+            df = extraidos.get(dia)
+            if df is None:
+                ruta = self._vigentes.pop((hoja, dia))
+                try:
+                    df = pa.parquet.read_table(ruta).to_pandas()
+                    os.utime(ruta)  # la antigüedad de una partición se cuenta desde su último uso
+                except FileNotFoundError:
+                    logging.info(f"La partición {hoja} {dia} ya no existe; se extrae el día")
+                    df = self._extraer_dia(hoja, dia, generar_sql)
+            if len(df):
+                yield df
+
+    def limpiar(self, dias=None):
+        """
+        Elimina las particiones del procedimiento que no se leen hace más de `dias` días.
+        """
+        if dias is None:
+            try:
+                dias = int(os.environ.get(ENV_DIAS_PARTICIONES, DIAS_PARTICIONES))
+            except ValueError:
+                dias = DIAS_PARTICIONES
+        limite = time.time() - dias * 86400
+        for raiz, _, archivos in os.walk(self.carpeta):
+            for archivo in archivos:
+                ruta = os.path.join(raiz, archivo)
+                try:
+                    if os.path.getmtime(ruta) < limite:
+                        os.remove(ruta)
+                except OSError:
+                    continue
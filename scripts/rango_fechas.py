@@ -0,0 +1,167 @@
+import os
+import datetime
+import threading
+import logging
+from functools import lru_cache
+from sqlalchemy import text
+
+# Variable de entorno con los nmDt que se calculan en Python en lugar de ejecutar
+# las consultas de conf_dt, separados por coma (por ejemplo "puente1dia,mesactual").
+# Por defecto ninguno: las consultas de conf_dt siguen siendo la fuente de verdad y
+# cada preset debe habilitarse después de verificar que coincide con su consulta.
+ENV_PRESETS = "ADMINBI_RANGOS_NATIVOS"
+
+
+@lru_cache(maxsize=None)
+def calendario(year, incluir_sabados=True):
+    """
+    Retorna el CalendarioLaboral del año, creado una sola vez por proceso.
+
+    Se importa aquí para no fijar la localidad (locale.setlocale) al importar el módulo.
+    """
+    from scripts.habiles import CalendarioLaboral
+
+    return CalendarioLaboral(year=year, incluir_sabados=incluir_sabados)
+
+
+def dia_habil_anterior(fecha):
+    """
+    Retorna el día hábil (incluyendo sábados) inmediatamente anterior a la fecha.
+    """
+    dia = fecha - datetime.timedelta(days=1)
+    while not calendario(dia.year).es_dia_habil(dia):
+        dia -= datetime.timedelta(days=1)
+    return dia
+
+
+def _puente1dia(hoy):
+    # Desde el último día hábil hasta hoy
+    return dia_habil_anterior(hoy), hoy
+
+
+def _puentemes(hoy):
+    # Desde el inicio del mes del último día hábil: el primer día hábil del mes
+    # todavía cubre el cierre del mes anterior
+    return dia_habil_anterior(hoy).replace(day=1), hoy
+
+
+def _mesactual(hoy):
+    return hoy.replace(day=1), hoy
+
+
+def _mesanterior(hoy):
+    fin = hoy.replace(day=1) - datetime.timedelta(days=1)
+    return fin.replace(day=1), fin
+
+
+def _hoy(hoy):
+    return hoy, hoy
+
+
+PRESETS = {
+    "puente1dia": _puente1dia,
+    "puentemes": _puentemes,
+    "mesactual": _mesactual,
+    "mesanterior": _mesanterior,
+    "hoy": _hoy,
+}
+
+
+class ResolvedorRangoFechas:
+    """
+    Calcula IdtReporteIni e IdtReporteFin a partir de las consultas de conf_dt.
+
+    Las consultas txDtIni y txDtFin dependen solo de la fecha del día, así que el
+    resultado se memoriza por (nmDt, consultas, día): la primera llamada del día
+    ejecuta una sola sentencia contra MySQL y las siguientes no tocan la base de datos.
+    Los presets de PRESETS habilitados en ADMINBI_RANGOS_NATIVOS se calculan en
+    Python con el calendario de días hábiles de scripts/habiles.py.
+
+    Attributes:
+        memoria (dict): Rangos calculados, (nmDt, txDtIni, txDtFin, día) -> dict.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.memoria = {}
+
+    def presets_habilitados(self):
+        valor = os.environ.get(ENV_PRESETS, "")
+        return {nombre.strip() for nombre in valor.split(",") if nombre.strip()}
+
+    def resolver(self, nmDt, txDtIni, txDtFin, engine, hoy=None):
+        """
+        Retorna el rango de fechas del día para un nmDt.
+
+        Args:
+            nmDt (str): Nombre del rango en conf_dt.
+            txDtIni (str): Consulta que retorna la columna IdtReporteIni.
+            txDtFin (str): Consulta que retorna la columna IdtReporteFin.
+            engine (sqlalchemy.engine.base.Engine): Motor de la base de configuración.
+            hoy (datetime.date, opcional): Fecha de referencia, por defecto la actual.
+
+        Returns:
+            dict: IdtReporteIni e IdtReporteFin, o vacío si no se pudieron calcular.
+        """
+        hoy = hoy or datetime.date.today()
+
+        if nmDt in PRESETS and nmDt in self.presets_habilitados():
+            ini, fin = PRESETS[nmDt](hoy)
+            return {"IdtReporteIni": str(ini), "IdtReporteFin": str(fin)}
+
+        clave = (nmDt, str(txDtIni), str(txDtFin), hoy)
+        rango = self.memoria.get(clave)
+        if rango is not None:
+            return dict(rango)
+
+        rango = self.ejecutar(engine, txDtIni, txDtFin)
+        if rango:
+            with self._lock:
+                # Los rangos de días anteriores ya no se vuelven a pedir
+                for vieja in [c for c in self.memoria if c[3] != hoy]:
+                    del self.memoria[vieja]
+                self.memoria[clave] = rango
+        return dict(rango)
+
+    def ejecutar(self, engine, txDtIni, txDtFin):
+        """
+        Ejecuta las consultas de fecha inicial y final en una sola sentencia y, si
+        no se pueden combinar, una después de la otra.
+        """
+        ini = str(txDtIni).strip().rstrip(";")
+        fin = str(txDtFin).strip().rstrip(";")
+        try:
+            with engine.connect() as connection:
+                try:
+                    fila = (
+                        connection.execute(
+                            text(
+                                f"SELECT ini.IdtReporteIni, fin.IdtReporteFin "
+                                f"FROM ({ini}) ini CROSS JOIN ({fin}) fin"
+                            )
+                        )
+                        .mappings()
+                        .first()
+                    )
+                except Exception as e:
+                    logging.info(f"Rango de fechas en dos consultas: {e}")
+                    connection.rollback()
+                    fila_ini = connection.execute(text(ini)).mappings().first()
+                    fila_fin = connection.execute(text(fin)).mappings().first()
+                    fila = (
+                        {**fila_ini, **fila_fin}
+                        if fila_ini is not None and fila_fin is not None
+                        else None
+                    )
+        except Exception as e:
+            logging.error(f"Error al calcular el rango de fechas: {e}")
+            return {}
+        if fila is None:
+            return {}
+        return {
+            "IdtReporteIni": str(fila["IdtReporteIni"]),
+            "IdtReporteFin": str(fila["IdtReporteFin"]),
+        }
+
+
+resolvedor_fechas = ResolvedorRangoFechas()
@@ -0,0 +1,92 @@
+import os
+import json
+import threading
+
+try:
+    from django.core.exceptions import ImproperlyConfigured
+except ImportError:  # main.py y los scripts empaquetados se ejecutan sin Django
+
+    class ImproperlyConfigured(Exception):
+        pass
+
+
+# Prefijo de las variables de entorno que reemplazan valores de secret.json,
+# por ejemplo ADMINBI_DB_PASS reemplaza a "DB_PASS".
+PREFIJO_ENTORNO = "ADMINBI_"
+
+
+class SecretoNoEncontrado(ImproperlyConfigured, ValueError):
+    """
+    Error al resolver un secreto.
+
+    Hereda de ImproperlyConfigured y de ValueError porque las copias anteriores de
+    get_secret lanzaban una u otra según el módulo, y así ambos manejos siguen funcionando.
+    """
+
+
+class AlmacenSecretos:
+    """
+    Lectura de secret.json con caché en memoria.
+
+    El archivo se lee y se decodifica una sola vez por ruta; en cada consulta solo
+    se revisa su fecha de modificación y se vuelve a cargar si cambió. Las variables
+    de entorno con PREFIJO_ENTORNO tienen prioridad sobre el archivo.
+
+    Attributes:
+        archivos (dict): Ruta absoluta -> (mtime, secretos decodificados).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.archivos = {}
+
+    def _cargar(self, secrets_file):
+        ruta = os.path.abspath(secrets_file)
+        try:
+            mtime = os.stat(ruta).st_mtime_ns
+        except FileNotFoundError:
+            raise SecretoNoEncontrado(
+                f"No se encontró el archivo de configuración {secrets_file}"
+            )
+
+        entrada = self.archivos.get(ruta)
+        if entrada is not None and entrada[0] == mtime:
+            return entrada[1]
+
+        with self._lock:
+            entrada = self.archivos.get(ruta)
+            if entrada is None or entrada[0] != mtime:
+                with open(ruta) as f:
+                    entrada = (mtime, json.loads(f.read()))
+                self.archivos[ruta] = entrada
+        return entrada[1]
+
+    def obtener(self, secret_name, secrets_file="secret.json"):
+        """
+        Retorna el valor de un secreto.
+
+        Args:
+            secret_name (str): Clave del secreto en secret.json.
+            secrets_file (str): Ruta del archivo de secretos.
+
+        Returns:
+            El valor de la variable de entorno ADMINBI_<secret_name> si existe,
+            si no el valor del archivo.
+
+        Raises:
+            SecretoNoEncontrado: Si la clave o el archivo no existen.
+        """
+        valor = os.environ.get(f"{PREFIJO_ENTORNO}{secret_name}")
+        if valor is not None:
+            return valor
+        try:
+            return self._cargar(secrets_file)[secret_name]
+        except KeyError:
+            raise SecretoNoEncontrado(f"La variable {secret_name} no existe")
+
+
+almacen_secretos = AlmacenSecretos()
+
+
+def get_secret(secret_name, secrets_file="secret.json"):
+    return almacen_secretos.obtener(secret_name, secrets_file)
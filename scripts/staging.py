@@ -0,0 +1,233 @@
+import os
+import re
+import time
+import shutil
+import logging
+import tempfile
+import threading
+
+# Variable de entorno con el directorio donde se crean las carpetas de staging;
+# por defecto el directorio temporal del sistema.
+ENV_DIRECTORIO = "ADMINBI_STAGING_DIR"
+# Prefijo de las carpetas de staging de cada job.
+PREFIJO = "adminbi_staging_"
+# Segundos tras los cuales una carpeta de staging se considera huérfana (un job
+# terminado por el timeout de RQ o un worker reiniciado no alcanza a limpiarla).
+# Es mayor que el timeout de los jobs (3600 s).
+EDAD_HUERFANOS = 6 * 3600
+
+
+def _pyarrow():
+    """
+    Importa pyarrow al escribir o leer un segmento y no al importar el módulo.
+    Retorna None si no está instalado.
+    """
+    try:
+        import pyarrow
+        import pyarrow.feather
+
+        return pyarrow
+    except ImportError:
+        return None
+
+
+def directorio_base():
+    return os.environ.get(ENV_DIRECTORIO) or tempfile.gettempdir()
+
+
+def limpiar_huerfanos(base=None, edad=EDAD_HUERFANOS):
+    """
+    Elimina las carpetas de staging de jobs anteriores que no se limpiaron.
+
+    Args:
+        base (str, opcional): Directorio donde buscar; por defecto directorio_base().
+        edad (int, opcional): Antigüedad mínima en segundos para eliminar una carpeta.
+    """
+    base = base or directorio_base()
+    limite = time.time() - edad
+    try:
+        entradas = list(os.scandir(base))
+    except OSError:
+        return
+    for entrada in entradas:
+        try:
+            if (
+                entrada.name.startswith(PREFIJO)
+                and entrada.is_dir()
+                and entrada.stat().st_mtime < limite
+            ):
+                shutil.rmtree(entrada.path, ignore_errors=True)
+                logging.info(f"Staging huérfano eliminado: {entrada.path}")
+        except OSError:
+            continue
+
+
+class TablaStaging:
+    """
+    Resultado de una consulta guardado en disco por segmentos.
+
+    Cada fragmento leído de MySQL se escribe como un archivo independiente, así
+    que fragmentos con tipos distintos (por ejemplo una columna que solo trae
+    nulos en el primero) no necesitan un esquema común.
+
+    Attributes:
+        nombre (str): Nombre lógico de la tabla (por ejemplo la hoja del cubo).
+        segmentos (list): (ruta, formato, filas) de cada fragmento, en orden.
+        columnas (list): Columnas del primer fragmento.
+        filas (int): Total de filas recibidas.
+    """
+
+    def __init__(self, nombre, directorio):
+        self.nombre = nombre
+        self.directorio = directorio
+        self.segmentos = []
+        self.columnas = []
+        self.filas = 0
+
+    def agregar(self, chunk):
+        """
+        Escribe un fragmento como un segmento nuevo.
+
+        Se usa Arrow IPC (feather, comprimido con lz4) cuando pyarrow está
+        disponible y acepta las columnas; si no, el fragmento se guarda con pickle.
+        """
+        if not self.segmentos:
+            self.columnas = list(chunk.columns)
+        ruta = os.path.join(self.directorio, f"{len(self.segmentos):06d}")
+        pa = _pyarrow()
+        formato = None
+        if pa is not None:
+            try:
+                tabla = pa.Table.from_pandas(chunk, preserve_index=False)
+                pa.feather.write_feather(tabla, ruta + ".arrow", compression="lz4")
+                ruta, formato = ruta + ".arrow", "arrow"
+            except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+                # Columnas object con tipos mezclados: este segmento va en pickle
+                logging.info(f"Segmento de {self.nombre} guardado con pickle: {e}")
+        if formato is None:
+            ruta, formato = ruta + ".pkl", "pickle"
+            chunk.to_pickle(ruta)
+        self.segmentos.append((ruta, formato, len(chunk)))
+        self.filas += len(chunk)
+
+    def leer(self):
+        """
+        Lee los segmentos en el orden en que se escribieron.
+
+        Yields:
+            DataFrame: Un fragmento por segmento.
+        """
+        import pandas as pd
+
+        for ruta, formato, _ in self.segmentos:
+            if formato == "arrow":
+                yield _pyarrow().feather.read_table(ruta, memory_map=True).to_pandas()
+            else:
+                yield pd.read_pickle(ruta)
+
+    def eliminar(self):
+        shutil.rmtree(self.directorio, ignore_errors=True)
+        self.segmentos = []
+        self.filas = 0
+
+
+class StagingJob:
+    """
+    Área de trabajo en disco de un job, en reemplazo del SQLite compartido mydata.db.
+
+    Cada job (un cubo, una interface, un plano) tiene su propia carpeta temporal,
+    de modo que los jobs concurrentes de distintos tenants no comparten archivos
+    ni bloqueos. Los resultados se guardan tal como llegan del servidor, el conteo
+    de filas se lleva mientras se escriben y la carpeta se elimina al terminar.
+
+    Uso:
+        with StagingJob(f"cubo_{database_name}") as staging:
+            total = staging.cargar(hoja, db_connection.stream_query(sql))
+            for chunk in staging.leer(hoja):
+                ...
+
+    Attributes:
+        directorio (str): Carpeta del job, creada al primer uso.
+        tablas (dict): Nombre -> TablaStaging.
+    """
+
+    def __init__(self, nombre_job, base=None):
+        self.nombre_job = re.sub(r"[^\w\-]", "_", str(nombre_job))
+        self.base = base
+        self.directorio = None
+        self.tablas = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.limpiar()
+        return False
+
+    def _directorio(self):
+        if self.directorio is None:
+            base = self.base or directorio_base()
+            limpiar_huerfanos(base)
+            self.directorio = tempfile.mkdtemp(prefix=f"{PREFIJO}{self.nombre_job}_", dir=base)
+        return self.directorio
+
+    def crear(self, nombre):
+        """
+        Crea (o reemplaza) una tabla vacía.
+
+        Args:
+            nombre (str): Nombre lógico de la tabla.
+
+        Returns:
+            TablaStaging: Tabla lista para recibir fragmentos.
+        """
+        with self._lock:
+            anterior = self.tablas.pop(nombre, None)
+            if anterior is not None:
+                anterior.eliminar()
+            directorio = tempfile.mkdtemp(prefix="t", dir=self._directorio())
+            tabla = TablaStaging(nombre, directorio)
+            self.tablas[nombre] = tabla
+        return tabla
+
+    def cargar(self, nombre, fragmentos):
+        """
+        Guarda en una tabla todos los fragmentos de un iterador.
+
+        Args:
+            nombre (str): Nombre lógico de la tabla.
+            fragmentos (iterable): DataFrames, por ejemplo los de DataBaseConnection.stream_query.
+
+        Returns:
+            int: Número total de filas guardadas.
+        """
+        tabla = self.crear(nombre)
+        for chunk in fragmentos:
+            tabla.agregar(chunk)
+        return tabla.filas
+
+    def filas(self, nombre):
+        return self.tablas[nombre].filas
+
+    def columnas(self, nombre):
+        return list(self.tablas[nombre].columnas)
+
+    def leer(self, nombre):
+        return self.tablas[nombre].leer()
+
+    def eliminar(self, nombre):
+        with self._lock:
+            tabla = self.tablas.pop(nombre, None)
+        if tabla is not None:
+            tabla.eliminar()
+
+    def limpiar(self):
+        """
+        Elimina la carpeta del job con todos sus segmentos.
+        """
+        with self._lock:
+            self.tablas = {}
+            directorio, self.directorio = self.directorio, None
+        if directorio is not None:
+            shutil.rmtree(directorio, ignore_errors=True)
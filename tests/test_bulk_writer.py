@@ -0,0 +1,73 @@
+import io
+import datetime
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from scripts.bulk_writer import NULO, escribir_tsv
+
+
+def _leer_tsv(contenido):
+    # Lee el TSV como LOAD DATA con FIELDS ESCAPED BY '\\' (sin ENCLOSED BY)
+    escapes = {"t": "\t", "n": "\n", "r": "\r", "0": "\0", "\\": "\\"}
+    filas = []
+    for linea in contenido.decode("utf-8").split("\n")[:-1]:
+        fila = []
+        for campo in linea.split("\t"):
+            if campo == NULO:
+                fila.append(None)
+                continue
+            valor, i = [], 0
+            while i < len(campo):
+                if campo[i] == "\\":
+                    valor.append(escapes[campo[i + 1]])
+                    i += 2
+                else:
+                    valor.append(campo[i])
+                    i += 1
+            fila.append("".join(valor))
+        filas.append(fila)
+    return filas
+
+
+class EscribirTsvTests(unittest.TestCase):
+    def _escribir(self, df):
+        archivo = io.BytesIO()
+        escribir_tsv(archivo, df)
+        return archivo.getvalue()
+
+    def test_escapes(self):
+        textos = ["con\ttab", "línea\nnueva", "retorno\r", "barra \\ final\\", "nulo\0byte", "ñandú €"]
+        contenido = self._escribir(pd.DataFrame({"texto": textos}))
+        # Un campo por línea: tabuladores y saltos quedan escapados
+        self.assertEqual(contenido.count(b"\n"), len(textos))
+        self.assertNotIn(b"\t", contenido)
+        self.assertEqual([fila[0] for fila in _leer_tsv(contenido)], textos)
+
+    def test_nulos(self):
+        df = pd.DataFrame(
+            {
+                "texto": ["a", None, "\\N"],
+                "entero": pd.array([1, None, 3], dtype="Int64"),
+                "real": [1.5, np.nan, 0.0],
+                "fecha": pd.to_datetime(["2024-01-02 03:04:05", None, "2024-12-31 00:00:00"]),
+            }
+        )
+        filas = _leer_tsv(self._escribir(df))
+        self.assertEqual(filas[1], [None, None, None, None])
+        # El texto "\N" se escapa y no se confunde con NULL
+        self.assertEqual(filas[2][0], "\\N")
+        self.assertEqual(filas[0], ["a", "1", "1.5", "2024-01-02 03:04:05.000000"])
+
+    def test_tipos(self):
+        df = pd.DataFrame(
+            {
+                "bool": [True, False],
+                "bytes": [b"abc", "ñ".encode("utf-8")],
+                "fecha": [datetime.date(2024, 1, 2), datetime.date(2024, 2, 3)],
+                "numero": [10, 20],
+            }
+        )
+        filas = _leer_tsv(self._escribir(df))
+        self.assertEqual(filas, [["1", "abc", "2024-01-02", "10"], ["0", "ñ", "2024-02-03", "20"]])
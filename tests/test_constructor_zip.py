@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+from scripts import constructor_zip
+from scripts.constructor_zip import ConstructorZip
+
+
+class ConstructorZipTests(unittest.TestCase):
+    """
+    Los zip de ConstructorZip se leen con zipfile y testzip() no encuentra errores.
+    """
+
+    ENTRADAS = {
+        "Ventas.txt": b"Cod\tValor\n" + b"001\t1500\n" * 5000,
+        "vacío.txt": b"",
+        "Año/Niño ñandú €.txt": "línea con tildes áéíóú\n".encode("utf-8") * 200,
+        "aleatorio.bin": os.urandom(64 * 1024),
+    }
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp(prefix="prueba_zip_")
+        self.ruta = os.path.join(self.directorio, "salida.zip")
+
+    def tearDown(self):
+        shutil.rmtree(self.directorio, ignore_errors=True)
+
+    def _construir(self, nivel):
+        constructor = ConstructorZip(self.ruta, self.directorio, nivel=nivel, hilos=3)
+        for nombre, datos in self.ENTRADAS.items():
+            # En bloques, como los productores que escriben fragmento por fragmento
+            constructor.agregar(
+                nombre,
+                lambda entrada, d=datos: [
+                    entrada.escribir(d[i : i + 7000]) for i in range(0, len(d), 7000)
+                ],
+            )
+        return constructor.construir()
+
+    def _verificar(self, metodo):
+        with zipfile.ZipFile(self.ruta) as archivo:
+            self.assertIsNone(archivo.testzip())
+            self.assertEqual(archivo.namelist(), list(self.ENTRADAS))
+            for info in archivo.infolist():
+                self.assertEqual(info.compress_type, metodo)
+                self.assertEqual(archivo.read(info), self.ENTRADAS[info.filename])
+
+    def test_sin_compresion(self):
+        escritas = self._construir(nivel=0)
+        self.assertEqual([e.tamano for e in escritas], [len(d) for d in self.ENTRADAS.values()])
+        self._verificar(zipfile.ZIP_STORED)
+
+    def test_deflate(self):
+        self._construir(nivel=6)
+        self._verificar(zipfile.ZIP_DEFLATED)
+
+    def test_zip64_forzado(self):
+        # Con los límites bajos, los tamaños, offsets y el directorio central van en ZIP64
+        with mock.patch.object(constructor_zip, "_LIMITE_32", 1000), mock.patch.object(
+            constructor_zip, "_LIMITE_16", 2
+        ):
+            self._construir(nivel=6)
+        with open(self.ruta, "rb") as archivo:
+            self.assertIn(b"PK\x06\x06", archivo.read())
+        self._verificar(zipfile.ZIP_DEFLATED)
+
+    def test_error_en_productor_no_deja_zip(self):
+        def fallar(entrada):
+            entrada.escribir(b"parcial")
+            raise RuntimeError("fallo del cursor")
+
+        constructor = ConstructorZip(self.ruta, self.directorio, nivel=6, hilos=2)
+        constructor.agregar("bien.txt", lambda entrada: entrada.escribir(b"ok"))
+        constructor.agregar("mal.txt", fallar)
+        with self.assertRaises(RuntimeError):
+            constructor.construir()
+        self.assertFalse(os.path.exists(self.ruta))
@@ -0,0 +1,49 @@
+import io
+import unittest
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from scripts.formatos_salida import escribir_parquet
+
+
+class EscribirParquetTests(unittest.TestCase):
+    """
+    El esquema del Parquet se amplía con todos los fragmentos, no solo el primero.
+    """
+
+    def _escribir(self, fragmentos):
+        salida = io.BytesIO()
+        filas = escribir_parquet(salida.write, iter(fragmentos))
+        return filas, pq.read_table(io.BytesIO(salida.getvalue()))
+
+    def test_enteros_y_decimales_se_escriben_como_double(self):
+        filas, tabla = self._escribir(
+            [pd.DataFrame({"valor": [1, 2]}), pd.DataFrame({"valor": [1.5, 2.25]})]
+        )
+        self.assertEqual(filas, 4)
+        self.assertEqual(tabla.schema.field("valor").type, pa.float64())
+        self.assertEqual(tabla.column("valor").to_pylist(), [1.0, 2.0, 1.5, 2.25])
+
+    def test_columna_nula_toma_el_tipo_de_fragmentos_posteriores(self):
+        _, tabla = self._escribir(
+            [pd.DataFrame({"valor": [None, None]}), pd.DataFrame({"valor": [3, 4]})]
+        )
+        self.assertTrue(pa.types.is_integer(tabla.schema.field("valor").type))
+        self.assertEqual(tabla.column("valor").to_pylist(), [None, None, 3, 4])
+
+    def test_tipos_incompatibles_se_escriben_como_texto(self):
+        _, tabla = self._escribir(
+            [pd.DataFrame({"codigo": [1, 2]}), pd.DataFrame({"codigo": ["A", "B"]})]
+        )
+        self.assertEqual(tabla.column("codigo").to_pylist(), ["1", "2", "A", "B"])
+
+    def test_sin_fragmentos_escribe_un_parquet_vacio(self):
+        filas, tabla = self._escribir([])
+        self.assertEqual(filas, 0)
+        self.assertEqual(tabla.num_columns, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import re
+import unicodedata
+import unittest
+
+import pandas as pd
+
+from scripts.normalizacion import normalizar_columnas, normalizar_texto, quitar_acentos
+
+
+def _remove_accents_anterior(input_str):
+    # CargueZip.remove_accents antes de scripts.normalizacion
+    preserved_chars = "Ññ@#"
+    nfkd_form = unicodedata.normalize("NFKD", input_str)
+    return "".join(
+        [
+            c if c in preserved_chars else unicodedata.normalize("NFC", c)
+            for c in nfkd_form
+            if not unicodedata.combining(c)
+        ]
+    )
+
+
+def _limpiar_valor_anterior(valor):
+    # CargueZip.limpiar_espacios_y_caracteres antes de scripts.normalizacion, con
+    # las operaciones de texto de Python (columnas object de pandas 2)
+    valor = re.sub(r"\s+", " ", re.sub("\r", "", re.sub("\n", "", valor))).strip().upper()
+    for quote in ['"', "'"]:
+        valor = valor.replace(quote, "")
+    return _remove_accents_anterior(valor) if valor else valor
+
+
+def _limpiar_anterior(serie):
+    texto = serie.astype(str)
+    return texto.map(_limpiar_valor_anterior, na_action="ignore")
+
+
+class NormalizarTextoTests(unittest.TestCase):
+    VALORES = [
+        "  José   Pérez ",
+        "CAFÉ\tcon leche",
+        "línea\nrota\r\n",
+        'dice "hola"',
+        "o'higgins",
+        "Über straße",
+        "ç à è ì ò ù ü ý ÿ",
+        "ﬁ ½ ²",  # compatibilidad NFKD
+        "correo@dominio.com #12",
+        "",
+        "   ",
+        None,
+        12.5,
+        "Ελληνικά Кириллица",
+    ]
+
+    def test_igual_al_algoritmo_anterior(self):
+        serie = pd.Series(self.VALORES, dtype=object)
+        pd.testing.assert_series_equal(normalizar_texto(serie), _limpiar_anterior(serie))
+
+    def test_conserva_enie(self):
+        # Único cambio de comportamiento: antes Ñ quedaba como N
+        serie = pd.Series(["Peña", "ñandú"])
+        self.assertEqual(normalizar_texto(serie).tolist(), ["PEÑA", "ÑANDU"])
+        self.assertEqual(_limpiar_anterior(serie).tolist(), ["PENA", "NANDU"])
+
+    def test_sin_acentos(self):
+        serie = pd.Series(["  árbol\tverde  "])
+        self.assertEqual(normalizar_texto(serie, acentos=False).tolist(), ["ÁRBOL VERDE"])
+
+    def test_quitar_acentos(self):
+        for texto in ["José Pérez", "Ünïcödé", "a@b#c", "Año"]:
+            esperado = _remove_accents_anterior(texto) if "ñ" not in texto.lower() else texto
+            self.assertEqual(quitar_acentos(texto), esperado)
+
+    def test_normalizar_columnas(self):
+        df = pd.DataFrame({"nombre": [" ana  maría "], "codigo": ["á1"], "otra": ["é"]})
+        df = normalizar_columnas(df, {"nombre": "str", "codigo": "int", "falta": "str"})
+        self.assertEqual(df.loc[0, "nombre"], "ANA MARIA")
+        self.assertEqual(df.loc[0, "codigo"], "Á1")
+        self.assertEqual(df.loc[0, "otra"], "é")
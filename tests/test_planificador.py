@@ -0,0 +1,95 @@
+import threading
+import time
+import unittest
+
+from scripts.extrae_bi.planificador import Planificador, planificar_extraccion
+
+
+class PlanificarExtraccionTests(unittest.TestCase):
+    def test_entradas_independientes(self):
+        plan = planificar_extraccion([("a", "ventas", "t1"), ("b", "clientes", "t2")])
+        self.assertEqual(plan, [("a", set()), ("b", set())])
+
+    def test_misma_tabla_en_orden(self):
+        plan = dict(
+            planificar_extraccion(
+                [("a", "ventas", "t1"), ("b", "clientes", "t2"), ("c", "devoluciones", "t1")]
+            )
+        )
+        self.assertEqual(plan["c"], {"a"})
+        self.assertEqual(plan["b"], set())
+
+    def test_barreras(self):
+        plan = planificar_extraccion(
+            [
+                ("a", "ventas", "t1"),
+                ("b", "clientes", "t2"),
+                ("u", "update_cubo_bi", "cubo"),
+                ("c", "ventas", "t1"),
+                ("d", "clientes", "t2"),
+                ("i", "impactos_bi", "impactos"),
+                ("e", "ventas", "t1"),
+            ]
+        )
+        self.assertEqual([clave for clave, _ in plan], ["a", "b", "u", "c", "d", "i", "e"])
+        plan = dict(plan)
+        # La barrera espera todo lo anterior y lo posterior espera la barrera
+        self.assertEqual(plan["u"], {"a", "b"})
+        self.assertEqual(plan["c"], {"u"})
+        self.assertEqual(plan["d"], {"u"})
+        self.assertEqual(plan["i"], {"u", "c", "d"})
+        # Después de una barrera la misma tabla no depende de la entrada anterior a ella
+        self.assertEqual(plan["e"], {"i"})
+
+    def test_barreras_seguidas(self):
+        plan = dict(
+            planificar_extraccion([("u", "update_cubo_bi", "x"), ("i", "impactos_bi", "y")])
+        )
+        self.assertEqual(plan, {"u": set(), "i": {"u"}})
+
+
+class PlanificadorTests(unittest.TestCase):
+    def test_respeta_el_plan(self):
+        entradas = [
+            ("a", "ventas", "t1"),
+            ("b", "clientes", "t2"),
+            ("c", "devoluciones", "t1"),
+            ("u", "update_cubo_bi", "cubo"),
+            ("d", "ventas", "t1"),
+        ]
+        plan = planificar_extraccion(entradas)
+        inicios, fines = {}, {}
+        lock = threading.Lock()
+
+        def tarea(clave):
+            with lock:
+                inicios[clave] = time.perf_counter()
+            time.sleep(0.02)
+            with lock:
+                fines[clave] = time.perf_counter()
+            return clave
+
+        planificador = Planificador(max_hilos=4)
+        for clave, dependencias in plan:
+            planificador.agregar(clave, lambda c=clave: tarea(c), dependencias)
+        tareas = planificador.ejecutar()
+
+        for clave, dependencias in plan:
+            self.assertEqual(tareas[clave].resultado, clave)
+            for dependencia in dependencias:
+                self.assertLessEqual(fines[dependencia], inicios[clave])
+        # a y b no dependen entre sí y corren al mismo tiempo
+        self.assertLess(inicios["b"], fines["a"])
+
+    def test_error_no_detiene_las_demas(self):
+        planificador = Planificador(max_hilos=2)
+        planificador.agregar("a", lambda: 1 / 0)
+        planificador.agregar("b", lambda: "ok", ["a"])
+        tareas = planificador.ejecutar()
+        self.assertIsInstance(tareas["a"].error, ZeroDivisionError)
+        self.assertEqual(tareas["b"].resultado, "ok")
+
+    def test_dependencia_no_registrada(self):
+        planificador = Planificador(max_hilos=1)
+        with self.assertRaises(ValueError):
+            planificador.agregar("a", lambda: None, ["z"])